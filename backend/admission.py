@@ -0,0 +1,361 @@
+"""
+Control de admisión, plazos y cancelación de las sentencias de /api/execute.
+
+AdmissionController (hilos) y AsyncAdmissionController (asyncio) limitan
+las sentencias en ejecución a la vez, en total y por sesión; las demás
+esperan en una cola acotada y se rechazan con AdmissionError (HTTP 429)
+si la cola está llena o la espera supera queue_timeout. Watchdog
+interrumpe con KILL QUERY las sentencias que superan su plazo o que se
+cancelan por el id de su petición.
+"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager, nullcontext
+
+
+class AdmissionError(Exception):
+    def __init__(self, message, retry_after=1):
+        self.message = message
+        # Segundos sugeridos al cliente antes de reintentar (Retry-After)
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
+class AdmissionLimits:
+    """Contadores y reglas comunes a las dos versiones del control de admisión"""
+
+    def __init__(self, max_concurrent=32, max_per_session=4, max_queue=64, queue_timeout=5):
+        self.max_concurrent = max_concurrent
+        self.max_per_session = max_per_session
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._active = {}
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _can_run(self, session_id):
+        return (self.running < self.max_concurrent
+                and self._active.get(session_id, 0) < self.max_per_session)
+
+    def _check_queue(self):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionError('Demasiadas consultas en espera; intente más tarde')
+
+    def _timed_out(self):
+        self.timeouts += 1
+        return AdmissionError(
+            'Tiempo de espera agotado para ejecutar la consulta', max(1, round(self.queue_timeout))
+        )
+
+    def _enter(self, session_id):
+        self.running += 1
+        self.admitted += 1
+        self._active[session_id] = self._active.get(session_id, 0) + 1
+
+    def _leave(self, session_id):
+        self.running -= 1
+        count = self._active.get(session_id, 0) - 1
+        if count > 0:
+            self._active[session_id] = count
+        else:
+            self._active.pop(session_id, None)
+
+    def stats(self):
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_per_session': self.max_per_session,
+            'max_queue': self.max_queue,
+            'running': self.running,
+            'queued': self.queued,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts
+        }
+
+
+class AdmissionController(AdmissionLimits):
+    """Control de admisión para los hilos de Flask"""
+
+    def __init__(self, **limits):
+        super().__init__(**limits)
+        self._condition = threading.Condition()
+
+    def acquire(self, session_id):
+        """Espera un lugar para ejecutar; AdmissionError si no lo hay"""
+        with self._condition:
+            if self._can_run(session_id):
+                self._enter(session_id)
+                return
+            self._check_queue()
+            self.queued += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while not self._can_run(session_id):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timed_out()
+                    self._condition.wait(remaining)
+            finally:
+                self.queued -= 1
+            self._enter(session_id)
+
+    def release(self, session_id):
+        with self._condition:
+            self._leave(session_id)
+            # Los que esperan pueden estar limitados por su sesión: se avisa a todos
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, session_id):
+        self.acquire(session_id)
+        try:
+            yield
+        finally:
+            self.release(session_id)
+
+    def stats(self):
+        with self._condition:
+            return super().stats()
+
+
+class AsyncAdmissionController(AdmissionLimits):
+    """Control de admisión para el modo ASGI; esperar no bloquea el bucle de eventos"""
+
+    def __init__(self, **limits):
+        super().__init__(**limits)
+        self._condition = None
+
+    @property
+    def condition(self):
+        # Se crea al primer uso, dentro del bucle de eventos que la usa
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self, session_id):
+        async with self.condition:
+            if self._can_run(session_id):
+                self._enter(session_id)
+                return
+            self._check_queue()
+            self.queued += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while not self._can_run(session_id):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timed_out()
+                    try:
+                        await asyncio.wait_for(self.condition.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.queued -= 1
+            self._enter(session_id)
+
+    async def release(self, session_id):
+        async with self.condition:
+            self._leave(session_id)
+            self.condition.notify_all()
+
+    @asynccontextmanager
+    async def admit(self, session_id):
+        await self.acquire(session_id)
+        try:
+            yield
+        finally:
+            await self.release(session_id)
+
+
+class Ticket:
+    """Sentencia de una petición: plazo y, si se interrumpió, el motivo"""
+    __slots__ = (
+        'request_id', 'session_id', 'timeout', 'deadline', 'connection_id', 'reason', 'killing'
+    )
+
+    def __init__(self, request_id, session_id, timeout):
+        self.request_id = request_id
+        self.session_id = session_id
+        self.timeout = timeout
+        self.deadline = None
+        self.connection_id = None
+        # 'timeout' al vencer el plazo, 'cancelled' con Watchdog.cancel
+        self.reason = None
+        # Hay un KILL QUERY en curso para su conexión
+        self.killing = False
+
+
+class Watchdog:
+    """
+    Vigila las sentencias en curso: un hilo interrumpe con kill(connection_id)
+    (KILL QUERY desde otra conexión) las que superan su plazo, y cancel lo
+    hace con la de un id de petición. kill se llama sin el lock tomado,
+    solo si la sentencia sigue vigilada, y mientras tanto watch no termina:
+    la conexión no vuelve al pool hasta que el KILL terminó.
+    """
+
+    def __init__(self, kill):
+        self.kill = kill
+        self.timed_out = 0
+        self.cancelled = 0
+        self._running = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def ticket(self, request_id, session_id, timeout):
+        """Ticket para una petición; ValueError si su id ya está en curso"""
+        with self._condition:
+            if request_id in self._running:
+                raise ValueError(f'Ya hay una consulta en curso con el id {request_id}')
+        return Ticket(request_id, session_id, timeout)
+
+    def watch(self, ticket, connection_id):
+        """Contexto durante el que se vigila la sentencia del ticket"""
+        if ticket is None:
+            return nullcontext()
+        return self._watch(ticket, connection_id)
+
+    @contextmanager
+    def _watch(self, ticket, connection_id):
+        self._enter(ticket, connection_id)
+        try:
+            yield ticket
+        finally:
+            self._leave(ticket)
+
+    @asynccontextmanager
+    async def watch_async(self, ticket, connection_id):
+        """
+        Como watch, para el event loop: el lock solo se toma por instantes
+        (kill se llama sin él) y la espera de un KILL en curso se hace en
+        otro hilo
+        """
+        if ticket is None:
+            yield None
+            return
+        self._enter(ticket, connection_id)
+        try:
+            yield ticket
+        finally:
+            if not self._leave(ticket, wait=False):
+                await asyncio.to_thread(self._leave, ticket)
+
+    def _enter(self, ticket, connection_id):
+        self.start()
+        with self._condition:
+            ticket.connection_id = connection_id
+            ticket.deadline = time.monotonic() + ticket.timeout
+            self._running[ticket.request_id] = ticket
+            self._condition.notify()
+
+    def _leave(self, ticket, wait=True):
+        """Deja de vigilar el ticket; sin wait, False si hay un KILL en curso"""
+        with self._condition:
+            while ticket.killing:
+                if not wait:
+                    return False
+                self._condition.wait()
+            if self._running.get(ticket.request_id) is ticket:
+                del self._running[ticket.request_id]
+            return True
+
+    def cancel(self, request_id, session_id=None):
+        """
+        Interrumpe la sentencia en curso de la petición (si se indica, solo
+        si es de session_id); False si no hay ninguna
+        """
+        with self._condition:
+            ticket = self._running.get(request_id)
+            if (ticket is None or ticket.reason is not None
+                    or (session_id is not None and ticket.session_id != session_id)):
+                return False
+            ticket.reason = 'cancelled'
+            self.cancelled += 1
+        self._kill(ticket)
+        return True
+
+    def start(self):
+        """Inicia el hilo la primera vez que se vigila una sentencia"""
+        if self._thread is not None:
+            return
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name='watchdog', daemon=True)
+                self._thread.start()
+
+    def run(self):
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                expired = [
+                    ticket for ticket in self._running.values()
+                    if ticket.reason is None and ticket.deadline <= now
+                ]
+                for ticket in expired:
+                    ticket.reason = 'timeout'
+                    self.timed_out += 1
+                if not expired:
+                    pending = [
+                        ticket.deadline for ticket in self._running.values()
+                        if ticket.reason is None
+                    ]
+                    self._condition.wait(min(pending) - now if pending else None)
+                    continue
+            for ticket in expired:
+                self._kill(ticket)
+
+    def _kill(self, ticket):
+        with self._condition:
+            # La sentencia pudo terminar desde que se eligió el ticket: su
+            # conexión ya puede estar ejecutando la de otra petición
+            if self._running.get(ticket.request_id) is not ticket:
+                return
+            ticket.killing = True
+        try:
+            self.kill(ticket.connection_id)
+        except Exception:
+            # El hilo no debe terminar por un KILL fallido
+            pass
+        finally:
+            with self._condition:
+                ticket.killing = False
+                self._condition.notify_all()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._condition:
+            running = [
+                {
+                    'request_id': ticket.request_id,
+                    'session_id': ticket.session_id,
+                    'elapsed': now - (ticket.deadline - ticket.timeout),
+                    'timeout': ticket.timeout,
+                    'reason': ticket.reason
+                }
+                for ticket in self._running.values()
+            ]
+        return {
+            'running': running,
+            'timed_out': self.timed_out,
+            'cancelled': self.cancelled
+        }
+
+
+def interrupted_result(ticket, error):
+    """Resultado de una sentencia interrumpida por su plazo o cancelada"""
+    if ticket.reason == 'timeout':
+        message = f'La consulta superó el tiempo máximo de ejecución ({ticket.timeout:g} s)'
+    else:
+        message = 'La consulta fue cancelada'
+    return {
+        'success': False,
+        'error': str(error),
+        'message': message,
+        'interrupted': ticket.reason
+    }
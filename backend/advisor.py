@@ -0,0 +1,250 @@
+"""
+Asesor de índices a partir de la carga observada.
+
+Registra, por base de datos, tabla y columna, los WHERE columna = valor de
+los SELECT, UPDATE y DELETE ejecutados (el Parser ya los reconoce): cuántas
+veces se usan, cuánto tardan y cuántas filas tocan. Con los índices de
+INFORMATION_SCHEMA.STATISTICS y, para las formas lentas, el EXPLAIN de
+la consulta más lenta, recomienda CREATE INDEX para los predicados
+frecuentes sin índice, con una estimación de la mejora.
+"""
+import math
+import re
+import threading
+from collections import deque
+
+INDEX_QUERY = """
+    SELECT TABLE_NAME AS table_name, INDEX_NAME AS index_name,
+           COLUMN_NAME AS column_name, SEQ_IN_INDEX AS seq_in_index
+    FROM INFORMATION_SCHEMA.STATISTICS
+    WHERE TABLE_SCHEMA = %s
+"""
+
+TABLE_ROWS_QUERY = """
+    SELECT TABLE_NAME AS table_name, TABLE_ROWS AS table_rows
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_SCHEMA = %s
+"""
+
+PREDICATE_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+# Accesos de EXPLAIN que ya usan un índice
+INDEXED_ACCESS = ('const', 'eq_ref', 'ref', 'ref_or_null', 'range', 'index_merge')
+
+
+def load_indexes(cursor, database):
+    """Primera columna de cada índice: {tabla en minúsculas: {columna en minúsculas: índice}}"""
+    cursor.execute(INDEX_QUERY, (database,))
+    indexes = {}
+    for row in cursor.fetchall():
+        if int(row['seq_in_index']) == 1:
+            indexes.setdefault(row['table_name'].lower(), {})[row['column_name'].lower()] = row['index_name']
+    return indexes
+
+
+def load_table_rows(cursor, database):
+    """Filas estimadas de cada tabla (TABLE_ROWS)"""
+    cursor.execute(TABLE_ROWS_QUERY, (database,))
+    return {
+        row['table_name'].lower(): int(row['table_rows'] or 0)
+        for row in cursor.fetchall()
+    }
+
+
+def explain(cursor, query, params=None):
+    """Filas del EXPLAIN de la consulta (dict por fila)"""
+    cursor.execute('EXPLAIN ' + query, params)
+    return cursor.fetchall()
+
+
+def estimate_speedup(table_rows, matched_rows):
+    """
+    Filas leídas sin índice (toda la tabla) frente a con él (la búsqueda
+    en el árbol más las filas que coinciden)
+    """
+    table_rows = max(table_rows, 1)
+    with_index = math.log2(table_rows + 1) + max(matched_rows, 1)
+    return max(1.0, table_rows / with_index)
+
+
+def index_name(table, column):
+    name = f'idx_{table}_{column}'.lower()
+    # Los nombres de índice de MySQL tienen hasta 64 caracteres
+    return name[:64]
+
+
+def index_statement(database, table, column):
+    """CREATE INDEX para la columna; los nombres se validan antes de citarlos"""
+    for name in (database, table, column):
+        if not re.fullmatch(r'\w+', name or ''):
+            raise ValueError(f'Nombre no válido: {name!r}')
+    return f'CREATE INDEX `{index_name(table, column)}` ON `{database}`.`{table}` (`{column}`)'
+
+
+class Predicate:
+    """Uso de WHERE columna = valor sobre una tabla"""
+    __slots__ = (
+        'database', 'table', 'column', 'count', 'seconds', 'max_seconds', 'rows',
+        'statements', 'slowest'
+    )
+
+    def __init__(self, database, table, column):
+        self.database = database
+        self.table = table
+        self.column = column
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.statements = {}
+        # (consulta, parámetros) de la ejecución más lenta, para EXPLAIN
+        self.slowest = None
+
+    def snapshot(self):
+        return {
+            'database': self.database,
+            'table': self.table,
+            'column': self.column,
+            'count': self.count,
+            'total_seconds': self.seconds,
+            'mean_seconds': self.seconds / self.count if self.count else 0.0,
+            'max_seconds': self.max_seconds,
+            'mean_rows': self.rows / self.count if self.count else 0.0,
+            'statements': dict(self.statements)
+        }
+
+
+class IndexAdvisor:
+    """
+    Perfil de los predicados de la carga y recomendaciones de índices.
+
+    Un predicado es frecuente a partir de min_executions ejecuciones y su
+    forma es lenta si alguna ejecución tardó slow_threshold segundos o más
+    (de esas se pide EXPLAIN). Se siguen hasta max_predicates predicados;
+    los nuevos que no caben se cuentan en dropped. applied guarda los
+    últimos applied_log_size índices creados con /api/advisor/apply.
+    """
+
+    def __init__(self, enabled=True, min_executions=10, slow_threshold=0.05, max_predicates=1000,
+                 applied_log_size=100):
+        self.enabled = enabled
+        self.min_executions = min_executions
+        self.slow_threshold = slow_threshold
+        self.max_predicates = max_predicates
+        self.predicates = {}
+        self.dropped = 0
+        self.applied = deque(maxlen=applied_log_size)
+        self._lock = threading.Lock()
+
+    def record(self, database, statement, seconds, rows, query, params=None):
+        """
+        Registra una ejecución de statement (sqlast.Statement) que tardó
+        seconds y devolvió o modificó rows filas
+        """
+        if (not self.enabled or not database or statement.condition is None
+                or statement.type not in PREDICATE_STATEMENTS):
+            return
+        column = statement.condition[0]
+        key = (database.lower(), statement.table.lower(), column.lower())
+        with self._lock:
+            predicate = self.predicates.get(key)
+            if predicate is None:
+                if len(self.predicates) >= self.max_predicates:
+                    self.dropped += 1
+                    return
+                predicate = self.predicates[key] = Predicate(database, statement.table, column)
+            predicate.count += 1
+            predicate.seconds += seconds
+            predicate.rows += rows
+            predicate.statements[statement.type] = predicate.statements.get(statement.type, 0) + 1
+            if seconds >= predicate.max_seconds:
+                predicate.max_seconds = seconds
+                predicate.slowest = (query, tuple(params) if params is not None else None)
+
+    def workload(self, database):
+        """Predicados de la base de datos, de más a menos tiempo total"""
+        with self._lock:
+            predicates = [
+                predicate for (name, _, _), predicate in self.predicates.items()
+                if name == database.lower()
+            ]
+        return sorted(predicates, key=lambda predicate: predicate.seconds, reverse=True)
+
+    def slow_shapes(self, database):
+        """Predicados frecuentes con alguna ejecución lenta: (predicado, consulta, parámetros)"""
+        return [
+            (predicate,) + predicate.slowest
+            for predicate in self.workload(database)
+            if predicate.count >= self.min_executions
+            and predicate.max_seconds >= self.slow_threshold and predicate.slowest
+        ]
+
+    def advise(self, database, indexes, table_rows, plans=None):
+        """
+        Predicados con su índice (si lo hay) y recomendaciones para los
+        frecuentes sin índice. indexes y table_rows vienen de load_indexes
+        y load_table_rows; plans lleva (tabla, columna) en minúsculas al
+        EXPLAIN de su forma lenta.
+        """
+        plans = plans or {}
+        predicates = []
+        recommendations = []
+        for predicate in self.workload(database):
+            table = predicate.table.lower()
+            column = predicate.column.lower()
+            entry = predicate.snapshot()
+            entry['index'] = indexes.get(table, {}).get(column)
+            plan = plans.get((table, column))
+            if plan:
+                entry['explain'] = plan
+            predicates.append(entry)
+
+            if entry['index'] or predicate.count < self.min_executions:
+                continue
+            access = plan[0] if plan else None
+            if access and access.get('type') in INDEXED_ACCESS and access.get('key'):
+                # Lo resuelve un índice compuesto o el optimizador encontró otro camino
+                continue
+
+            rows = table_rows.get(table, 0)
+            if access and access.get('rows') is not None:
+                rows = max(rows, int(access['rows']))
+            speedup = estimate_speedup(rows, entry['mean_rows'])
+            recommendations.append({
+                'database': predicate.database,
+                'table': predicate.table,
+                'column': predicate.column,
+                'statement': index_statement(predicate.database, predicate.table, predicate.column),
+                'executions': predicate.count,
+                'table_rows': rows,
+                'estimated_speedup': round(speedup, 1),
+                'estimated_seconds_saved': predicate.seconds * (1 - 1 / speedup)
+            })
+
+        recommendations.sort(key=lambda item: item['estimated_seconds_saved'], reverse=True)
+        return {
+            'database': database,
+            'predicates': predicates,
+            'recommendations': recommendations,
+            'dropped': self.dropped
+        }
+
+    def record_applied(self, statement):
+        with self._lock:
+            self.applied.append(statement)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'predicates': len(self.predicates),
+                'max_predicates': self.max_predicates,
+                'dropped': self.dropped,
+                'applied': list(self.applied)
+            }
+
+    def reset(self):
+        with self._lock:
+            self.predicates = {}
+            self.dropped = 0
+            self.applied.clear()
@@ -0,0 +1,192 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pool import ANY_DATABASE, PoolError, PooledConnection, take_idle
+
+
+class AsyncConnectionPool:
+    """
+    Versión asyncio de ConnectionPool para el modo ASGI.
+
+    connect(database) es una corrutina que devuelve una conexión con la
+    interfaz de aiomysql (select_db, ping, rollback, get_transaction_status).
+    Las reglas son las mismas que en el pool síncrono: se prefiere una
+    conexión que ya esté en la base de datos pedida, las inactivas o viejas
+    se descartan y se verifican con ping si llevan tiempo sin usarse.
+    Esperar una conexión no bloquea el bucle de eventos.
+    """
+
+    def __init__(self, connect, size=5, timeout=10, max_idle=300,
+                 max_lifetime=3600, health_check_interval=30):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()
+        self._open = 0
+        self._condition = None
+
+        self.checked_out = 0
+        self.waiting = 0
+        self.created = 0
+        self.recycled = 0
+        self.timeouts = 0
+
+    @property
+    def condition(self):
+        # Se crea al primer uso, dentro del bucle de eventos que la usa
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self, database=None, timeout=None):
+        """Obtiene una conexión del pool, esperando si está lleno"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        conn = None
+        stale = []
+
+        try:
+            async with self.condition:
+                stale = self._evict_stale()
+                self.waiting += 1
+                try:
+                    while True:
+                        conn = take_idle(self._idle, database)
+                        if conn is not None:
+                            break
+                        if self._open < self.size:
+                            self._open += 1
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolError(
+                                "Tiempo de espera agotado al obtener una conexión del pool"
+                            )
+                        try:
+                            await asyncio.wait_for(self.condition.wait(), remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    self.waiting -= 1
+                self.checked_out += 1
+        finally:
+            # Fuera del lock, también si se agotó la espera
+            for old in stale:
+                old.close()
+
+        try:
+            return await self._prepare(conn, database)
+        except BaseException:
+            async with self.condition:
+                self.checked_out -= 1
+                self._open -= 1
+                self.condition.notify()
+            raise
+
+    async def release(self, conn, discard=False):
+        """Devuelve una conexión al pool (o la cierra si ya no sirve)"""
+        if not discard:
+            try:
+                if conn.raw.get_transaction_status():
+                    await conn.raw.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            conn.close()
+
+        async with self.condition:
+            self.checked_out -= 1
+            if discard:
+                self._open -= 1
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            self.condition.notify()
+
+    @asynccontextmanager
+    async def connection(self, database=None):
+        conn = await self.acquire(database)
+        try:
+            yield conn
+        except BaseException:
+            await self.release(conn, discard=not await self._is_alive(conn))
+            raise
+        else:
+            await self.release(conn)
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'open': self._open,
+            'idle': len(self._idle),
+            'checked_out': self.checked_out,
+            'waiting': self.waiting,
+            'created': self.created,
+            'recycled': self.recycled,
+            'timeouts': self.timeouts
+        }
+
+    async def close(self):
+        """Cierra todas las conexiones inactivas"""
+        async with self.condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self.condition.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def _evict_stale(self):
+        now = time.monotonic()
+        stale = [
+            conn for conn in self._idle
+            if now - conn.last_used > self.max_idle
+            or now - conn.created_at > self.max_lifetime
+        ]
+        for conn in stale:
+            self._idle.remove(conn)
+        self._open -= len(stale)
+        self.recycled += len(stale)
+        return stale
+
+    async def _prepare(self, conn, database):
+        if conn is not None:
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for > self.health_check_interval and not await self._is_alive(conn):
+                conn.close()
+                conn = None
+                self.recycled += 1
+            elif database is None and conn.database is not None:
+                # MySQL no permite deseleccionar la base de datos: conexión nueva
+                conn.close()
+                conn = None
+                self.recycled += 1
+
+        if conn is None:
+            if database is ANY_DATABASE:
+                database = None
+            conn = PooledConnection(await self.connect(database), database)
+            self.created += 1
+        elif database is not ANY_DATABASE and conn.database != database:
+            try:
+                await conn.raw.select_db(database)
+            except Exception:
+                conn.close()
+                raise
+            conn.database = database
+
+        return conn
+
+    async def _is_alive(self, conn):
+        try:
+            await conn.raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
@@ -1,11 +1,52 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import mysql.connector
 from mysql.connector import Error
-from parser import analyze_sql
+from pool import ConnectionPool, PoolError, ANY_DATABASE
+from cache import AnalysisCache, ResultCache
+from catalog import SchemaCatalog, load_databases, load_schema
+from autocomplete import Completer
+from session import SessionStore, GroupCommitter
+from metrics import Metrics
+from incremental import DocumentStore, DocumentError
+from lexer import TokenStream
+from executor import (
+    track_database, run_statement, execute_script,
+    parameterize, run_prepared, prepared_cursor, PreparedStatementStats,
+    RowReader, paginate, next_page, TRANSACTION_STATEMENTS, TRANSACTION_MESSAGES
+)
+from script import iter_statements, analyze_script, ParallelAnalyzer
+from serializer import ROW_FORMATS, format_rows, choose_encoding, compress
+from sandbox import MemoryEngine, run as run_sandbox, run_script as run_sandbox_script
+from advisor import IndexAdvisor, load_indexes, load_table_rows, explain, index_statement
+from admission import AdmissionController, AdmissionError, Watchdog, interrupted_result
+from bulkload import METHODS, BulkLoadError, BulkLoader, open_rows, read_header, read_rows
+import serializer
+import atexit
+import hashlib
+import io
+import os
 import re
+import shutil
+import tempfile
+import time
+import uuid
+
+class SQLJSONProvider(DefaultJSONProvider):
+    """
+    JSON de las respuestas con serializer (orjson si está instalado):
+    también TokenStream, Decimal y fechas
+    """
+    def dumps(self, obj, **kwargs):
+        return serializer.dumps(obj).decode('utf-8')
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(serializer.dumps(obj), mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = SQLJSONProvider(app)
 CORS(app)
 
 MYSQL_CONFIG = {
@@ -15,56 +56,466 @@ MYSQL_CONFIG = {
     'port': 3306
 }
 
-current_database = None
+MYSQL_POOL_CONFIG = {
+    'size': 5,
+    'timeout': 10,
+    'max_idle': 300,
+    'max_lifetime': 3600,
+    'health_check_interval': 30
+}
+
+# Análisis de scripts grandes en varios procesos (?parallel=1): procesos
+# (None = uno por núcleo) y tamaño de cada parte del archivo
+PARALLEL_CONFIG = {
+    'workers': None,
+    'chunk_bytes': 8 * 1024 * 1024
+}
+
+# Ejecución de scripts: sentencias por transacción y tamaño máximo de los
+# lotes de INSERT agrupados (1 desactiva la agrupación)
+SCRIPT_CONFIG = {
+    'batch_size': 100,
+    'insert_batch_size': 500
+}
+
+# Transacciones de /api/execute: en modo lote ("batch": true) las
+# escrituras se confirman cada batch_size sentencias o cuando la más
+# antigua lleva batch_window segundos sin confirmar
+TRANSACTION_CONFIG = {
+    'batch_size': 100,
+    'batch_window': 0.5
+}
+
+# Modo sandbox ("sandbox": true en /api/execute): cada sesión ejecuta en
+# un motor en memoria, sin MySQL. Con snapshot_dir, /api/sandbox/snapshot
+# guarda su estado en ese directorio y se recupera al crear el motor
+SANDBOX_CONFIG = {
+    'snapshot_dir': None
+}
+
+# Sentencias preparadas por conexión para consultas con literales
+PREPARED_CONFIG = {
+    'enabled': True,
+    'cache_size': 32
+}
+
+# Límites para los resultados de SELECT (la memoria no depende del tamaño de la tabla)
+RESULT_LIMITS = {
+    'max_rows': 10000,
+    'max_bytes': 16 * 1024 * 1024,
+    'chunk_size': 500
+}
+
+ANALYSIS_CACHE_CONFIG = {
+    'max_entries': 1024,
+    'max_bytes': 64 * 1024 * 1024,
+    'max_shapes': 4096
+}
+
+# Caché de resultados de SELECT: se invalida por tabla con las escrituras
+# hechas a través de este servidor; los cambios de otros clientes se ven
+# al vencer cada entrada (ttl en segundos)
+RESULT_CACHE_CONFIG = {
+    'enabled': True,
+    'max_entries': 4096,
+    'max_bytes': 32 * 1024 * 1024,
+    'ttl': 30
+}
+
+# Compresión de las respuestas (gzip, o brotli si está instalado) según
+# el Accept-Encoding del cliente; no se comprimen las respuestas en streaming
+COMPRESSION_CONFIG = {
+    'enabled': True,
+    'min_size': 1024,
+    'level': 5
+}
+
+# Vigencia (segundos) del catálogo de bases de datos, tablas y columnas
+CATALOG_CONFIG = {
+    'ttl': 300
+}
+
+# Sugerencias de autocompletado por consulta
+AUTOCOMPLETE_CONFIG = {
+    'limit': 5
+}
+
+# Control de admisión de /api/execute: sentencias en MySQL a la vez, en
+# total y por sesión; las demás esperan en una cola de hasta max_queue y
+# se rechazan con 429 si está llena o tras queue_timeout segundos
+ADMISSION_CONFIG = {
+    'max_concurrent': 32,
+    'max_per_session': 4,
+    'max_queue': 64,
+    'queue_timeout': 5
+}
+
+# Plazo de cada sentencia en segundos ("timeout" en /api/execute lo cambia
+# hasta max_timeout): al vencer se interrumpe con KILL QUERY
+EXECUTION_CONFIG = {
+    'timeout': 30,
+    'max_timeout': 300
+}
+
+# Sesiones: cada cliente envía su id en X-Session-Id (sin él comparte 'default')
+SESSION_CONFIG = {
+    'max_sessions': 10000,
+    'idle_timeout': 1800
+}
+
+DEFAULT_SESSION = 'default'
+
+# Instrumentación: tiempos por etapa, sentencias por tipo y consultas que
+# tardan más de slow_query_threshold segundos (ver /api/metrics)
+METRICS_CONFIG = {
+    'enabled': True,
+    'slow_query_threshold': 1.0,
+    'slow_log_size': 100
+}
+
+# Asesor de índices: perfil de los WHERE columna = valor ejecutados y
+# recomendaciones (ver /api/advisor) para los predicados con al menos
+# min_executions ejecuciones sin índice; de las formas con alguna
+# ejecución de slow_threshold segundos o más se pide EXPLAIN; se recuerdan
+# los últimos applied_log_size índices creados (ver /api/advisor/stats)
+ADVISOR_CONFIG = {
+    'enabled': True,
+    'min_executions': 10,
+    'slow_threshold': 0.05,
+    'max_predicates': 1000,
+    'applied_log_size': 100
+}
+
+# Importación de CSV/TSV (/api/import): filas por parte (cada una en su
+# transacción), filas por executemany cuando no se usa LOAD DATA LOCAL
+# INFILE (local_infile False lo evita) y directorio de los archivos
+# temporales de cada parte (None = el del sistema)
+IMPORT_CONFIG = {
+    'local_infile': True,
+    'chunk_rows': 50000,
+    'batch_size': 1000,
+    'temp_dir': None
+}
+
+def create_connection(database=None, **options):
+    """Crea conexión física a MySQL (options se agregan a MYSQL_CONFIG)"""
+    config = MYSQL_CONFIG.copy()
+    config.update(options)
+    if database:
+        config['database'] = database
+    return mysql.connector.connect(**config)
+
+metrics = Metrics(**METRICS_CONFIG)
+pool = ConnectionPool(create_connection, **MYSQL_POOL_CONFIG)
+analysis_cache = AnalysisCache(**ANALYSIS_CACHE_CONFIG, metrics=metrics)
+result_cache = ResultCache(**{
+    key: value for key, value in RESULT_CACHE_CONFIG.items() if key != 'enabled'
+})
+documents = DocumentStore()
+prepared_stats = PreparedStatementStats()
+catalog = SchemaCatalog(**CATALOG_CONFIG)
+completer = Completer(**AUTOCOMPLETE_CONFIG)
+sessions = SessionStore(**SESSION_CONFIG, metrics=metrics)
+parallel_analyzer = ParallelAnalyzer(**PARALLEL_CONFIG)
+atexit.register(parallel_analyzer.close)
+advisor = IndexAdvisor(**ADVISOR_CONFIG)
+admission = AdmissionController(**ADMISSION_CONFIG)
+group_committer = GroupCommitter(
+    sessions, TRANSACTION_CONFIG['batch_window'],
+    lambda session: finish_transaction(session, commit=True), metrics=metrics
+)
+
+def kill_query(connection_id):
+    """
+    KILL QUERY desde una conexión nueva: las del pool pueden estar todas
+    ocupadas por las consultas que hay que interrumpir
+    """
+    connection = pool.connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f'KILL QUERY {int(connection_id)}')
+        cursor.close()
+    finally:
+        connection.close()
+
+watchdog = Watchdog(kill_query)
 
 def get_connection(database=None):
-    """Crea conexión a MySQL"""
+    """Obtiene una conexión del pool"""
     try:
-        config = MYSQL_CONFIG.copy()
-        if database:
-            config['database'] = database
-        
-        connection = mysql.connector.connect(**config)
-        return connection
+        with metrics.timer('acquire'):
+            return pool.acquire(database)
+    except PoolError as e:
+        raise Exception(e.message)
     except Error as e:
         raise Exception(f"No se encontró la base de datos especificada")
 
-def execute_query(query, database=None):
-    """Ejecuta una consulta SQL"""
-    connection = None
-    try:
-        connection = get_connection(database)
-        cursor = connection.cursor(dictionary=True)
+def get_session():
+    """
+    Sesión de la petición (X-Session-Id). Si es nueva en este proceso
+    empieza en la base de datos que informa el cliente (X-Database).
+    """
+    return sessions.get(
+        request.headers.get('X-Session-Id') or DEFAULT_SESSION,
+        request.headers.get('X-Database') or None
+    )
+
+def session_connection(session):
+    """La conexión fijada a la sesión o una del pool en su base de datos"""
+    if session.connection is not None:
+        return session.connection
+    return get_connection(session.database)
+
+def snapshot_path(session):
+    """Archivo de la instantánea del sandbox de la sesión (None sin snapshot_dir)"""
+    directory = SANDBOX_CONFIG['snapshot_dir']
+    if not directory:
+        return None
+    name = hashlib.sha256(session.id.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(directory, f'{name}.json')
+
+def sandbox_engine(session):
+    """Motor en memoria de la sesión, recuperado de su instantánea si existe"""
+    if session.sandbox is None:
+        path = snapshot_path(session)
+        if path and os.path.exists(path):
+            session.sandbox = MemoryEngine.load(path)
+        else:
+            session.sandbox = MemoryEngine()
+    return session.sandbox
+
+def release_connection(session, connection, failed=False, keep=False):
+    """
+    Devuelve la conexión al pool. Con keep (o si ya estaba fijada a la
+    sesión y su transacción sigue abierta) queda fijada a la sesión.
+    """
+    broken = failed and not connection.is_connected()
+    pinned = session.connection is connection
+    if not broken and (keep or (pinned and connection.in_transaction)):
+        if not pinned:
+            session.pin(connection, pool.release)
+        return
+    if pinned:
+        session.unpin()
+    pool.release(connection, discard=broken)
+
+def execute_query(query, session, params=None, prepared=False,
+                  statement=None, page=None, batch=False, ticket=None):
+    """
+    Ejecuta una consulta SQL en la base de datos de la sesión. Con prepared,
+    query lleva %s y se ejecuta como sentencia preparada con params. page
+    limita las filas devueltas (ver read_page); sin page se aplican los
+    límites de RESULT_LIMITS.
+
+    Con batch (o dentro de BEGIN) las escrituras quedan pendientes en la
+    conexión fijada a la sesión; un lote se confirma al llegar a
+    TRANSACTION_CONFIG['batch_size'] escrituras o al vencer 'batch_window'.
+    Con ticket (ver read_ticket) la sentencia se interrumpe al vencer su plazo.
+    """
+    with session.lock:
+        if batch and session.transaction is None:
+            session.begin('batch')
+            group_committer.start()
         
-        cursor.execute(query)
+        result = run_query(query, session, params, prepared, statement, page, batch, ticket)
         
-        if query.strip().upper().startswith('SELECT'):
-            results = cursor.fetchall()
-            return {
-                'success': True,
-                'data': results,
-                'message': f'{len(results)} registros encontrados'
-            }
+        if session.transaction is not None and session.connection is None:
+            # Se perdió la conexión fijada: MySQL deshizo lo pendiente
+            result['rolled_back'] = session.pending
+            session.end_transaction()
+        elif session.transaction == 'batch' and (
+            session.pending >= TRANSACTION_CONFIG['batch_size']
+            or session.batch_age() >= TRANSACTION_CONFIG['batch_window']
+        ):
+            committed = finish_transaction(session, commit=True)
+            if not committed['success']:
+                return dict(committed, rolled_back=committed.pop('pending'))
+            result['committed'] = committed['committed']
         
-        connection.commit()
-        affected_rows = cursor.rowcount
+        if session.transaction is not None:
+            result['transaction'] = {'mode': session.transaction, 'pending': session.pending}
+        return result
+
+def finish_transaction(session, commit=True):
+    """
+    Confirma (o deshace) la transacción de la sesión y devuelve su conexión
+    al pool. Se llama con el lock de la sesión tomado.
+    """
+    connection = session.unpin()
+    pending = session.pending
+    session.end_transaction()
+    key = 'committed' if commit else 'rolled_back'
+    if connection is None:
+        return {'success': True, 'message': TRANSACTION_MESSAGES['COMMIT' if commit else 'ROLLBACK'], key: 0}
+    
+    failed = False
+    try:
+        if commit:
+            connection.commit()
+        else:
+            connection.rollback()
+        if commit and pending:
+            # Las lecturas cacheadas mientras el lote estaba abierto no lo incluyen
+            result_cache.clear()
+        return {'success': True, 'message': TRANSACTION_MESSAGES['COMMIT' if commit else 'ROLLBACK'], key: pending}
+    except Error as e:
+        failed = True
+        return {
+            'success': False,
+            'error': str(e),
+            'message': f'Error MySQL: {str(e)}',
+            'pending': pending
+        }
+    finally:
+        pool.release(connection, discard=failed and not connection.is_connected())
+
+def run_transaction(statement_type, session):
+    """BEGIN, COMMIT o ROLLBACK recibidos en /api/execute"""
+    with session.lock:
+        if statement_type != 'BEGIN':
+            result = finish_transaction(session, commit=statement_type == 'COMMIT')
+            result.pop('pending', None)
+            return result
+        
+        # Como en MySQL, BEGIN confirma lo que hubiera pendiente
+        committed = 0
+        if session.connection is not None:
+            result = finish_transaction(session, commit=True)
+            if not result['success']:
+                result.pop('pending', None)
+                return result
+            committed = result['committed']
         
+        connection = get_connection(session.database)
+        session.begin('explicit')
+        release_connection(session, connection, keep=True)
         return {
             'success': True,
-            'affected_rows': affected_rows,
-            'message': f'Comando ejecutado correctamente. Filas afectadas: {affected_rows}'
+            'message': TRANSACTION_MESSAGES['BEGIN'],
+            'committed': committed,
+            'transaction': {'mode': session.transaction, 'pending': 0}
         }
+
+def cached_query(query, session, params, prepared, statement, page, ticket=None):
+    """
+    execute_query para un SELECT pasando por la caché de resultados; agrega
+    'cached' al resultado. Dentro de una transacción no se usa la caché
+    (la sesión puede ver cambios sin confirmar).
+    """
+    if not RESULT_CACHE_CONFIG['enabled'] or session.in_transaction:
+        return execute_query(query, session, params, prepared, statement, page, ticket=ticket)
+    
+    key = (session.database, query, tuple(params or ()))
+    version = result_cache.version(session.database, statement.table)
+    result = result_cache.get(key, version)
+    if result is not None:
+        return dict(result, cached=True)
+    
+    result = execute_query(query, session, params, prepared, statement, page, ticket=ticket)
+    if result['success']:
+        result_cache.put(key, result, version)
+    return dict(result, cached=False)
+
+def record_predicate(database, statement, seconds, result, query, params):
+    """Registra en el asesor de índices una ejecución con WHERE columna = valor"""
+    if not result['success'] or result.get('cached') or statement.condition is None:
+        return
+    rows = len(result['data']) if 'data' in result else result.get('affected_rows', 0)
+    advisor.record(database, statement, seconds, rows, query, params)
+
+def run_query(query, session, params, prepared, statement, page, batch=False, ticket=None):
+    connection = None
+    cursor = None
+    failed = False
+    limits = {
+        'max_rows': page['limit'] if page else RESULT_LIMITS['max_rows'],
+        'max_bytes': RESULT_LIMITS['max_bytes']
+    }
+    try:
+        connection = session_connection(session)
+        
+        with watchdog.watch(ticket, connection.connection_id), metrics.timer('execute'):
+            if prepared:
+                result = run_prepared(
+                    connection, query, params,
+                    PREPARED_CONFIG['cache_size'], prepared_stats, **limits
+                )
+            else:
+                cursor = connection.cursor()
+                result = run_statement(cursor, query, params, **limits)
+        if 'data' not in result:
+            if session.transaction == 'explicit' or (batch and session.transaction == 'batch'):
+                session.record_write()
+            else:
+                # Una escritura fuera del lote confirma también lo pendiente
+                connection.commit()
+                session.end_transaction()
+        elif page and result.get('truncated'):
+            rows = result['data']
+            result['next'] = next_page(
+                page, len(rows), rows[-1] if rows else None, result['columns']
+            )
+        
+        # La conexión vuelve al pool con la base de datos que quedó activa
+        connection.database = track_database(statement, connection.database)
+        
+        return result
         
     except Error as e:
+        failed = True
+        if ticket is not None and ticket.reason:
+            return interrupted_result(ticket, e)
         return {
             'success': False,
             'error': str(e),
             'message': f'Error MySQL: {str(e)}'
         }
     finally:
-        if connection and connection.is_connected():
+        if cursor:
             cursor.close()
-            connection.close()
+        if connection:
+            release_connection(session, connection, failed, keep=session.transaction is not None)
+
+@app.teardown_request
+def release_admission(exc):
+    """Libera el lugar de /api/execute al terminar la petición (ver stream_select)"""
+    session_id = g.pop('admitted', None)
+    if session_id is not None:
+        admission.release(session_id)
+
+@app.after_request
+def compress_response(response):
+    """Comprime la respuesta si el cliente lo acepta (ver COMPRESSION_CONFIG)"""
+    if (not COMPRESSION_CONFIG['enabled'] or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if (response.content_length or 0) < COMPRESSION_CONFIG['min_size']:
+        return response
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding, COMPRESSION_CONFIG['level']))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def analysis_response(analysis):
+    """
+    Respuesta JSON del análisis; sin orjson los tokens se serializan por
+    partes directamente desde el TokenStream
+    """
+    tokens = analysis['lexical']['tokens']
+    if serializer.FAST or not isinstance(tokens, TokenStream):
+        return jsonify(analysis)
+    
+    def generate():
+        yield '{"lexical": {"token_count": %d, "tokens": ' % analysis['lexical']['token_count']
+        yield from tokens.iter_json()
+        yield '}, "syntactic": ' + app.json.dumps(analysis['syntactic']) + '}\n'
+    
+    return Response(generate(), mimetype='application/json')
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze_command():
@@ -80,32 +531,87 @@ def analyze_command():
         }), 400
     
     try:
-        analysis = analyze_sql(sql_command)
-        return jsonify(analysis)
+        analysis = analysis_cache.analyze(sql_command)
+        return analysis_response(analysis)
     except Exception as e:
         return jsonify({
             'error': str(e)
         }), 500
 
+@app.route('/api/analyze/incremental', methods=['POST'])
+def analyze_incremental():
+    """
+    Análisis incremental para el editor. Con 'query' se abre (o reinicia)
+    el documento y se devuelve el análisis completo; con 'offset',
+    'removed' e 'inserted' se aplica una edición sobre la versión 'version'
+    y se devuelven solo los tokens y sentencias que cambiaron.
+    """
+    result, status = incremental_result(request.json)
+    return jsonify(result), status
+
+@app.route('/api/analyze/incremental', methods=['DELETE'])
+def close_incremental():
+    """Cierra el documento {"document_id"} del análisis incremental"""
+    document_id = (request.json or {}).get('document_id')
+    if not document_id or not documents.close(document_id):
+        return jsonify({
+            'success': False,
+            'error': 'Documento desconocido'
+        }), 404
+    return jsonify({'success': True, 'message': 'Documento cerrado'})
+
+def incremental_result(data):
+    """Resultado de /api/analyze/incremental y su código HTTP"""
+    document_id = data.get('document_id')
+    
+    if not document_id:
+        return {
+            'error': 'No se proporcionó el identificador del documento'
+        }, 400
+    
+    if 'query' in data:
+        return documents.open(document_id, data['query']), 200
+    
+    try:
+        result = documents.edit(
+            document_id,
+            data.get('version'),
+            data.get('offset', 0),
+            data.get('removed', 0),
+            data.get('inserted', '')
+        )
+        return result, 200
+    except DocumentError as e:
+        # El cliente debe reenviar el texto completo
+        return {
+            'error': e.message,
+            'resync': True
+        }, 409
+
 @app.route('/api/execute', methods=['POST'])
 def execute_command():
     """
     Ejecuta un comando SQL después de validarlo
     """
-    global current_database
-    
+    started = time.perf_counter()
     data = request.json
     sql_command = data.get('query', '').strip()
+    row_format = data.get('format') or 'objects'
     
     if not sql_command:
         return jsonify({
             'success': False,
             'error': 'No se proporcionó ningún comando'
         }), 400
+    if row_format not in ROW_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f"Formato no válido; debe ser uno de: {', '.join(ROW_FORMATS)}"
+        }), 400
     
     try:
         # Primero analizar el comando
-        analysis = analyze_sql(sql_command)
+        analysis, statement = analysis_cache.lookup(sql_command)
         
         # Si hay errores sintácticos, no ejecutar
         if not analysis['syntactic']['valid']:
@@ -116,28 +622,107 @@ def execute_command():
                 'message': analysis['syntactic']['message']
             })
         
-        # Detectar si es un comando USE para actualizar la base de datos actual
-        if sql_command.upper().startswith('USE'):
-            match = re.search(r'USE\s+(\w+)', sql_command, re.IGNORECASE)
-            if match:
-                current_database = match.group(1)
+        session = get_session()
+        
+        # Modo sandbox: el motor en memoria de la sesión, sin MySQL
+        if data.get('sandbox'):
+            page = None
+            if statement.type == 'SELECT':
+                try:
+                    page = read_page(data)
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e),
+                        'message': f'Error: {str(e)}'
+                    }), 400
+            with session.lock:
+                result = run_sandbox(sandbox_engine(session), statement, page)
+            metrics.count(statement.type, result['success'])
+            result = format_rows(result, row_format)
+            result['sandbox'] = True
+            result['analysis'] = analysis
+            return jsonify(result)
+        
+        try:
+            ticket = read_ticket(data, session, request.headers.get('X-Request-Id'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'message': f'Error: {str(e)}'
+            }), 400
+        try:
+            admission.acquire(session.id)
+        except AdmissionError as e:
+            return admission_error(e, ticket)
+        g.admitted = session.id
+        
+        # Actualizar la base de datos de la sesión si es USE o DROP DATABASE
+        session.database = track_database(statement, session.database)
         
-        # Detectar DROP DATABASE para limpiar la base de datos actual
-        if sql_command.upper().startswith('DROP DATABASE'):
-            match = re.search(r'DROP\s+DATABASE\s+(\w+)', sql_command, re.IGNORECASE)
-            if match:
-                dropped_db = match.group(1)
-                # Si se elimina la base de datos actual, limpiarla
-                if current_database and current_database.upper() == dropped_db.upper():
-                    current_database = None
+        # Ejecutar el comando (con literales extraídos como parámetros si se puede)
+        statement_type = statement.type
+        tokens = analysis['lexical']['tokens']
+        prepared = None
+        if PREPARED_CONFIG['enabled']:
+            prepared = parameterize(sql_command, statement, tokens)
+        query, params = prepared or (sql_command, None)
         
-        # Ejecutar el comando
-        result = execute_query(sql_command, current_database)
+        page = None
+        if statement_type == 'SELECT':
+            try:
+                page = read_page(data)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'message': f'Error: {str(e)}'
+                }), 400
+            query, params = paginate(query, params, statement.condition is not None, page)
+            
+            # El streaming usa otra conexión, que no vería la transacción abierta
+            if data.get('stream') and not session.in_transaction:
+                return stream_select(
+                    query, params, prepared is not None, page, analysis, session, ticket
+                )
+        
+        executed = time.perf_counter()
+        if statement_type in TRANSACTION_STATEMENTS:
+            result = run_transaction(statement_type, session)
+        elif statement_type == 'SELECT':
+            result = cached_query(
+                query, session, params, prepared is not None, statement, page, ticket
+            )
+        else:
+            result = execute_query(
+                query, session, params, prepared is not None, statement, page,
+                batch=bool(data.get('batch')), ticket=ticket
+            )
+        record_predicate(
+            session.database, statement, time.perf_counter() - executed, result, query, params
+        )
+        metrics.count(statement_type, result['success'])
+        if result['success']:
+            invalidate_caches(statement_type, session.database, statement)
+            completer.record(tokens)
+        
+        # Un lote que no se pudo confirmar en segundo plano se informa aquí
+        failed_commit = session.take_failed_commit()
+        if failed_commit is not None:
+            result['failed_commit'] = failed_commit
         
         # Agregar análisis al resultado
+        result = format_rows(result, row_format)
         result['analysis'] = analysis
+        result['request_id'] = ticket.request_id
         
-        return jsonify(result)
+        with metrics.timer('serialize'):
+            response = jsonify(result)
+        elapsed = time.perf_counter() - started
+        metrics.observe('total', elapsed)
+        metrics.query_finished(sql_command, statement_type, elapsed, session.database)
+        return response
         
     except Exception as e:
         return jsonify({
@@ -146,99 +731,924 @@ def execute_command():
             'message': f'Error: {str(e)}'
         }), 500
 
+def invalidate_caches(statement_type, database, statement):
+    """
+    Invalida en el catálogo y en la caché de resultados lo que cambió la
+    sentencia ejecutada (sqlast.Statement) con database como base de datos activa
+    """
+    catalog.invalidate(statement_type, database, statement.database)
+    result_cache.invalidate(statement_type, database, statement.table or statement.database)
+
+def read_ticket(data, session, request_id=None):
+    """
+    Ticket de la sentencia: id de la petición ("request_id" o X-Request-Id;
+    se genera si no viene) para cancelarla y su plazo ("timeout", en
+    segundos, hasta EXECUTION_CONFIG['max_timeout']). ValueError si no son válidos.
+    """
+    request_id = data.get('request_id') or request_id or uuid.uuid4().hex
+    if not isinstance(request_id, str) or not re.fullmatch(r'[\w.:-]{1,64}', request_id):
+        raise ValueError('Id de petición no válido')
+    timeout = data.get('timeout', EXECUTION_CONFIG['timeout'])
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+        raise ValueError('timeout debe ser un número positivo de segundos')
+    timeout = min(timeout, EXECUTION_CONFIG['max_timeout'])
+    return watchdog.ticket(request_id, session.id, timeout)
+
+def admission_error(e, ticket):
+    """Respuesta 429 de una petición que no entró a ejecutarse"""
+    return jsonify({
+        'success': False,
+        'error': e.message,
+        'message': f'Error: {e.message}',
+        'request_id': ticket.request_id
+    }), 429, {'Retry-After': str(e.retry_after)}
+
+@app.route('/api/execute/cancel', methods=['POST'])
+def cancel_command():
+    """
+    Cancela la sentencia en curso de la petición {"request_id"} de la
+    misma sesión (KILL QUERY)
+    """
+    request_id = (request.json or {}).get('request_id')
+    if not request_id or not watchdog.cancel(str(request_id), get_session().id):
+        return jsonify({
+            'success': False,
+            'error': 'No hay una consulta en curso con ese id'
+        }), 404
+    return jsonify({
+        'success': True,
+        'request_id': request_id,
+        'message': 'Consulta cancelada'
+    })
+
+def read_page(data):
+    """
+    Paginación pedida para un SELECT: 'limit' (máximo RESULT_LIMITS['max_rows']),
+    y 'offset' o bien 'key' (columna) con 'after' (último valor visto)
+    """
+    max_rows = RESULT_LIMITS['max_rows']
+    limit = read_integer(data, 'limit', max_rows)
+    offset = read_integer(data, 'offset', 0)
+    if limit < 1 or offset < 0:
+        raise ValueError('Los parámetros de paginación deben ser positivos')
+    
+    page = {'limit': min(limit, max_rows), 'offset': offset}
+    key = data.get('key')
+    if key:
+        if not isinstance(key, str) or not re.fullmatch(r'\w+', key):
+            raise ValueError('Nombre de columna no válido para paginar')
+        if offset:
+            raise ValueError('No se puede combinar offset con paginación por clave')
+        after = data.get('after')
+        if isinstance(after, (bool, list, dict)):
+            raise ValueError('after debe ser un número o un texto')
+        page['key'] = key
+        page['after'] = after
+    return page
+
+def read_integer(data, name, default):
+    """Parámetro entero name de data (default si no viene); ValueError si no lo es"""
+    value = data.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+            raise TypeError
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} debe ser un número entero')
+
+def stream_select(query, params, prepared, page, analysis, session, ticket=None):
+    """
+    Ejecuta un SELECT y envía el resultado por bloques (NDJSON): primero las
+    columnas, luego las filas como listas y al final un resumen. Usa su
+    propia conexión del pool, en la base de datos de la sesión.
+    """
+    def run():
+        try:
+            connection = get_connection(session.database)
+        except Exception as e:
+            yield {
+                'success': False,
+                'error': str(e),
+                'message': f'Error: {str(e)}'
+            }
+            return
+        
+        cursor = None
+        finished = False
+        try:
+            with watchdog.watch(ticket, connection.connection_id):
+                if prepared:
+                    cursor, statement = prepared_cursor(
+                        connection, query, PREPARED_CONFIG['cache_size'], prepared_stats
+                    )
+                else:
+                    cursor = connection.cursor()
+                    statement = query
+                with metrics.timer('execute'):
+                    cursor.execute(statement, params)
+                
+                columns = list(cursor.column_names)
+                yield {'columns': columns}
+                reader = RowReader(
+                    cursor, page['limit'], RESULT_LIMITS['max_bytes'], RESULT_LIMITS['chunk_size']
+                )
+                last_row = None
+                for rows in reader:
+                    last_row = rows[-1]
+                    yield {'rows': rows}
+            
+            summary = {
+                'success': True,
+                'row_count': reader.count,
+                'truncated': reader.truncated,
+                'message': f'{reader.count} registros encontrados',
+                'analysis': analysis
+            }
+            if reader.truncated:
+                summary['next'] = next_page(page, reader.count, last_row, columns)
+            finished = True
+            metrics.count('SELECT', True)
+            yield summary
+        except Error as e:
+            finished = True
+            metrics.count('SELECT', False)
+            if ticket is not None and ticket.reason:
+                yield interrupted_result(ticket, e)
+                return
+            yield {
+                'success': False,
+                'error': str(e),
+                'message': f'Error MySQL: {str(e)}'
+            }
+        finally:
+            if cursor and not prepared:
+                cursor.close()
+            # Si el cliente cortó la respuesta quedan filas sin leer: se descarta
+            pool.release(connection, discard=not finished or not connection.is_connected())
+    
+    # Flask termina la petición (release_admission) antes de generar la
+    # respuesta: el lugar se libera al cerrarla
+    response = ndjson_response(run())
+    session_id = g.pop('admitted', None)
+    if session_id is not None:
+        response.call_on_close(lambda: admission.release(session_id))
+    return response
+
+def read_script():
+    """
+    Obtiene el script como flujo de texto: archivo subido ('file'),
+    campo 'query' en JSON o el cuerpo de la petición tal cual
+    """
+    upload = request.files.get('file')
+    if upload:
+        return io.TextIOWrapper(upload.stream, encoding='utf-8')
+    if request.is_json:
+        return io.StringIO(request.json.get('query', ''))
+    return io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8')
+
+def save_script():
+    """
+    Guarda el script de la petición (como read_script) en un archivo
+    temporal y devuelve su ruta; quien llama debe borrarlo
+    """
+    upload = request.files.get('file')
+    with tempfile.NamedTemporaryFile('wb', suffix='.sql', delete=False) as target:
+        if upload:
+            shutil.copyfileobj(upload.stream, target)
+        elif request.is_json:
+            target.write(request.json.get('query', '').encode('utf-8'))
+        else:
+            shutil.copyfileobj(request.stream, target)
+    return target.name
+
+def ndjson_response(items):
+    """Respuesta en streaming con un objeto JSON por línea"""
+    def generate():
+        for item in items:
+            yield app.json.dumps(item) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/script/analyze', methods=['POST'])
+def analyze_script_command():
+    """
+    Analiza un script con varias sentencias, devolviendo un resultado por línea.
+    Con ?parallel=1 el script se guarda en un archivo temporal y se analiza
+    por partes en varios procesos (mismo resultado, en el mismo orden).
+    """
+    include_tokens = request.args.get('tokens', '0') == '1'
+
+    if request.args.get('parallel', '0') == '1':
+        path = save_script()
+
+        def run_parallel():
+            try:
+                yield from parallel_analyzer.analyze(path, include_tokens)
+            finally:
+                os.remove(path)
+
+        return ndjson_response(run_parallel())
+
+    def run():
+        # El script se lee dentro del generador, mientras dura la respuesta
+        statements = iter_statements(read_script())
+        yield from analyze_script(statements, include_tokens)
+
+    return ndjson_response(run())
+
+@app.route('/api/script/execute', methods=['POST'])
+def execute_script_command():
+    """
+    Ejecuta un script con varias sentencias en una sola conexión,
+    confirmando por lotes y devolviendo un resultado por línea
+    """
+    batch_size = max(1, request.args.get('batch_size', SCRIPT_CONFIG['batch_size'], type=int))
+    insert_batch_size = max(1, request.args.get(
+        'insert_batch_size', SCRIPT_CONFIG['insert_batch_size'], type=int
+    ))
+    stop_on_error = request.args.get('stop_on_error', '1') != '0'
+    row_format = request.args.get('format', 'objects')
+    if row_format not in ROW_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f"Formato no válido; debe ser uno de: {', '.join(ROW_FORMATS)}"
+        }), 400
+    session = get_session()
+    
+    dry_run = request.args.get('dry_run') == '1'
+    if dry_run or request.args.get('sandbox') == '1':
+        return ndjson_response(run_script_in_sandbox(session, dry_run, stop_on_error, row_format))
+
+    def run():
+        statements = iter_statements(read_script())
+        try:
+            connection = get_connection(session.database)
+        except Exception as e:
+            yield {
+                'summary': True,
+                'success': False,
+                'error': str(e),
+                'message': f'Error: {str(e)}'
+            }
+            return
+
+        # Lo que cambió cada sentencia, para invalidarlo otra vez al final:
+        # otra conexión pudo volver a guardar resultados antes de los COMMIT
+        written = {}
+
+        def executed(statement_type, database, statement):
+            invalidate_caches(statement_type, database, statement)
+            if statement_type != 'SELECT':
+                key = (statement_type, database, statement.database, statement.table)
+                written.setdefault(key, statement)
+
+        failed = False
+        try:
+            limits = {
+                'max_rows': RESULT_LIMITS['max_rows'],
+                'max_bytes': RESULT_LIMITS['max_bytes']
+            }
+            for item in execute_script(connection, statements, batch_size,
+                                       stop_on_error, insert_batch_size, limits, executed):
+                if item.get('summary'):
+                    session.database = item['database']
+                    for (statement_type, database, _, _), statement in written.items():
+                        invalidate_caches(statement_type, database, statement)
+                    yield item
+                    continue
+                metrics.count(item['statement_type'], item['success'])
+                yield format_rows(item, row_format)
+        except Error as e:
+            failed = True
+            yield {
+                'summary': True,
+                'success': False,
+                'error': str(e),
+                'message': f'Error MySQL: {str(e)}'
+            }
+        finally:
+            pool.release(connection, discard=failed and not connection.is_connected())
+
+    return ndjson_response(run())
+
+def run_script_in_sandbox(session, dry_run, stop_on_error, row_format):
+    """
+    Ejecuta el script en el motor en memoria de la sesión o, en una prueba
+    en seco, en una copia que se descarta al terminar
+    """
+    statements = iter_statements(read_script())
+    max_rows = RESULT_LIMITS['max_rows']
+    if dry_run:
+        with session.lock:
+            engine = sandbox_engine(session).copy()
+        for item in run_sandbox_script(engine, statements, stop_on_error, max_rows):
+            yield format_rows(dict(item, sandbox=True, dry_run=True), row_format)
+        return
+    
+    with session.lock:
+        for item in run_sandbox_script(sandbox_engine(session), statements, stop_on_error, max_rows):
+            if not item.get('summary'):
+                metrics.count(item['statement_type'], item['success'])
+            yield format_rows(dict(item, sandbox=True), row_format)
+
+@app.route('/api/import', methods=['POST'])
+def import_command():
+    """
+    Importa un CSV o TSV (?format=csv|tsv) a la tabla ?table= de la base de
+    datos de la sesión (o ?database=). El archivo va como 'file' o como
+    cuerpo de la petición (también por partes) y su primera fila son los
+    nombres de las columnas. ?method=load|insert fuerza LOAD DATA o INSERT.
+    Responde un objeto JSON por línea: el progreso de cada parte y un resumen.
+    """
+    session = get_session()
+    database = request.args.get('database') or session.database
+    file_format = request.args.get('format', 'csv')
+    method = request.args.get('method', 'auto')
+    if method == 'auto' and not IMPORT_CONFIG['local_infile']:
+        method = 'insert'
+    
+    try:
+        if not database:
+            raise BulkLoadError('No hay base de datos seleccionada')
+        if method not in METHODS:
+            raise BulkLoadError(f"Método no válido; debe ser uno de: {', '.join(METHODS)}")
+        schema = cached_schema(database)
+        name = request.args.get('table', '').lower()
+        table = next((table for table in schema if table.lower() == name), None)
+        if table is None:
+            return jsonify({
+                'success': False,
+                'error': f"La tabla '{request.args.get('table', '')}' no existe en {database}"
+            }), 404
+    except BulkLoadError as e:
+        return jsonify({
+            'success': False,
+            'error': e.message,
+            'message': f'Error: {e.message}'
+        }), 400
+    except Error as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'Error MySQL: {str(e)}'
+        }), 500
+    
+    directory = tempfile.mkdtemp(prefix='import-', dir=IMPORT_CONFIG['temp_dir'])
+    source = None
+    try:
+        source, total_bytes = import_source(directory)
+        reader, counter = open_rows(source, file_format)
+        columns = read_header(reader, [column['name'] for column in schema[table]])
+        admission.acquire(session.id)
+    except (BulkLoadError, AdmissionError) as e:
+        if source is not None:
+            source.close()
+        shutil.rmtree(directory, ignore_errors=True)
+        if isinstance(e, AdmissionError):
+            return jsonify({
+                'success': False,
+                'error': e.message,
+                'message': f'Error: {e.message}'
+            }), 429, {'Retry-After': str(e.retry_after)}
+        return jsonify({
+            'success': False,
+            'error': e.message,
+            'message': f'Error: {e.message}'
+        }), 400
+    
+    def run():
+        connection = None
+        loader = None
+        try:
+            # Conexión propia: LOAD DATA LOCAL solo puede leer del directorio de la importación
+            connection = pool.connect(database, allow_local_infile_in_path=directory)
+            loader = BulkLoader(
+                connection, database, table, columns, directory, method,
+                IMPORT_CONFIG['chunk_rows'], IMPORT_CONFIG['batch_size']
+            )
+            for progress in loader.run(read_rows(reader, len(columns))):
+                progress['bytes'] = counter.count
+                progress['total_bytes'] = total_bytes
+                yield progress
+            yield dict(
+                loader.progress(), summary=True, success=True, bytes=counter.count,
+                message=f'{loader.rows} filas importadas en {table}'
+            )
+        except Exception as e:
+            # Cualquier fallo (también al escribir los archivos temporales)
+            # termina la respuesta con un resumen que lo informa
+            if isinstance(e, BulkLoadError):
+                message = e.message
+            elif isinstance(e, Error):
+                message = f'Error MySQL: {str(e)}'
+            else:
+                message = f'Error: {str(e)}'
+            rows = loader.rows if loader else 0
+            yield {
+                'summary': True,
+                'success': False,
+                'error': str(e),
+                'message': f'{message} ({rows} filas ya importadas)',
+                'rows': rows,
+                'chunks': loader.chunks if loader else 0
+            }
+        finally:
+            if connection is not None:
+                connection.close()
+            if loader and loader.rows:
+                result_cache.invalidate('INSERT', database, table)
+    
+    def finish():
+        source.close()
+        shutil.rmtree(directory, ignore_errors=True)
+        admission.release(session.id)
+    
+    # El lugar y los archivos se liberan al cerrar la respuesta: Flask ya
+    # terminó la petición cuando empieza a generarla
+    response = ndjson_response(run())
+    response.call_on_close(finish)
+    return response
+
+def import_source(directory):
+    """
+    Flujo binario del archivo de la importación y su tamaño (None si no se
+    conoce): el cuerpo de la petición o, si viene en un formulario, una
+    copia en directory (Flask cierra los archivos subidos antes de que se
+    genere la respuesta)
+    """
+    upload = request.files.get('file')
+    if not upload:
+        return request.stream, request.content_length
+    path = os.path.join(directory, 'upload')
+    with open(path, 'wb') as target:
+        shutil.copyfileobj(upload.stream, target)
+    return open(path, 'rb'), os.path.getsize(path)
+
 @app.route('/api/autocomplete', methods=['POST'])
 def autocomplete():
     """
-    Proporciona sugerencias de autocompletado para comandos SQL
+    Proporciona sugerencias de autocompletado para comandos SQL según el
+    contexto del cursor ('position', por defecto el final del texto)
     """
     data = request.json
-    partial_query = data.get('query', '').upper()
+    try:
+        return jsonify(autocomplete_result(data.get('query', ''), data.get('position')))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'Error: {str(e)}'
+        }), 400
+
+def read_position(position):
+    """Posición del cursor ('position'); ValueError si no es un número entero"""
+    try:
+        if isinstance(position, bool):
+            raise TypeError
+        return max(0, int(position))
+    except (TypeError, ValueError):
+        raise ValueError('position debe ser un número entero')
+
+def autocomplete_result(query, position=None, lexed=None):
+    """
+    Sugerencias para query hasta position; lexed como en Completer.complete.
+    ValueError si position no es válida.
+    """
+    if position is not None:
+        query = query[:read_position(position)]
     
-    # Palabras clave de MySQL
-    keywords = [
-        'CREATE DATABASE', 'CREATE TABLE', 'USE', 
-        'INSERT INTO', 'VALUES', 'UPDATE', 'SET', 
-        'DELETE FROM', 'DROP DATABASE', 'DROP TABLE',
-        'SELECT', 'SELECT * FROM', 'FROM', 'WHERE',
-        'INT', 'VARCHAR', 'TEXT', 'DATE', 'FLOAT',
-        'PRIMARY KEY', 'NOT NULL', 'AUTO_INCREMENT'
-    ]
+    database = get_session().database
     
-    # Filtrar sugerencias que coincidan
-    suggestions = [kw for kw in keywords if kw.startswith(partial_query)]
+    # Sin conexión a MySQL se sugieren solo palabras clave
+    def databases():
+        try:
+            return cached_databases()
+        except Exception:
+            return None
     
-    return jsonify({
-        'suggestions': suggestions[:5]  # Máximo 5 sugerencias
-    })
+    def schema():
+        if not database:
+            return None
+        try:
+            return cached_schema(database)
+        except Exception:
+            return None
+    
+    return completer.complete(query, databases, schema, lexed)
+
+# Operaciones de /api/batch; cada una devuelve lo mismo que su ruta
+BATCH_OPERATIONS = ('incremental', 'analyze', 'autocomplete', 'databases', 'tables', 'health')
+
+@app.route('/api/batch', methods=['POST'])
+def batch_command():
+    """
+    Varias operaciones ("operations") en una sola petición. El texto se
+    tokeniza una vez: 'incremental' aplica la edición "document" (como
+    /api/analyze/incremental) y si no, 'analyze' analiza "query";
+    'autocomplete' ("position") reutiliza esos tokens. Los resultados van
+    en "results" por operación, con 'status' si no es 200.
+    """
+    data = request.json or {}
+    operations = data.get('operations')
+    if (not isinstance(operations, list) or not operations
+            or any(operation not in BATCH_OPERATIONS for operation in operations)
+            or len(set(operations)) != len(operations)):
+        return jsonify({
+            'error': f"operations debe ser una lista sin repetir de: {', '.join(BATCH_OPERATIONS)}"
+        }), 400
+    
+    results = {}
+    
+    def store(operation, result, status=200):
+        if status != 200:
+            result = dict(result, status=status)
+        results[operation] = result
+    
+    text = data.get('query')
+    lexed = None
+    if 'incremental' in operations:
+        document = data.get('document') or {}
+        store('incremental', *incremental_result(document))
+        shared = documents.lexed(document.get('document_id'))
+        if shared is not None:
+            text, lexed = shared
+    
+    needs_text = 'analyze' in operations or 'autocomplete' in operations
+    if needs_text and not text:
+        return jsonify({
+            'error': 'No se proporcionó ningún comando'
+        }), 400
+    
+    try:
+        if 'analyze' in operations or ('autocomplete' in operations and lexed is None):
+            analysis = analysis_cache.analyze(text)
+            if 'analyze' in operations:
+                store('analyze', analysis)
+            tokens = analysis['lexical']['tokens']
+            if lexed is None and isinstance(tokens, TokenStream):
+                lexed = (tokens, tokens.starts, tokens.ends)
+        if 'autocomplete' in operations:
+            try:
+                store('autocomplete', autocomplete_result(text, data.get('position'), lexed))
+            except ValueError as e:
+                store('autocomplete', {
+                    'success': False,
+                    'error': str(e),
+                    'message': f'Error: {str(e)}'
+                }, 400)
+    except Exception as e:
+        return jsonify({
+            'error': str(e)
+        }), 500
+    
+    if 'databases' in operations:
+        store('databases', *databases_result())
+    if 'tables' in operations:
+        store('tables', *tables_result(bool(data.get('columns'))))
+    if 'health' in operations:
+        store('health', *health_result())
+    return jsonify({'results': results})
+
+def database_error(e):
+    return {
+        'success': False,
+        'error': str(e),
+        'message': f'Error MySQL: {str(e)}'
+    }
+
+def query_catalog(load, database=None):
+    """Carga datos del catálogo con una conexión del pool"""
+    connection = get_connection(database)
+    cursor = None
+    failed = False
+    try:
+        cursor = connection.cursor(dictionary=True)
+        return load(cursor)
+    except Error:
+        failed = True
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        pool.release(connection, discard=failed and not connection.is_connected())
+
+def cached_databases():
+    """Bases de datos desde el catálogo, cargándolas si no están vigentes"""
+    databases = catalog.databases()
+    if databases is None:
+        generation = catalog.generation
+        databases = query_catalog(load_databases, ANY_DATABASE)
+        catalog.store_databases(databases, generation)
+    return databases
+
+def cached_schema(database):
+    """Tablas y columnas de la base de datos desde el catálogo"""
+    schema = catalog.schema(database)
+    if schema is None:
+        generation = catalog.generation
+        schema = query_catalog(lambda cursor: load_schema(cursor, database), database)
+        catalog.store_schema(database, schema, generation)
+    return schema
 
 @app.route('/api/databases', methods=['GET'])
 def list_databases():
     """
     Lista todas las bases de datos disponibles
     """
+    result, status = databases_result()
+    return jsonify(result), status
+
+def databases_result():
+    """Resultado de /api/databases y su código HTTP"""
     try:
-        result = execute_query("SHOW DATABASES")
-        if result['success']:
-            databases = [db['Database'] for db in result['data']]
-            return jsonify({
-                'success': True,
-                'databases': databases
-            })
-        return jsonify(result)
+        databases = cached_databases()
+        return {
+            'success': True,
+            'databases': databases
+        }, 200
+    except Error as e:
+        return database_error(e), 200
     except Exception as e:
-        return jsonify({
+        return {
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500
 
 @app.route('/api/tables', methods=['GET'])
 def list_tables():
     """
     Lista todas las tablas de la base de datos actual
     """
-    global current_database
+    # Con ?columns=1 también las columnas (con su tipo) de cada tabla
+    result, status = tables_result(request.args.get('columns') == '1')
+    return jsonify(result), status
+
+def tables_result(columns=False):
+    """Resultado de /api/tables y su código HTTP"""
+    current_database = get_session().database
     
     if not current_database:
-        return jsonify({
+        return {
             'success': False,
             'error': 'No hay una base de datos seleccionada'
-        }), 400
+        }, 400
     
     try:
-        result = execute_query(f"SHOW TABLES", current_database)
-        if result['success']:
-            table_key = f'Tables_in_{current_database}'
-            tables = [table.get(table_key) for table in result['data']]
-            return jsonify({
-                'success': True,
-                'tables': tables
-            })
-        return jsonify(result)
+        schema = cached_schema(current_database)
+        result = {
+            'success': True,
+            'tables': list(schema)
+        }
+        if columns:
+            result['columns'] = schema
+        return result, 200
+    except Error as e:
+        return database_error(e), 200
     except Exception as e:
-        return jsonify({
+        return {
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """
     Verifica el estado del servidor y la conexión a MySQL
     """
+    result, status = health_result()
+    return jsonify(result), status
+
+def health_result():
+    """Resultado de /api/health y su código HTTP"""
+    session = get_session()
     try:
-        connection = get_connection()
-        connection.close()
-        return jsonify({
+        connection = get_connection(ANY_DATABASE)
+        pool.release(connection)
+        return {
             'status': 'ok',
             'mysql': 'connected',
-            'current_database': current_database
-        })
+            'current_database': session.database,
+            'in_transaction': session.in_transaction
+        }, 200
     except Exception as e:
-        return jsonify({
+        return {
             'status': 'error',
             'mysql': 'disconnected',
             'error': str(e)
+        }, 500
+
+@app.route('/api/pool', methods=['GET'])
+def pool_stats():
+    """
+    Estadísticas del pool de conexiones
+    """
+    return jsonify(pool.stats())
+
+@app.route('/api/prepared', methods=['GET'])
+def prepared_statement_stats():
+    """
+    Estadísticas de reutilización de sentencias preparadas
+    """
+    return jsonify(prepared_stats.snapshot())
+
+@app.route('/api/catalog', methods=['GET'])
+def catalog_stats():
+    """
+    Estadísticas de la caché del catálogo
+    """
+    return jsonify(catalog.stats())
+
+@app.route('/api/catalog', methods=['DELETE'])
+def clear_catalog():
+    """
+    Descarta el catálogo en caché (p. ej. después de cambios de esquema
+    hechos por otros clientes); se vuelve a leer al usarlo
+    """
+    catalog.clear()
+    return jsonify({'success': True, 'message': 'Catálogo descartado'})
+
+@app.route('/api/sessions', methods=['GET'])
+def session_stats():
+    """
+    Estadísticas de las sesiones activas
+    """
+    return jsonify(sessions.stats())
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_report():
+    """
+    Métricas de instrumentación en formato de texto de Prometheus
+    (?format=json devuelve percentiles y el registro de consultas lentas)
+    """
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.snapshot())
+    return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics', methods=['DELETE'])
+def reset_metrics():
+    """Pone en cero las métricas y vacía el registro de consultas lentas"""
+    metrics.reset()
+    return jsonify({'success': True, 'message': 'Métricas reiniciadas'})
+
+@app.route('/api/admission', methods=['GET'])
+def admission_stats():
+    """
+    Estado del control de admisión y sentencias vigiladas por el watchdog
+    """
+    return jsonify({
+        'admission': admission.stats(),
+        'watchdog': watchdog.stats()
+    })
+
+@app.route('/api/cache', methods=['GET'])
+def cache_stats():
+    """
+    Estadísticas de la caché de análisis y de la de resultados
+    """
+    stats = analysis_cache.stats()
+    stats['results'] = result_cache.stats()
+    return jsonify(stats)
+
+@app.route('/api/cache', methods=['DELETE'])
+def clear_caches():
+    """Vacía la caché de análisis y la de resultados"""
+    analysis_cache.clear()
+    result_cache.clear()
+    return jsonify({'success': True, 'message': 'Cachés vaciadas'})
+
+@app.route('/api/advisor', methods=['GET'])
+def advise_indexes():
+    """
+    Predicados de la carga de la base de datos (?database=, la de la sesión
+    si no se indica) y los índices recomendados, con el EXPLAIN de las
+    formas lentas (?explain=0 no lo pide)
+    """
+    database = request.args.get('database') or get_session().database
+    if not database:
+        return jsonify({
+            'success': False,
+            'error': 'No hay una base de datos seleccionada'
+        }), 400
+    with_explain = request.args.get('explain') != '0'
+    
+    def load(cursor):
+        indexes = load_indexes(cursor, database)
+        table_rows = load_table_rows(cursor, database)
+        plans = {}
+        if with_explain:
+            for predicate, query, params in advisor.slow_shapes(database):
+                try:
+                    plans[(predicate.table.lower(), predicate.column.lower())] = explain(
+                        cursor, query, params
+                    )
+                except Error:
+                    # La consulta ya no es válida (por ejemplo, se borró la columna)
+                    continue
+        return indexes, table_rows, plans
+    
+    try:
+        indexes, table_rows, plans = query_catalog(load, database)
+    except Error as e:
+        return jsonify(database_error(e))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
         }), 500
+    result = advisor.advise(database, indexes, table_rows, plans)
+    result['success'] = True
+    return jsonify(result)
+
+@app.route('/api/advisor/stats', methods=['GET'])
+def advisor_stats():
+    """
+    Predicados seguidos por el asesor de índices y los últimos índices
+    creados con /api/advisor/apply
+    """
+    return jsonify(advisor.stats())
+
+@app.route('/api/advisor', methods=['DELETE'])
+def reset_advisor():
+    """Descarta el perfil de predicados y el registro de índices creados"""
+    advisor.reset()
+    return jsonify({'success': True, 'message': 'Asesor reiniciado'})
+
+@app.route('/api/advisor/apply', methods=['POST'])
+def apply_index():
+    """
+    Crea el índice recomendado para {"table", "column"} (y "database",
+    la de la sesión si no se indica)
+    """
+    data = request.json or {}
+    database = data.get('database') or get_session().database
+    try:
+        statement = index_statement(database, data.get('table'), data.get('column'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'Error: {str(e)}'
+        }), 400
+    
+    try:
+        query_catalog(lambda cursor: cursor.execute(statement), database)
+    except Error as e:
+        return jsonify(database_error(e))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    advisor.record_applied(statement)
+    return jsonify({
+        'success': True,
+        'statement': statement,
+        'message': 'Índice creado correctamente'
+    })
+
+@app.route('/api/sandbox', methods=['GET'])
+def sandbox_stats():
+    """Bases de datos y filas del motor en memoria de la sesión"""
+    session = get_session()
+    with session.lock:
+        stats = sandbox_engine(session).stats()
+    path = snapshot_path(session)
+    stats['snapshot'] = path is not None and os.path.exists(path)
+    return jsonify(stats)
+
+@app.route('/api/sandbox/snapshot', methods=['POST'])
+def save_sandbox():
+    """Guarda el motor en memoria de la sesión en SANDBOX_CONFIG['snapshot_dir']"""
+    session = get_session()
+    path = snapshot_path(session)
+    if path is None:
+        return jsonify({
+            'success': False,
+            'error': 'No hay un directorio configurado para las instantáneas'
+        }), 400
+    
+    try:
+        with session.lock:
+            sandbox_engine(session).save(path)
+    except OSError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'Error: {str(e)}'
+        }), 500
+    return jsonify({'success': True, 'message': 'Instantánea guardada'})
+
+@app.route('/api/sandbox', methods=['DELETE'])
+def reset_sandbox():
+    """Vacía el motor en memoria de la sesión y borra su instantánea"""
+    session = get_session()
+    path = snapshot_path(session)
+    with session.lock:
+        session.sandbox = MemoryEngine()
+        if path and os.path.exists(path):
+            os.remove(path)
+    return jsonify({'success': True, 'message': 'Sandbox reiniciado'})
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
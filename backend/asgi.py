@@ -0,0 +1,843 @@
+"""
+Modo de servicio asíncrono (ASGI) del backend.
+
+Expone las mismas rutas /api/* que app.py. Las que esperan a MySQL
+(execute, databases, tables, health) y las de análisis se atienden
+directamente en el bucle de eventos, con aiomysql y un pool asíncrono, de
+modo que un solo proceso atiende cientos de peticiones concurrentes. El
+resto de las rutas se delega a la aplicación Flask en un hilo.
+
+La caché de análisis, los documentos del editor, el catálogo y las
+sesiones se comparten con app.py.
+
+Ejecutar con:  uvicorn asgi:app --port 5000
+Para pruebas sin MySQL:  asgi.pool.connect = FakeMySQL().connect_async
+"""
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from mysql.connector import Error
+import app as wsgi
+from aiopool import AsyncConnectionPool
+from pool import PoolError, ANY_DATABASE
+from lexer import TokenStream
+from executor import (
+    track_database, parameterize, paginate, next_page,
+    RowReader, row_size, rows_result, affected_result, TRANSACTION_STATEMENTS
+)
+from incremental import DocumentError
+from catalog import DATABASES_QUERY, TABLES_QUERY, COLUMNS_QUERY, build_schema
+from serializer import ROW_FORMATS, format_rows, choose_encoding, compress
+from admission import AsyncAdmissionController, AdmissionError, interrupted_result
+import serializer
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+# Errores de la base de datos (aiomysql usa los de PyMySQL)
+DATABASE_ERRORS = (Error, aiomysql.Error) if aiomysql else (Error,)
+
+# Cursor sin buffer que devuelve las filas como tuplas
+CURSOR_CLASSES = (aiomysql.SSCursor,) if aiomysql else ()
+
+# Hilos para las rutas que se delegan a Flask
+WSGI_THREADS = 16
+
+# Rutas de Flask que leen el cuerpo a medida que llega en lugar de recibirlo completo
+STREAMED_ROUTES = {('POST', '/api/import')}
+
+async def create_connection(database=None):
+    """Crea conexión física a MySQL con aiomysql"""
+    if aiomysql is None:
+        raise PoolError("El modo asíncrono requiere aiomysql (pip install aiomysql)")
+    config = wsgi.MYSQL_CONFIG
+    return await aiomysql.connect(
+        host=config['host'],
+        port=config['port'],
+        user=config['user'],
+        password=config['password'],
+        db=database,
+        autocommit=False
+    )
+
+pool = AsyncConnectionPool(create_connection, **wsgi.MYSQL_POOL_CONFIG)
+# Los límites de app.ADMISSION_CONFIG valen por separado para las rutas
+# que se atienden aquí y para las que se delegan a Flask
+admission = AsyncAdmissionController(**wsgi.ADMISSION_CONFIG)
+wsgi_executor = ThreadPoolExecutor(WSGI_THREADS, thread_name_prefix='wsgi')
+
+# Respuesta de un handler que delega la petición a la aplicación Flask
+WSGI_FALLBACK = object()
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = {
+            key: values[-1]
+            for key, values in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()
+        }
+        self.headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])
+        }
+        self.body = body
+
+    @property
+    def json(self):
+        return wsgi.app.json.loads(self.body or b'{}')
+
+def get_session(request):
+    """Sesión de la petición, como app.get_session"""
+    return wsgi.sessions.get(
+        request.headers.get('x-session-id') or wsgi.DEFAULT_SESSION,
+        request.headers.get('x-database') or None
+    )
+
+class Response:
+    """
+    Cuerpo en bytes o iterador (síncrono o asíncrono) de str. on_close es
+    una corrutina que se espera al terminar de enviar un cuerpo iterador.
+    """
+    def __init__(self, body, status=200, content_type='application/json', headers=None):
+        self.body = body
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.on_close = None
+
+def jsonify(data, status=200, headers=None):
+    return Response(serializer.dumps(data), status, headers=headers)
+
+def ndjson_response(items):
+    """Respuesta en streaming con un objeto JSON por línea"""
+    async def generate():
+        async for item in items:
+            yield wsgi.app.json.dumps(item) + '\n'
+    return Response(generate(), content_type='application/x-ndjson')
+
+async def get_connection(database=None):
+    """Obtiene una conexión del pool asíncrono"""
+    try:
+        with wsgi.metrics.timer('acquire'):
+            return await pool.acquire(database)
+    except PoolError as e:
+        raise Exception(e.message)
+    except DATABASE_ERRORS as e:
+        raise Exception(f"No se encontró la base de datos especificada")
+
+class AsyncRowReader(RowReader):
+    """RowReader para cursores de aiomysql"""
+    async def __aiter__(self):
+        while True:
+            rows = await self.cursor.fetchmany(self.chunk_size)
+            if not rows:
+                return
+
+            for index, row in enumerate(rows):
+                size = row_size(row) if self.max_bytes is not None else 0
+                if ((self.max_rows is not None and self.count >= self.max_rows)
+                        or (self.max_bytes is not None and self.bytes + size > self.max_bytes)):
+                    if index:
+                        yield rows[:index]
+                    self.truncated = True
+                    await self.discard()
+                    return
+                self.count += 1
+                self.bytes += size
+
+            yield rows
+
+    async def discard(self):
+        while await self.cursor.fetchmany(self.chunk_size):
+            pass
+
+async def run_statement(cursor, query, params=None, max_rows=None, max_bytes=None):
+    """Ejecuta una sentencia en el cursor dado (sin confirmar la transacción)"""
+    await cursor.execute(query, params)
+
+    if cursor.description is not None:
+        reader = AsyncRowReader(cursor, max_rows, max_bytes)
+        results = [row async for chunk in reader for row in chunk]
+        columns = [column[0] for column in cursor.description]
+        return rows_result(results, reader.truncated, columns)
+
+    return affected_result(cursor.rowcount)
+
+async def execute_query(query, database=None, params=None, statement=None, page=None,
+                        ticket=None):
+    """
+    Ejecuta una consulta SQL. Con params, query lleva %s y aiomysql
+    sustituye los valores escapados (no hay sentencias preparadas del
+    lado del servidor). page limita las filas y ticket el tiempo de
+    ejecución como en app.execute_query.
+    """
+    connection = None
+    cursor = None
+    failed = False
+    limits = {
+        'max_rows': page['limit'] if page else wsgi.RESULT_LIMITS['max_rows'],
+        'max_bytes': wsgi.RESULT_LIMITS['max_bytes']
+    }
+    try:
+        connection = await get_connection(database)
+
+        cursor = connection.cursor(*CURSOR_CLASSES)
+        async with wsgi.watchdog.watch_async(ticket, connection.thread_id()):
+            with wsgi.metrics.timer('execute'):
+                result = await run_statement(cursor, query, params, **limits)
+        if 'data' not in result:
+            await connection.commit()
+        elif page and result.get('truncated'):
+            rows = result['data']
+            result['next'] = next_page(
+                page, len(rows), rows[-1] if rows else None, result['columns']
+            )
+
+        # La conexión vuelve al pool con la base de datos que quedó activa
+        connection.database = track_database(statement, connection.database)
+        return result
+    except DATABASE_ERRORS as e:
+        failed = True
+        if ticket is not None and ticket.reason:
+            return interrupted_result(ticket, e)
+        return {
+            'success': False,
+            'error': str(e),
+            'message': f'Error MySQL: {str(e)}'
+        }
+    finally:
+        if cursor:
+            await cursor.close()
+        if connection:
+            await pool.release(connection, discard=failed and connection.closed)
+
+async def cached_query(query, database, params, statement, page, ticket=None):
+    """execute_query para un SELECT con la caché de resultados de app.cached_query"""
+    result_cache = wsgi.result_cache
+    if not wsgi.RESULT_CACHE_CONFIG['enabled']:
+        return await execute_query(query, database, params, statement, page, ticket)
+
+    key = (database, query, tuple(params or ()))
+    version = result_cache.version(database, statement.table)
+    result = result_cache.get(key, version)
+    if result is not None:
+        return dict(result, cached=True)
+
+    result = await execute_query(query, database, params, statement, page, ticket)
+    if result['success']:
+        result_cache.put(key, result, version)
+    return dict(result, cached=False)
+
+def analysis_response(analysis):
+    """Como app.analysis_response: sin orjson los tokens se serializan por partes"""
+    tokens = analysis['lexical']['tokens']
+    if serializer.FAST or not isinstance(tokens, TokenStream):
+        return jsonify(analysis)
+
+    def generate():
+        yield '{"lexical": {"token_count": %d, "tokens": ' % analysis['lexical']['token_count']
+        yield from tokens.iter_json()
+        yield '}, "syntactic": ' + wsgi.app.json.dumps(analysis['syntactic']) + '}\n'
+
+    return Response(generate())
+
+async def analyze_command(request):
+    """
+    Analiza léxica y sintácticamente un comando SQL
+    """
+    data = request.json
+    sql_command = data.get('query', '')
+
+    if not sql_command:
+        return jsonify({
+            'error': 'No se proporcionó ningún comando'
+        }, 400)
+
+    try:
+        analysis = wsgi.analysis_cache.analyze(sql_command)
+        return analysis_response(analysis)
+    except Exception as e:
+        return jsonify({
+            'error': str(e)
+        }, 500)
+
+async def analyze_incremental(request):
+    """
+    Análisis incremental para el editor (ver app.analyze_incremental)
+    """
+    data = request.json
+    document_id = data.get('document_id')
+
+    if not document_id:
+        return jsonify({
+            'error': 'No se proporcionó el identificador del documento'
+        }, 400)
+
+    if 'query' in data:
+        return jsonify(wsgi.documents.open(document_id, data['query']))
+
+    try:
+        result = wsgi.documents.edit(
+            document_id,
+            data.get('version'),
+            data.get('offset', 0),
+            data.get('removed', 0),
+            data.get('inserted', '')
+        )
+        return jsonify(result)
+    except DocumentError as e:
+        # El cliente debe reenviar el texto completo
+        return jsonify({
+            'error': e.message,
+            'resync': True
+        }, 409)
+
+async def execute_command(request):
+    """
+    Ejecuta un comando SQL después de validarlo
+    """
+    started = time.perf_counter()
+    data = request.json
+    sql_command = data.get('query', '').strip()
+    row_format = data.get('format') or 'objects'
+
+    if not sql_command:
+        return jsonify({
+            'success': False,
+            'error': 'No se proporcionó ningún comando'
+        }, 400)
+    if row_format not in ROW_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f"Formato no válido; debe ser uno de: {', '.join(ROW_FORMATS)}"
+        }, 400)
+
+    try:
+        # Primero analizar el comando
+        analysis, statement = wsgi.analysis_cache.lookup(sql_command)
+
+        # Si hay errores sintácticos, no ejecutar
+        if not analysis['syntactic']['valid']:
+            return jsonify({
+                'success': False,
+                'error': 'Error sintáctico',
+                'analysis': analysis,
+                'message': analysis['syntactic']['message']
+            })
+
+        # Las transacciones y el modo lote usan la conexión fijada a la
+        # sesión, y el sandbox el motor en memoria: los atiende app.py,
+        # que también informa un lote que no se pudo confirmar
+        statement_type = statement.type
+        session = get_session(request)
+        if (statement_type in TRANSACTION_STATEMENTS or data.get('batch')
+                or data.get('sandbox') or session.transaction is not None
+                or session.failed_commit is not None):
+            return WSGI_FALLBACK
+
+        try:
+            ticket = wsgi.read_ticket(data, session, request.headers.get('x-request-id'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'message': f'Error: {str(e)}'
+            }, 400)
+        try:
+            await admission.acquire(session.id)
+        except AdmissionError as e:
+            return jsonify({
+                'success': False,
+                'error': e.message,
+                'message': f'Error: {e.message}',
+                'request_id': ticket.request_id
+            }, 429, {'retry-after': str(e.retry_after)})
+
+        admitted = True
+        try:
+            # Actualizar la base de datos de la sesión si es USE o DROP DATABASE
+            session.database = track_database(statement, session.database)
+
+            # Ejecutar el comando (con literales extraídos como parámetros si se puede)
+            tokens = analysis['lexical']['tokens']
+            prepared = None
+            if wsgi.PREPARED_CONFIG['enabled']:
+                prepared = parameterize(sql_command, statement, tokens)
+            query, params = prepared or (sql_command, None)
+
+            page = None
+            if statement_type == 'SELECT':
+                try:
+                    page = wsgi.read_page(data)
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e),
+                        'message': f'Error: {str(e)}'
+                    }, 400)
+                query, params = paginate(query, params, statement.condition is not None, page)
+
+                if data.get('stream'):
+                    response = stream_select(query, params, page, analysis, session.database, ticket)
+                    # El lugar se libera al terminar de enviar el resultado
+                    response.on_close = lambda: admission.release(session.id)
+                    admitted = False
+                    return response
+
+            run = cached_query if statement_type == 'SELECT' else execute_query
+            executed = time.perf_counter()
+            result = await run(
+                query, session.database, params, statement, page, ticket
+            )
+            wsgi.record_predicate(
+                session.database, statement, time.perf_counter() - executed, result, query, params
+            )
+            metrics = wsgi.metrics
+            metrics.count(statement_type, result['success'])
+            if result['success']:
+                wsgi.catalog.invalidate(statement_type, session.database, statement.database)
+                wsgi.result_cache.invalidate(
+                    statement_type, session.database, statement.table or statement.database
+                )
+                wsgi.completer.record(tokens)
+
+            # Agregar análisis al resultado
+            result = format_rows(result, row_format)
+            result['analysis'] = analysis
+            result['request_id'] = ticket.request_id
+
+            with metrics.timer('serialize'):
+                response = jsonify(result)
+            elapsed = time.perf_counter() - started
+            metrics.observe('total', elapsed)
+            metrics.query_finished(sql_command, statement_type, elapsed, session.database)
+            return response
+        finally:
+            if admitted:
+                await admission.release(session.id)
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'Error: {str(e)}'
+        }, 500)
+
+def stream_select(query, params, page, analysis, database, ticket=None):
+    """
+    Ejecuta un SELECT y envía el resultado por bloques (NDJSON), como
+    app.stream_select
+    """
+    async def run():
+        try:
+            connection = await get_connection(database)
+        except Exception as e:
+            yield {
+                'success': False,
+                'error': str(e),
+                'message': f'Error: {str(e)}'
+            }
+            return
+
+        cursor = None
+        finished = False
+        try:
+            cursor = connection.cursor(*CURSOR_CLASSES)
+            async with wsgi.watchdog.watch_async(ticket, connection.thread_id()):
+                with wsgi.metrics.timer('execute'):
+                    await cursor.execute(query, params)
+
+                columns = [column[0] for column in cursor.description]
+                yield {'columns': columns}
+                limits = wsgi.RESULT_LIMITS
+                reader = AsyncRowReader(
+                    cursor, page['limit'], limits['max_bytes'], limits['chunk_size']
+                )
+                last_row = None
+                async for rows in reader:
+                    last_row = rows[-1]
+                    yield {'rows': rows}
+
+            summary = {
+                'success': True,
+                'row_count': reader.count,
+                'truncated': reader.truncated,
+                'message': f'{reader.count} registros encontrados',
+                'analysis': analysis
+            }
+            if reader.truncated:
+                summary['next'] = next_page(page, reader.count, last_row, columns)
+            finished = True
+            wsgi.metrics.count('SELECT', True)
+            yield summary
+        except DATABASE_ERRORS as e:
+            finished = True
+            wsgi.metrics.count('SELECT', False)
+            if ticket is not None and ticket.reason:
+                yield interrupted_result(ticket, e)
+                return
+            yield {
+                'success': False,
+                'error': str(e),
+                'message': f'Error MySQL: {str(e)}'
+            }
+        finally:
+            if cursor and finished:
+                await cursor.close()
+            # Si el cliente cortó la respuesta quedan filas sin leer: se descarta
+            await pool.release(connection, discard=not finished or connection.closed)
+
+    return ndjson_response(run())
+
+async def query_catalog(query, params=None, database=None):
+    """Filas (dict) de una consulta al catálogo, con una conexión del pool asíncrono"""
+    connection = await get_connection(database)
+    cursor = None
+    failed = False
+    try:
+        cursor = connection.cursor(*CURSOR_CLASSES)
+        await cursor.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in await cursor.fetchall()]
+    except DATABASE_ERRORS:
+        failed = True
+        raise
+    finally:
+        if cursor:
+            await cursor.close()
+        await pool.release(connection, discard=failed and connection.closed)
+
+async def list_databases(request):
+    """
+    Lista todas las bases de datos disponibles
+    """
+    catalog = wsgi.catalog
+    try:
+        databases = catalog.databases()
+        if databases is None:
+            generation = catalog.generation
+            databases = [row['name'] for row in await query_catalog(DATABASES_QUERY, database=ANY_DATABASE)]
+            catalog.store_databases(databases, generation)
+        return jsonify({
+            'success': True,
+            'databases': databases
+        })
+    except DATABASE_ERRORS as e:
+        return jsonify(wsgi.database_error(e))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }, 500)
+
+async def list_tables(request):
+    """
+    Lista todas las tablas de la base de datos actual
+    """
+    current_database = get_session(request).database
+
+    if not current_database:
+        return jsonify({
+            'success': False,
+            'error': 'No hay una base de datos seleccionada'
+        }, 400)
+
+    catalog = wsgi.catalog
+    try:
+        schema = catalog.schema(current_database)
+        if schema is None:
+            generation = catalog.generation
+            params = (current_database,)
+            schema = build_schema(
+                await query_catalog(TABLES_QUERY, params, current_database),
+                await query_catalog(COLUMNS_QUERY, params, current_database)
+            )
+            catalog.store_schema(current_database, schema, generation)
+        result = {
+            'success': True,
+            'tables': list(schema)
+        }
+        if request.args.get('columns') == '1':
+            result['columns'] = schema
+        return jsonify(result)
+    except DATABASE_ERRORS as e:
+        return jsonify(wsgi.database_error(e))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }, 500)
+
+async def health_check(request):
+    """
+    Verifica el estado del servidor y la conexión a MySQL
+    """
+    session = get_session(request)
+    try:
+        connection = await get_connection(ANY_DATABASE)
+        await pool.release(connection)
+        return jsonify({
+            'status': 'ok',
+            'mysql': 'connected',
+            'current_database': session.database,
+            'in_transaction': session.in_transaction
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'mysql': 'disconnected',
+            'error': str(e)
+        }, 500)
+
+async def pool_stats(request):
+    """
+    Estadísticas del pool de conexiones asíncrono
+    """
+    return jsonify(pool.stats())
+
+async def admission_stats(request):
+    """
+    Control de admisión de este modo (y el de Flask) y sentencias vigiladas
+    """
+    return jsonify({
+        'admission': admission.stats(),
+        'wsgi_admission': wsgi.admission.stats(),
+        'watchdog': wsgi.watchdog.stats()
+    })
+
+# Rutas atendidas en el bucle de eventos; las demás van a Flask
+ROUTES = {
+    ('POST', '/api/analyze'): analyze_command,
+    ('POST', '/api/analyze/incremental'): analyze_incremental,
+    ('POST', '/api/execute'): execute_command,
+    ('GET', '/api/databases'): list_databases,
+    ('GET', '/api/tables'): list_tables,
+    ('GET', '/api/health'): health_check,
+    ('GET', '/api/pool'): pool_stats,
+    ('GET', '/api/admission'): admission_stats
+}
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+async def send_response(send, response, accept_encoding=None):
+    """
+    Envía la respuesta; las de cuerpo completo se comprimen como en
+    app.compress_response
+    """
+    body = response.body
+    headers = [
+        (b'content-type', response.content_type.encode('latin-1')),
+        # Igual que flask_cors con su configuración por defecto
+        (b'access-control-allow-origin', b'*')
+    ]
+    config = wsgi.COMPRESSION_CONFIG
+    if isinstance(body, bytes) and config['enabled']:
+        headers.append((b'vary', b'Accept-Encoding'))
+        encoding = choose_encoding(accept_encoding) if len(body) >= config['min_size'] else None
+        if encoding is not None:
+            body = compress(body, encoding, config['level'])
+            headers.append((b'content-encoding', encoding.encode('latin-1')))
+
+    headers.extend(
+        (name.encode('latin-1'), value.encode('latin-1'))
+        for name, value in response.headers.items()
+    )
+
+    await send({
+        'type': 'http.response.start',
+        'status': response.status,
+        'headers': headers
+    })
+    if isinstance(body, bytes):
+        await send({'type': 'http.response.body', 'body': body})
+        return
+
+    try:
+        if hasattr(body, '__aiter__'):
+            async for chunk in body:
+                await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'),
+                            'more_body': True})
+        else:
+            for chunk in body:
+                await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'),
+                            'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(body, 'aclose'):
+            await body.aclose()
+        if response.on_close is not None:
+            await response.on_close()
+
+class ReceiveStream(io.RawIOBase):
+    """
+    Cuerpo de la petición para Flask, leído de receive (desde el hilo de
+    call_wsgi) a medida que Flask lo pide
+    """
+
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.pending = memoryview(b'')
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and not self.finished:
+            message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+            if message['type'] == 'http.disconnect':
+                raise ConnectionError('El cliente cerró la conexión')
+            self.pending = memoryview(message.get('body', b''))
+            self.finished = not message.get('more_body')
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+def wsgi_environ(scope, body):
+    """body son los bytes del cuerpo o un ReceiveStream"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    if isinstance(body, bytes):
+        environ['CONTENT_LENGTH'] = str(len(body))
+        environ['wsgi.input'] = io.BytesIO(body)
+    else:
+        # Sin Content-Length (Transfer-Encoding: chunked) se lee hasta el final
+        environ['wsgi.input'] = io.BufferedReader(body)
+        environ['wsgi.input_terminated'] = True
+    return environ
+
+async def call_wsgi(scope, body, send):
+    """
+    Atiende la petición con la aplicación Flask en un hilo. La respuesta
+    se recorre completa en ese mismo hilo (las respuestas en streaming de
+    Flask dependen del contexto del hilo) y pasa por una cola acotada.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=16)
+    done = object()
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def start_response(status, headers, exc_info=None):
+        put(('start', int(status.split(' ', 1)[0]), headers))
+
+    def run():
+        try:
+            iterable = wsgi.app.wsgi_app(wsgi_environ(scope, body), start_response)
+            try:
+                for chunk in iterable:
+                    if chunk:
+                        put(('body', chunk))
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        finally:
+            put(done)
+
+    worker = loop.run_in_executor(wsgi_executor, run)
+    started = False
+    while True:
+        item = await queue.get()
+        if item is done:
+            break
+        if item[0] == 'start':
+            started = True
+            await send({
+                'type': 'http.response.start',
+                'status': item[1],
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in item[2]
+                ]
+            })
+        else:
+            await send({'type': 'http.response.body', 'body': item[1], 'more_body': True})
+    try:
+        await worker
+    finally:
+        if not started:
+            await send({'type': 'http.response.start', 'status': 500, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await pool.close()
+            wsgi_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    if (scope['method'], scope['path']) in STREAMED_ROUTES:
+        await call_wsgi(scope, ReceiveStream(receive, asyncio.get_running_loop()), send)
+        return
+
+    body = await read_body(receive)
+    handler = ROUTES.get((scope['method'], scope['path']))
+    if handler is None:
+        await call_wsgi(scope, body, send)
+        return
+
+    request = Request(scope, body)
+    try:
+        response = await handler(request)
+    except ValueError:
+        response = jsonify({'error': 'El cuerpo de la petición no es JSON válido'}, 400)
+    if response is WSGI_FALLBACK:
+        await call_wsgi(scope, body, send)
+        return
+    await send_response(send, response, request.headers.get('accept-encoding'))
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=5000)
@@ -0,0 +1,266 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from lexer import FastLexer, Token, TokenType, KEYWORD_TYPES
+from parser import Parser
+
+# Frases sugeridas al comienzo de una sentencia
+STATEMENT_PHRASES = [
+    'CREATE DATABASE', 'CREATE TABLE', 'USE',
+    'INSERT INTO', 'UPDATE', 'DELETE FROM',
+    'DROP DATABASE', 'DROP TABLE',
+    'SELECT', 'SELECT * FROM',
+    'BEGIN', 'COMMIT', 'ROLLBACK'
+]
+
+# Restricciones que se pueden escribir después del tipo de una columna
+COLUMN_OPTIONS = ['PRIMARY KEY', 'NOT NULL', 'AUTO_INCREMENT']
+
+TYPE_TOKENS = (
+    TokenType.INT, TokenType.VARCHAR, TokenType.TEXT,
+    TokenType.DATE, TokenType.FLOAT, TokenType.BOOLEAN
+)
+
+# Tipos de token de palabras clave (PRIMARY, KEY, NOT... son identificadores)
+KEYWORD_TOKENS = frozenset(KEYWORD_TYPES.values()) - {TokenType.IDENTIFIER}
+
+# Después de estos tokens el identificador esperado es una tabla
+TABLE_CONTEXT = (TokenType.FROM, TokenType.INTO, TokenType.UPDATE)
+
+WORD_END = re.compile(r'\w*$')
+
+
+def prefix_tokens(tokens, starts, ends, end):
+    """
+    Tokens de un texto ya tokenizado (tokens con su inicio y fin, sin EOF)
+    que terminan hasta end, más EOF: los mismos que daría FastLexer con
+    el texto hasta end. None si un token cruza end (hay que tokenizar).
+    """
+    count = bisect_right(ends, end)
+    if count < len(starts) and starts[count] < end:
+        return None
+    return [tokens[index] for index in range(count)] + [Token(TokenType.EOF, None, end)]
+
+
+class PrefixIndex:
+    """
+    Palabras ordenadas (sin distinguir mayúsculas) para buscar por prefijo
+    con bisect: cada búsqueda es O(log n) más los resultados recorridos.
+    """
+
+    def __init__(self, words):
+        entries = sorted({word.lower(): word for word in words}.items())
+        self.keys = [key for key, _ in entries]
+        self.words = [word for _, word in entries]
+        self.lookup = dict(entries)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def range(self, prefix):
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+        return start, end
+
+
+class UsageCounter:
+    """Veces que se usó cada palabra en sentencias ejecutadas, también ordenadas por prefijo"""
+
+    def __init__(self, max_words=65536):
+        self.max_words = max_words
+        self.counts = {}
+        self.keys = []
+        self._lock = threading.Lock()
+
+    def record(self, words):
+        with self._lock:
+            for word in words:
+                key = word.lower()
+                if key in self.counts:
+                    self.counts[key] += 1
+                elif len(self.counts) < self.max_words:
+                    self.counts[key] = 1
+                    insort(self.keys, key)
+
+    def count(self, key):
+        return self.counts.get(key, 0)
+
+    def with_prefix(self, prefix):
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+        return self.keys[start:end]
+
+
+class Completer:
+    """
+    Autocompletado según el contexto del cursor.
+
+    El texto hasta el cursor se tokeniza con el Lexer y la sentencia actual
+    se pasa al Parser, que indica qué tipos de token aceptaría a
+    continuación (Parser.expected). Si espera palabras clave se sugieren
+    esas; si espera un identificador, según el token anterior se sugieren
+    tablas (después de FROM, INTO, UPDATE, DROP TABLE), bases de datos
+    (USE, DROP DATABASE) o columnas de la tabla de la sentencia (SET,
+    WHERE, listas de columnas). Los candidatos salen de índices por prefijo
+    y se ordenan por frecuencia de uso y luego alfabéticamente.
+
+    Los nombres vienen del catálogo: databases() y schema() se llaman solo
+    si el contexto los necesita.
+    """
+
+    def __init__(self, limit=10):
+        self.limit = limit
+        self.usage = UsageCounter()
+        self.keywords = PrefixIndex(STATEMENT_PHRASES + COLUMN_OPTIONS + [
+            token_type.value for token_type in KEYWORD_TOKENS
+        ])
+        # Índices construidos a partir de objetos del catálogo: se reutilizan
+        # mientras el catálogo devuelva el mismo objeto
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def complete(self, text, databases=None, schema=None, lexed=None):
+        """
+        Sugerencias para el cursor al final de text. Devuelve también el
+        prefijo que las sugerencias reemplazan y el tipo de contexto.
+        lexed son los (tokens, inicios, fines) de un texto que empieza con
+        text, ya tokenizado, para no volver a tokenizarlo.
+        """
+        prefix = WORD_END.search(text).group()
+        context = text[:len(text) - len(prefix)]
+        result = {'suggestions': [], 'prefix': prefix, 'context': None}
+        if prefix[:1].isdigit():
+            return result
+
+        tokens = prefix_tokens(*lexed, len(context)) if lexed else None
+        if tokens is None:
+            tokens = list(FastLexer(context).tokenize())
+        # Dentro de una cadena (o justo después) no se sugiere nada
+        if len(tokens) > 1 and tokens[-2].type == TokenType.STRING and not context[-1:].isspace():
+            return result
+
+        # Solo la sentencia actual: lo que sigue al último ';'
+        start = 0
+        for index, token in enumerate(tokens):
+            if token.type == TokenType.SEMICOLON:
+                start = index + 1
+        statement = tokens[start:]
+        if len(statement) == 1:
+            result['context'] = 'statement'
+            result['suggestions'] = self.rank(self.keywords, prefix, STATEMENT_PHRASES)
+            return result
+
+        parser = Parser(statement)
+        parser.parse()
+        expected = parser.expected
+
+        kind = self.identifier_context(statement, expected)
+        keywords = [token_type.value for token_type in expected if token_type in KEYWORD_TOKENS]
+        if TokenType.ASTERISK in expected and not prefix:
+            keywords.append('*')
+        if kind == 'column_options':
+            keywords.extend(COLUMN_OPTIONS)
+        if expected & set(TYPE_TOKENS):
+            kind = 'type'
+
+        suggestions = []
+        tables = schema() if schema and kind in ('table', 'column') else None
+        if kind == 'table' and tables:
+            suggestions = self.rank(self.index('tables', tables, tables), prefix)
+        elif kind == 'column' and tables:
+            suggestions = self.complete_columns(statement, prefix, tables)
+        elif kind == 'database':
+            names = databases() if databases else None
+            if names:
+                suggestions = self.rank(self.index('databases', names, names), prefix)
+
+        result['context'] = kind or 'keyword'
+        result['suggestions'] = (suggestions + self.rank(self.keywords, prefix, keywords))[:self.limit]
+        return result
+
+    def identifier_context(self, statement, expected):
+        """Qué clase de nombre va en la posición de un IDENTIFIER esperado"""
+        if TokenType.IDENTIFIER not in expected or TokenType.STRING in expected:
+            # Un valor (o nada): no se sugieren nombres
+            return None
+
+        first = statement[0].type
+        previous = statement[-2].type
+        if previous in TABLE_CONTEXT or (previous == TokenType.TABLE and first == TokenType.DROP):
+            return 'table'
+        if previous == TokenType.USE or (previous == TokenType.DATABASE and first == TokenType.DROP):
+            return 'database'
+        if first == TokenType.CREATE:
+            # Después del tipo (o de otra restricción) van las restricciones;
+            # los nombres nuevos no se sugieren
+            if previous in TYPE_TOKENS or previous in (TokenType.RPAREN, TokenType.IDENTIFIER):
+                return 'column_options'
+            return None
+        return 'column'
+
+    def complete_columns(self, statement, prefix, tables):
+        # La tabla de la sentencia (después de FROM, INTO o UPDATE), si ya se escribió
+        table = None
+        for index in range(len(statement) - 1):
+            if statement[index].type in TABLE_CONTEXT and statement[index + 1].type == TokenType.IDENTIFIER:
+                table = statement[index + 1].value.lower()
+        names = {name.lower(): name for name in tables}
+        if table in names:
+            table = names[table]
+            columns = [column['name'] for column in tables[table]]
+        else:
+            # Todavía sin tabla: columnas de todas las tablas
+            table = None
+            columns = [column['name'] for table_columns in tables.values() for column in table_columns]
+        return self.rank(self.index('columns', tables, columns, table), prefix)
+
+    def index(self, kind, source, words, table=None):
+        """Índice de words, reconstruido solo si cambió el objeto del catálogo (source)"""
+        key = (kind, id(source), table)
+        with self._lock:
+            entry = self._indexes.get(key)
+            if entry is not None and entry[0] is source:
+                return entry[1]
+        index = PrefixIndex(words)
+        with self._lock:
+            self._indexes[key] = (source, index)
+            if len(self._indexes) > 1024:
+                self._indexes.pop(next(iter(self._indexes)))
+        return index
+
+    def rank(self, index, prefix, allowed=None):
+        """
+        Palabras del índice con el prefijo, las más usadas primero. Con
+        allowed solo se consideran esas palabras.
+        """
+        if allowed is not None:
+            # Pocas palabras permitidas: se filtran directamente
+            prefix = prefix.lower()
+            keys = [
+                key for key in {word.lower() for word in allowed}
+                if key.startswith(prefix) and key in index.lookup
+            ]
+        else:
+            start, end = index.range(prefix)
+            if end - start <= 4 * self.limit:
+                keys = index.keys[start:end]
+            else:
+                # Rango grande: las usadas con ese prefijo más las primeras alfabéticamente
+                keys = [key for key in self.usage.with_prefix(prefix) if key in index.lookup]
+                keys += index.keys[start:start + 4 * self.limit]
+
+        ranked = sorted(set(keys), key=lambda key: (-self.score(key), key))
+        return [index.lookup[key] for key in ranked[:self.limit]]
+
+    def score(self, key):
+        # Las frases cuentan por su primera palabra
+        return self.usage.count(key) or self.usage.count(key.split(' ', 1)[0])
+
+    def record(self, tokens):
+        """Cuenta los nombres y palabras clave de una sentencia ejecutada"""
+        self.usage.record(
+            token.value for token in tokens
+            if token.type == TokenType.IDENTIFIER or token.type in KEYWORD_TOKENS
+        )
@@ -0,0 +1,427 @@
+"""
+Benchmarks del analizador y de los endpoints.
+
+Micro-benchmarks de Lexer.tokenize, FastLexer.tokenize, Parser.parse y
+analyze_sql sobre corpus generados (consultas cortas, scripts de INSERT,
+literales enormes, listas de columnas muy largas) y pruebas de carga de
+/api/analyze y /api/execute contra el servidor MySQL falso (fake_mysql),
+con varios clientes concurrentes. sandbox.execute mide la misma mezcla de
+/api/execute directamente en el motor en memoria (sandbox).
+
+Cada benchmark informa operaciones por segundo, MB/s, latencias (p50, p95,
+p99) y el pico de memoria (tracemalloc, en una pasada aparte para no
+afectar los tiempos). Los resultados se pueden guardar como línea base y
+comparar después:
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.15
+
+Con --compare el proceso termina con código 1 si algún benchmark empeoró
+más que el umbral. Antes de medir se comprueba que AnalysisCache da el
+mismo veredicto y el mismo árbol que analyze_statement sin caché, también
+para sentencias cuya forma ya está en caché con otros tipos de literal;
+si no, termina con código 1.
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from lexer import Lexer, FastLexer
+from parser import Parser, analyze_sql, analyze_statement
+from script import iter_statements, analyze_script
+from cache import AnalysisCache
+
+SEED = 58710
+
+# Tamaños de los corpus: completos y con --quick
+SIZES = {
+    'full': {
+        'short': 2000, 'insert_rows': 10000, 'string_bytes': 1024 * 1024,
+        'strings': 5, 'columns': 2000, 'wide': 5, 'requests': 2000
+    },
+    'quick': {
+        'short': 200, 'insert_rows': 1000, 'string_bytes': 64 * 1024,
+        'strings': 3, 'columns': 200, 'wide': 3, 'requests': 200
+    }
+}
+
+NAMES = ['usuarios', 'productos', 'pedidos', 'clientes', 'facturas', 'inventario']
+WORDS = ['ana', 'luis', 'mesa', 'silla', 'lápiz', 'cuaderno', 'norte', 'sur']
+
+
+# Corpus
+
+def short_queries(rng, count):
+    """Sentencias cortas de todos los tipos de la gramática"""
+    templates = [
+        lambda: f"SELECT * FROM {rng.choice(NAMES)};",
+        lambda: f"SELECT id, nombre FROM {rng.choice(NAMES)} WHERE id = {rng.randint(1, 10 ** 6)};",
+        lambda: f"INSERT INTO {rng.choice(NAMES)} (id, nombre, precio) "
+                f"VALUES ({rng.randint(1, 10 ** 6)}, '{rng.choice(WORDS)}', {rng.random() * 100:.2f});",
+        lambda: f"UPDATE {rng.choice(NAMES)} SET nombre = '{rng.choice(WORDS)}' "
+                f"WHERE id = {rng.randint(1, 10 ** 6)};",
+        lambda: f"DELETE FROM {rng.choice(NAMES)} WHERE id = {rng.randint(1, 10 ** 6)};",
+        lambda: f"USE {rng.choice(NAMES)};",
+        lambda: f"CREATE TABLE {rng.choice(NAMES)} (id INT PRIMARY KEY, nombre VARCHAR(50));",
+        lambda: f"DROP TABLE {rng.choice(NAMES)};"
+    ]
+    return [rng.choice(templates)() for _ in range(count)]
+
+
+def insert_script(rng, rows):
+    """Script con un INSERT por fila"""
+    return ''.join(
+        f"INSERT INTO pedidos (id, cliente, total) VALUES "
+        f"({index}, '{rng.choice(WORDS)} {rng.choice(WORDS)}', {rng.random() * 1000:.2f});\n"
+        for index in range(rows)
+    )
+
+
+def long_strings(rng, count, size):
+    """INSERT con un literal de size bytes"""
+    text = ''.join(rng.choice('abcdefghij klmnopqrstuvwxyz') for _ in range(size))
+    return [f"INSERT INTO notas (id, texto) VALUES ({index}, '{text}');" for index in range(count)]
+
+
+def wide_statements(count, columns):
+    """CREATE TABLE, INSERT y SELECT con muchas columnas"""
+    names = [f'columna_{index}' for index in range(columns)]
+    statements = [
+        'CREATE TABLE ancha (' + ', '.join(f'{name} INT' for name in names) + ');',
+        'INSERT INTO ancha (' + ', '.join(names) + ') VALUES ('
+        + ', '.join(str(index) for index in range(columns)) + ');',
+        'SELECT ' + ', '.join(names) + ' FROM ancha WHERE columna_0 = 1;'
+    ]
+    return [statements[index % len(statements)] for index in range(count)]
+
+
+def build_corpora(sizes):
+    rng = random.Random(SEED)
+    script = insert_script(rng, sizes['insert_rows'])
+    return {
+        'short': short_queries(rng, sizes['short']),
+        'insert_script': [statement for _, statement in iter_statements(io.StringIO(script))],
+        'long_strings': long_strings(rng, sizes['strings'], sizes['string_bytes']),
+        'wide_columns': wide_statements(sizes['wide'], sizes['columns'])
+    }, script
+
+
+# Pares con la misma forma salvo el tipo de algún literal: el segundo se
+# analiza con la forma del primero ya en caché
+CACHE_CHECKS = [
+    ("CREATE TABLE t (a VARCHAR(10));", "CREATE TABLE t (a VARCHAR('x'));"),
+    ("CREATE TABLE t (a VARCHAR('x'));", "CREATE TABLE t (a VARCHAR(10));"),
+    ("SELECT * FROM t WHERE a = 1;", "SELECT * FROM t WHERE a = 'x';"),
+    ("INSERT INTO t (a, b) VALUES (1, 'x');", "INSERT INTO t (a, b) VALUES ('x', 1);"),
+    ("UPDATE t SET a = 'x' WHERE b = 2;", "UPDATE t SET a = 2 WHERE b = 'x';")
+]
+
+
+def check_cache(corpora):
+    """Sentencias en que AnalysisCache y analyze_statement no coinciden"""
+    cache = AnalysisCache()
+    statements = [statement for pair in CACHE_CHECKS for statement in pair]
+    statements += corpora['short'] + corpora['wide_columns']
+    mismatches = []
+    for statement in statements:
+        analysis, tree = analyze_statement(statement)
+        try:
+            cached_analysis, cached_tree = cache.lookup(statement)
+        except Exception:
+            mismatches.append(statement)
+            continue
+        if (cached_analysis['syntactic'] != analysis['syntactic']
+                or repr(cached_tree) != repr(tree)):
+            mismatches.append(statement)
+    return mismatches
+
+
+# Medición
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(name, latencies, elapsed, byte_count, peak):
+    latencies.sort()
+    result = {
+        'name': name,
+        'operations': len(latencies),
+        'seconds': elapsed,
+        'ops_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'mb_per_sec': byte_count / elapsed / 1e6 if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000
+    }
+    if peak is not None:
+        result['peak_memory_kb'] = peak / 1024
+    return result
+
+
+def peak_memory(run):
+    """Pico de memoria asignada (bytes) durante run()"""
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(name, function, items, memory=True):
+    """Llama function(item) por cada item, midiendo cada llamada"""
+    clock = time.perf_counter
+    latencies = []
+    started = clock()
+    for item in items:
+        start = clock()
+        function(item)
+        latencies.append(clock() - start)
+    elapsed = clock() - started
+
+    byte_count = sum(len(item) for item in items if isinstance(item, str))
+    peak = None
+    if memory:
+        peak = peak_memory(lambda: [function(item) for item in items])
+    return summarize(name, latencies, elapsed, byte_count, peak)
+
+
+def micro_benchmarks(corpora, script, memory=True):
+    results = []
+    for corpus, statements in corpora.items():
+        tokens = [FastLexer(statement).tokenize() for statement in statements]
+        results.append(measure(
+            f'lexer.reference.{corpus}', lambda text: Lexer(text).tokenize(), statements, memory
+        ))
+        results.append(measure(
+            f'lexer.fast.{corpus}', lambda text: FastLexer(text).tokenize(), statements, memory
+        ))
+        results.append(measure(
+            f'parser.{corpus}', lambda statement_tokens: Parser(statement_tokens).parse(), tokens, memory
+        ))
+        results.append(measure(f'analyze_sql.{corpus}', analyze_sql, statements, memory))
+
+    # El script completo: un solo texto que se separa y analiza por sentencias
+    results.append(measure(
+        'script.lexer.fast', lambda text: FastLexer(text).tokenize(), [script], memory
+    ))
+    results.append(measure(
+        'script.analyze',
+        lambda text: sum(1 for _ in analyze_script(iter_statements(io.StringIO(text)))),
+        [script], memory
+    ))
+    return results
+
+
+def sandbox_benchmark(sizes, memory=True, rows=1000):
+    """La mezcla de lecturas y escrituras de /api/execute en el motor en memoria"""
+    import sandbox
+
+    engine = sandbox.MemoryEngine()
+    for query in ['CREATE DATABASE bench;', 'USE bench;',
+                  'CREATE TABLE productos (id INT PRIMARY KEY, nombre VARCHAR(50), precio FLOAT);']:
+        engine.execute(analyze_statement(query)[1])
+    for index in range(rows):
+        engine.execute(analyze_statement(
+            f"INSERT INTO productos (id, nombre, precio) VALUES ({index}, 'producto {index}', {index % 97}.5);"
+        )[1])
+
+    rng = random.Random(SEED)
+    statements = [
+        analyze_statement(execute_workload(rng, rows))[1] for _ in range(sizes['requests'] * 10)
+    ]
+    return measure('sandbox.execute', lambda statement: sandbox.run(engine, statement), statements, memory)
+
+
+# Pruebas de carga
+
+def setup_server(latency, rows=1000):
+    """Servidor falso con la base de datos 'bench' y una tabla con filas"""
+    import app
+    from fake_mysql import FakeMySQL
+
+    server = FakeMySQL(latency)
+    app.pool.connect = server.connect
+    connection = server.connect()
+    cursor = connection.cursor()
+    cursor.execute('CREATE DATABASE bench')
+    cursor.execute('USE bench')
+    cursor.execute('CREATE TABLE productos (id INT PRIMARY KEY, nombre VARCHAR(50), precio FLOAT)')
+    for start in range(0, rows, 500):
+        values = ', '.join(
+            f"({index}, 'producto {index}', {index % 97}.5)"
+            for index in range(start, min(rows, start + 500))
+        )
+        cursor.execute(f'INSERT INTO productos (id, nombre, precio) VALUES {values}')
+    connection.commit()
+    connection.close()
+    return app, rows
+
+
+def execute_workload(rng, rows):
+    """Mezcla de lecturas y escrituras para /api/execute"""
+    kind = rng.random()
+    key = rng.randrange(rows)
+    if kind < 0.7:
+        return f'SELECT * FROM productos WHERE id = {key};'
+    if kind < 0.9:
+        return f"UPDATE productos SET precio = {rng.random() * 100:.2f} WHERE id = {key};"
+    return f"INSERT INTO productos (id, nombre, precio) VALUES ({rows + rng.randrange(10 ** 9)}, 'nuevo', 1.0);"
+
+
+def load_test(name, app, path, queries, concurrency, memory=True):
+    """
+    Envía las consultas a path desde concurrency clientes (hilos con su
+    propio cliente de prueba de Flask y su propia sesión)
+    """
+    local = threading.local()
+
+    def send(item):
+        index, query = item
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.app.test_client()
+        start = time.perf_counter()
+        response = client.post(path, json={'query': query}, headers={
+            'X-Session-Id': f'bench-{threading.get_ident()}',
+            'X-Database': 'bench'
+        })
+        response.get_data()
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} respondió {response.status_code}: {response.get_data(as_text=True)}')
+        return elapsed
+
+    def run(items):
+        with ThreadPoolExecutor(concurrency) as executor:
+            return list(executor.map(send, items))
+
+    items = list(enumerate(queries))
+    started = time.perf_counter()
+    latencies = run(items)
+    elapsed = time.perf_counter() - started
+
+    peak = None
+    if memory:
+        peak = peak_memory(lambda: run(items[:max(1, len(items) // 5)]))
+    byte_count = sum(len(query) for query in queries)
+    result = summarize(name, latencies, elapsed, byte_count, peak)
+    result['concurrency'] = concurrency
+    return result
+
+
+def load_tests(sizes, concurrency, latency, memory=True):
+    app, rows = setup_server(latency)
+    # Las métricas no deben cambiar los tiempos de la prueba
+    app.metrics.enabled = False
+    rng = random.Random(SEED)
+    requests = sizes['requests']
+
+    analyze_queries = short_queries(rng, requests)
+    execute_queries = [execute_workload(rng, rows) for _ in range(requests)]
+    return [
+        load_test('load.analyze', app, '/api/analyze', analyze_queries, concurrency, memory),
+        load_test('load.execute', app, '/api/execute', execute_queries, concurrency, memory)
+    ]
+
+
+# Línea base
+
+def compare(results, baseline, threshold):
+    """
+    Benchmarks que empeoraron más que threshold (fracción) en throughput
+    o en p95 respecto de la línea base
+    """
+    previous = {result['name']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(result['name'])
+        if old is None:
+            continue
+        throughput = result['ops_per_sec'] / old['ops_per_sec'] - 1 if old['ops_per_sec'] else 0.0
+        latency = result['p95_ms'] / old['p95_ms'] - 1 if old['p95_ms'] else 0.0
+        result['change'] = {'ops_per_sec': throughput, 'p95_ms': latency}
+        if throughput < -threshold or latency > threshold:
+            regressions.append(result['name'])
+    return regressions
+
+
+def print_results(results, stream=sys.stdout):
+    header = f"{'benchmark':<32} {'ops/s':>11} {'MB/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'pico KB':>10} {'Δ ops/s':>9}"
+    print(header, file=stream)
+    print('-' * len(header), file=stream)
+    for result in results:
+        change = result.get('change')
+        delta = f"{change['ops_per_sec'] * 100:+.1f}%" if change else ''
+        peak = result.get('peak_memory_kb')
+        peak = f'{peak:.1f}' if peak is not None else ''
+        print(
+            f"{result['name']:<32} {result['ops_per_sec']:>11.1f} {result['mb_per_sec']:>8.2f} "
+            f"{result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} {result['p99_ms']:>9.3f} "
+            f"{peak:>10} {delta:>9}",
+            file=stream
+        )
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description='Benchmarks del analizador SQL y de los endpoints')
+    arguments.add_argument('--quick', action='store_true', help='corpus y cargas reducidos')
+    arguments.add_argument('--only', choices=['micro', 'load'], help='ejecutar solo un grupo')
+    arguments.add_argument('--concurrency', type=int, default=8, help='clientes simultáneos en las pruebas de carga')
+    arguments.add_argument('--latency', type=float, default=0.001, help='latencia simulada de MySQL (segundos)')
+    arguments.add_argument('--no-memory', action='store_true', help='omitir la medición de memoria')
+    arguments.add_argument('--save', metavar='ARCHIVO', help='guardar los resultados como línea base')
+    arguments.add_argument('--compare', metavar='ARCHIVO', help='comparar con una línea base guardada')
+    arguments.add_argument('--threshold', type=float, default=0.1, help='empeoramiento tolerado (fracción)')
+    options = arguments.parse_args(argv)
+
+    sizes = SIZES['quick' if options.quick else 'full']
+    memory = not options.no_memory
+    results = []
+    if options.only != 'load':
+        corpora, script = build_corpora(sizes)
+        mismatches = check_cache(corpora)
+        if mismatches:
+            print('AnalysisCache no coincide con el análisis sin caché en: '
+                  + ', '.join(statement[:80] for statement in mismatches))
+            return 1
+        results += micro_benchmarks(corpora, script, memory)
+        results.append(sandbox_benchmark(sizes, memory))
+    if options.only != 'micro':
+        results += load_tests(sizes, options.concurrency, options.latency, memory)
+
+    regressions = []
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), options.threshold)
+
+    print_results(results)
+
+    if options.save:
+        with open(options.save, 'w', encoding='utf-8') as baseline_file:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'sizes': 'quick' if options.quick else 'full',
+                'time': time.time(),
+                'results': results
+            }, baseline_file, indent=2)
+        print(f'\nLínea base guardada en {options.save}')
+
+    if regressions:
+        print(f'\nEmpeoraron más de {options.threshold:.0%}: ' + ', '.join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Importación masiva de CSV/TSV a una tabla.
+
+Las filas se leen del flujo de la petición a medida que llegan (csv sobre
+un TextIOWrapper, sin leer el archivo completo) y se cargan por partes de
+chunk_rows filas, cada una en su propia transacción: con LOAD DATA LOCAL
+INFILE desde un archivo temporal por parte o, si el cliente o el servidor
+no lo permiten, con executemany de INSERT IGNORE en lotes de batch_size.
+Como LOAD DATA LOCAL, se omiten las filas con clave duplicada (skipped) y
+los campos vacíos se cargan como NULL.
+"""
+import csv
+import io
+import itertools
+import os
+import time
+
+from mysql.connector import Error
+
+FORMATS = {'csv': ',', 'tsv': '\t'}
+
+METHODS = ('auto', 'load', 'insert')
+
+# Errores de LOAD DATA LOCAL desactivado en el servidor (1148, 3948) o
+# rechazado por el cliente (2068)
+LOCAL_INFILE_ERRORS = (1148, 2068, 3948)
+
+
+class BulkLoadError(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+class CountingReader(io.RawIOBase):
+    """Flujo binario que cuenta los bytes leídos, para el progreso"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.count += size
+        return size
+
+
+def open_rows(stream, format):
+    """Lector csv del flujo binario y el contador de bytes leídos"""
+    if format not in FORMATS:
+        raise BulkLoadError(f'Formato no soportado: {format}')
+    counter = CountingReader(stream)
+    text = io.TextIOWrapper(io.BufferedReader(counter), encoding='utf-8-sig', newline='')
+    return csv.reader(text, delimiter=FORMATS[format]), counter
+
+
+def read_header(reader, columns):
+    """
+    Valida la primera fila contra las columnas de la tabla (sin distinguir
+    mayúsculas) y devuelve sus nombres tal como están en la tabla
+    """
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise BulkLoadError('El archivo está vacío')
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise BulkLoadError(f'Encabezado no válido: {e}')
+
+    names = {column.lower(): column for column in columns}
+    result = []
+    unknown = []
+    for name in header:
+        column = names.get(name.strip().lower())
+        if column is None:
+            unknown.append(name)
+        elif column in result:
+            raise BulkLoadError(f'Columna repetida en el encabezado: {name}')
+        else:
+            result.append(column)
+    if unknown:
+        raise BulkLoadError(f'Columnas que no existen en la tabla: {", ".join(unknown)}')
+    return result
+
+
+def read_rows(reader, width):
+    """Filas como tuplas ('' es NULL); BulkLoadError con la línea si no tienen width campos"""
+    try:
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != width:
+                raise BulkLoadError(
+                    f'La línea {reader.line_num} tiene {len(row)} campos; se esperaban {width}'
+                )
+            yield tuple(None if value == '' else value for value in row)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise BulkLoadError(f'Línea {reader.line_num}: {e}')
+
+
+def data_line(row):
+    """Línea de un archivo para LOAD DATA: valores entre comillas, NULL sin ellas"""
+    return ','.join(
+        'NULL' if value is None else '"' + value.replace('"', '""') + '"'
+        for value in row
+    ) + '\n'
+
+
+def quote_name(name):
+    return '`' + name.replace('`', '``') + '`'
+
+
+def load_statement(database, table, columns):
+    """LOAD DATA LOCAL INFILE para los archivos de data_line (la ruta va como parámetro)"""
+    return (
+        f'LOAD DATA LOCAL INFILE %s INTO TABLE {quote_name(database)}.{quote_name(table)} '
+        "CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+        "ESCAPED BY '' LINES TERMINATED BY '\\n' "
+        f'({", ".join(quote_name(column) for column in columns)})'
+    )
+
+
+def insert_statement(database, table, columns):
+    return (
+        f'INSERT IGNORE INTO {quote_name(database)}.{quote_name(table)} '
+        f'({", ".join(quote_name(column) for column in columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))})'
+    )
+
+
+class BulkLoader:
+    """
+    Carga filas en una tabla por partes con la conexión dada (se hace
+    commit de cada una). directory es donde se escriben los archivos de
+    LOAD DATA: la conexión debe permitirlo (allow_local_infile_in_path).
+    """
+
+    def __init__(self, connection, database, table, columns, directory,
+                 method='auto', chunk_rows=50000, batch_size=1000):
+        if method not in METHODS:
+            raise BulkLoadError(f'Método no soportado: {method}')
+        self.connection = connection
+        self.database = database
+        self.table = table
+        self.columns = columns
+        self.directory = directory
+        self.method = method
+        self.chunk_rows = chunk_rows
+        self.batch_size = batch_size
+
+        self.rows = 0
+        self.skipped = 0
+        self.chunks = 0
+        self.started = None
+
+    def choose_method(self):
+        """Con 'auto', prueba LOAD DATA con un archivo vacío y si no se permite usa INSERT"""
+        if self.method != 'auto':
+            return
+        path = os.path.join(self.directory, 'probe.csv')
+        open(path, 'w').close()
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(load_statement(self.database, self.table, self.columns), (path,))
+            self.method = 'load'
+        except Error as e:
+            if e.errno not in LOCAL_INFILE_ERRORS:
+                raise
+            self.method = 'insert'
+        finally:
+            cursor.close()
+            self.connection.rollback()
+            os.remove(path)
+
+    def run(self, rows):
+        """Carga las filas; genera el progreso después de cada parte"""
+        self.choose_method()
+        self.started = time.perf_counter()
+        rows = iter(rows)
+        load = self.load_chunk if self.method == 'load' else self.insert_chunk
+        cursor = self.connection.cursor()
+        try:
+            while True:
+                count, inserted = load(cursor, itertools.islice(rows, self.chunk_rows))
+                if not count:
+                    return
+                self.connection.commit()
+                self.rows += inserted
+                self.skipped += count - inserted
+                self.chunks += 1
+                yield self.progress()
+                if count < self.chunk_rows:
+                    return
+        except BaseException:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def load_chunk(self, cursor, rows):
+        path = os.path.join(self.directory, f'chunk-{self.chunks}.csv')
+        try:
+            count = 0
+            with open(path, 'w', encoding='utf-8', newline='') as target:
+                for row in rows:
+                    target.write(data_line(row))
+                    count += 1
+            if count:
+                cursor.execute(load_statement(self.database, self.table, self.columns), (path,))
+            return count, max(cursor.rowcount, 0) if count else 0
+        finally:
+            os.remove(path)
+
+    def insert_chunk(self, cursor, rows):
+        query = insert_statement(self.database, self.table, self.columns)
+        count = 0
+        inserted = 0
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return count, inserted
+            cursor.executemany(query, batch)
+            count += len(batch)
+            inserted += max(cursor.rowcount, 0)
+
+    def progress(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'rows': self.rows,
+            'skipped': self.skipped,
+            'chunks': self.chunks,
+            'method': self.method,
+            'elapsed': elapsed,
+            'rows_per_second': self.rows / elapsed if elapsed > 0 else 0.0
+        }
@@ -0,0 +1,293 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from lexer import FastLexer, TokenStream, TokenType
+from parser import Parser
+from metrics import Metrics
+
+
+class LRUCache:
+    """
+    Caché LRU acotada por número de entradas y por memoria aproximada.
+    sizeof(key, value) estima los bytes de cada entrada.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda key, value: sys.getsizeof(key) + sys.getsizeof(value))
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+# Cada tipo de literal tiene su marcador: VARCHAR(10) y VARCHAR('x') no
+# tienen la misma forma
+LITERAL_PLACEHOLDERS = {TokenType.STRING: '?s', TokenType.NUMBER: '?n'}
+
+
+def normalize_sql(tokens):
+    """
+    Forma normalizada de una sentencia a partir de sus tokens: un espacio
+    entre tokens y los literales reemplazados por el marcador de su tipo,
+    de modo que WHERE id = 1 y WHERE id = 2 tienen la misma forma.
+    """
+    return ' '.join(
+        LITERAL_PLACEHOLDERS.get(token.type, token.value)
+        for token in tokens if token.type != TokenType.EOF
+    )
+
+
+def analysis_size(key, entry):
+    tokens = entry[0]['lexical']['tokens']
+    if isinstance(tokens, TokenStream):
+        # Texto en mayúsculas más 9 bytes por token en las columnas
+        return 2 * sys.getsizeof(key) + 9 * len(tokens)
+    # Lista de dicts: ~200 bytes por token
+    return sys.getsizeof(key) + 200 * len(tokens)
+
+
+class AnalysisCache:
+    """
+    Caché delante de analyze_sql con dos niveles:
+
+    - por texto exacto: la consulta repetida (p. ej. /api/analyze seguido de
+      /api/execute) no se vuelve a analizar;
+    - por forma normalizada (normalize_sql): consultas que solo difieren en
+      literales o espacios se tokenizan, pero reutilizan el resultado del
+      parser. Solo se guardan aquí resultados válidos, que no dependen de
+      posiciones.
+
+    Las entradas devueltas se comparten y no deben modificarse. Con
+    metrics se mide el tiempo de las etapas lex y parse (los aciertos no
+    pasan por ellas).
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, max_shapes=4096,
+                 metrics=None):
+        self.queries = LRUCache(max_entries, max_bytes, sizeof=analysis_size)
+        self.shapes = LRUCache(max_shapes, max_bytes)
+        self.metrics = metrics or Metrics(enabled=False)
+
+    def analyze(self, sql_command):
+        return self.lookup(sql_command)[0]
+
+    def lookup(self, sql_command):
+        """
+        Devuelve (análisis, árbol de la sentencia): el sqlast.Statement con
+        los nombres y valores de esta consulta, o None si no es válida
+        """
+        entry = self.queries.get(sql_command)
+        if entry is not None:
+            return entry
+
+        lexer = FastLexer(sql_command)
+        with self.metrics.timer('lex'):
+            tokens = lexer.tokenize()
+
+        # Un símbolo desconocido '?' se confundiría con un marcador de literal;
+        # esas sentencias nunca son válidas, así que no usan este nivel
+        shape = None
+        if all(token.type != TokenType.UNKNOWN for token in tokens):
+            shape = normalize_sql(tokens)
+
+        # El resultado y la plantilla del árbol dependen solo de la forma;
+        # los nombres y valores se toman de los tokens de esta consulta
+        parsed = self.shapes.get(shape) if shape is not None else None
+        statement = None
+        if parsed is not None and parsed[1] is not None:
+            # Si los tipos de los tokens no coinciden con la plantilla se analiza completa
+            statement = parsed[1].bind(tokens, sql_command)
+            if statement is None:
+                parsed = None
+        if parsed is None:
+            parser = Parser(tokens)
+            with self.metrics.timer('parse'):
+                parsed = (parser.parse(), parser.statement)
+            if parsed[0]['valid'] and shape is not None:
+                self.shapes.put(shape, parsed)
+            if parser.statement is not None:
+                statement = parser.statement.bind(tokens, sql_command)
+        parse_result = parsed[0]
+
+        analysis = {
+            'lexical': {
+                'tokens': lexer.compact_tokens_info(),
+                'token_count': len(tokens) - 1
+            },
+            'syntactic': parse_result
+        }
+        entry = (analysis, statement)
+        self.queries.put(sql_command, entry)
+        return entry
+
+    def stats(self):
+        return {
+            'queries': self.queries.stats(),
+            'shapes': self.shapes.stats()
+        }
+
+    def clear(self):
+        self.queries.clear()
+        self.shapes.clear()
+
+
+# Sentencias que cambian las filas de su tabla o la eliminan
+TABLE_WRITES = ('INSERT', 'UPDATE', 'DELETE', 'CREATE_TABLE', 'DROP_TABLE')
+DATABASE_WRITES = ('CREATE_DATABASE', 'DROP_DATABASE')
+
+
+def result_size(key, entry):
+    result = entry[0]
+    rows = result.get('data') or []
+    # ~60 bytes por valor de las filas más el texto de la consulta
+    return sys.getsizeof(key[1]) + 200 + sum(60 * len(row) for row in rows)
+
+
+class ResultCache:
+    """
+    Caché de resultados de SELECT por (base de datos, consulta parametrizada,
+    parámetros), acotada por memoria con LRU y con vencimiento por entrada.
+
+    Cada entrada guarda la versión de su tabla al momento de ejecutarse:
+    (generación global, de la base de datos, de la tabla). Las escrituras
+    que ve este servidor incrementan la generación de la tabla (o de la
+    base de datos), así que invalidar es O(1) y un resultado leído antes de
+    una escritura concurrente nunca queda vigente. Los cambios hechos desde
+    otros clientes se ven al vencer la entrada (ttl).
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=32 * 1024 * 1024, ttl=30):
+        self.entries = LRUCache(max_entries, max_bytes, sizeof=result_size)
+        self.ttl = ttl
+        self.generation = 0
+        self._databases = {}
+        self._tables = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def version(self, database, table):
+        """Versión actual de la tabla; se toma antes de ejecutar la consulta"""
+        database = (database or '').lower()
+        with self._lock:
+            return (
+                self.generation,
+                self._databases.get(database, 0),
+                self._tables.get((database, table.lower()), 0)
+            )
+
+    def get(self, key, version):
+        entry = self.entries.get(key)
+        if entry is not None:
+            result, entry_version, expires = entry
+            if entry_version == version and time.monotonic() < expires:
+                self.hits += 1
+                return result
+            self.entries.pop(key)
+        self.misses += 1
+        return None
+
+    def put(self, key, result, version, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self.entries.put(key, (result, version, expires))
+
+    def invalidate(self, statement_type, database=None, name=None):
+        """
+        Invalida según la sentencia ejecutada: name es la tabla (o la base
+        de datos en CREATE/DROP DATABASE) y database la base de datos activa
+        """
+        if statement_type in TABLE_WRITES:
+            key = ((database or '').lower(), (name or '').lower())
+            with self._lock:
+                self._tables[key] = self._tables.get(key, 0) + 1
+        elif statement_type in DATABASE_WRITES:
+            key = (name or '').lower()
+            with self._lock:
+                self._databases[key] = self._databases.get(key, 0) + 1
+        else:
+            return False
+        self.invalidations += 1
+        return True
+
+    def clear(self):
+        """Invalida todo (p. ej. después de un script, sin tablas conocidas)"""
+        with self._lock:
+            self.generation += 1
+        self.entries.clear()
+        self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = self.entries.stats()
+        stats.update({
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        })
+        return stats
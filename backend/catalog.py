@@ -0,0 +1,139 @@
+import threading
+import time
+
+# Consultas para cargar el catálogo (las mismas en el modo síncrono y el asíncrono)
+DATABASES_QUERY = (
+    "SELECT SCHEMA_NAME AS name FROM INFORMATION_SCHEMA.SCHEMATA ORDER BY SCHEMA_NAME"
+)
+TABLES_QUERY = (
+    "SELECT TABLE_NAME AS name FROM INFORMATION_SCHEMA.TABLES "
+    "WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME"
+)
+COLUMNS_QUERY = (
+    "SELECT TABLE_NAME AS table_name, COLUMN_NAME AS name, COLUMN_TYPE AS type "
+    "FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = %s "
+    "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+)
+
+# Sentencias que cambian el catálogo
+DATABASE_STATEMENTS = ('CREATE_DATABASE', 'DROP_DATABASE')
+TABLE_STATEMENTS = ('CREATE_TABLE', 'DROP_TABLE')
+
+
+def build_schema(table_rows, column_rows):
+    """Tablas de una base de datos con sus columnas, a partir de las filas cargadas"""
+    schema = {row['name']: [] for row in table_rows}
+    for row in column_rows:
+        schema.setdefault(row['table_name'], []).append({
+            'name': row['name'],
+            'type': row['type']
+        })
+    return schema
+
+
+def load_databases(cursor):
+    cursor.execute(DATABASES_QUERY)
+    return [row['name'] for row in cursor.fetchall()]
+
+
+def load_schema(cursor, database):
+    cursor.execute(TABLES_QUERY, (database,))
+    tables = cursor.fetchall()
+    cursor.execute(COLUMNS_QUERY, (database,))
+    return build_schema(tables, cursor.fetchall())
+
+
+class SchemaCatalog:
+    """
+    Caché del catálogo: lista de bases de datos y, por base de datos, sus
+    tablas con columnas y tipos (de INFORMATION_SCHEMA).
+
+    Las entradas vencen después de ttl segundos (por cambios hechos desde
+    otros clientes) y se invalidan al ejecutar DDL según el tipo de
+    sentencia del parser. Los nombres se comparan sin distinguir mayúsculas.
+
+    La carga la hace quien llama: databases()/schema() devuelven None si no
+    hay datos vigentes, y store_*() guarda lo cargado solo si no hubo una
+    invalidación mientras tanto (generation).
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._databases = None
+        self._schemas = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def databases(self):
+        with self._lock:
+            return self._get(self._databases)
+
+    def schema(self, database):
+        """Tablas de la base de datos: {tabla: [{'name', 'type'}, ...]}"""
+        with self._lock:
+            return self._get(self._schemas.get(database.lower()))
+
+    def store_databases(self, databases, generation):
+        with self._lock:
+            if generation == self.generation:
+                self._databases = (databases, time.monotonic())
+
+    def store_schema(self, database, schema, generation):
+        with self._lock:
+            if generation == self.generation:
+                self._schemas[database.lower()] = (schema, time.monotonic())
+
+    def invalidate(self, statement_type, database=None, name=None):
+        """
+        Invalida lo que cambia con la sentencia ejecutada. database es la base
+        de datos activa y name el nombre de la base de datos o tabla afectada;
+        si no se conocen se invalida de más.
+        """
+        if statement_type not in DATABASE_STATEMENTS + TABLE_STATEMENTS:
+            return False
+
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            if statement_type in DATABASE_STATEMENTS:
+                self._databases = None
+                if statement_type == 'DROP_DATABASE':
+                    if name:
+                        self._schemas.pop(name.lower(), None)
+                    else:
+                        self._schemas.clear()
+            elif database:
+                self._schemas.pop(database.lower(), None)
+            else:
+                self._schemas.clear()
+        return True
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._databases = None
+            self._schemas.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'databases_cached': self._databases is not None,
+                'schemas': len(self._schemas),
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def _get(self, entry):
+        if entry is not None and time.monotonic() - entry[1] <= self.ttl:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
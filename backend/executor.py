@@ -0,0 +1,577 @@
+import threading
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from mysql.connector import Error
+from lexer import TokenStream, TokenType
+from parser import analyze_statement
+
+
+def track_database(statement, current_database):
+    """
+    Devuelve la base de datos activa después de un USE o DROP DATABASE
+    (statement es el sqlast.Statement de la sentencia, o None)
+    """
+    if statement is None:
+        return current_database
+
+    if statement.type == 'USE':
+        return statement.database
+
+    # Si se elimina la base de datos actual, limpiarla
+    if statement.type == 'DROP_DATABASE':
+        if current_database and current_database.upper() == statement.database.upper():
+            return None
+
+    return current_database
+
+
+def row_size(row):
+    """Tamaño aproximado de una fila serializada, en bytes"""
+    values = row.values() if isinstance(row, dict) else row
+    return sum(len(str(value)) + 8 for value in values)
+
+
+class RowReader:
+    """
+    Lee el resultado del cursor por bloques de chunk_size filas sin
+    superar max_rows filas ni max_bytes bytes (estimados). Si se alcanza un
+    límite y quedan filas, se descartan del cursor y truncated queda activo.
+    """
+
+    def __init__(self, cursor, max_rows=None, max_bytes=None, chunk_size=500):
+        self.cursor = cursor
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.bytes = 0
+        self.truncated = False
+
+    def __iter__(self):
+        while True:
+            rows = self.cursor.fetchmany(self.chunk_size)
+            if not rows:
+                return
+
+            for index, row in enumerate(rows):
+                size = row_size(row) if self.max_bytes is not None else 0
+                if ((self.max_rows is not None and self.count >= self.max_rows)
+                        or (self.max_bytes is not None and self.bytes + size > self.max_bytes)):
+                    if index:
+                        yield rows[:index]
+                    self.truncated = True
+                    self.discard()
+                    return
+                self.count += 1
+                self.bytes += size
+
+            yield rows
+
+    def discard(self):
+        # El resto del resultado se lee y se descarta para liberar la conexión
+        while self.cursor.fetchmany(self.chunk_size):
+            pass
+
+
+def rows_result(results, truncated=False, columns=()):
+    """
+    Resultado de un SELECT: las filas (tuplas) en data y sus nombres una
+    sola vez en columns (ver serializer.format_rows)
+    """
+    result = {
+        'success': True,
+        'columns': list(columns),
+        'data': results,
+        'message': f'{len(results)} registros encontrados'
+    }
+    if truncated:
+        result['truncated'] = True
+        result['message'] += ' (hay más resultados)'
+    return result
+
+
+def affected_result(affected_rows):
+    return {
+        'success': True,
+        'affected_rows': affected_rows,
+        'message': f'Comando ejecutado correctamente. Filas afectadas: {affected_rows}'
+    }
+
+
+def run_statement(cursor, query, params=None, max_rows=None, max_bytes=None):
+    """Ejecuta una sentencia en el cursor dado (sin confirmar la transacción)"""
+    cursor.execute(query, params)
+
+    if cursor.with_rows:
+        reader = RowReader(cursor, max_rows, max_bytes)
+        results = [row for chunk in reader for row in chunk]
+        return rows_result(results, reader.truncated, cursor.column_names)
+
+    return affected_result(cursor.rowcount)
+
+
+# Marca de "este literal no se puede pasar como parámetro"
+NOT_BINDABLE = object()
+
+
+def literal_param(token_type, value):
+    """
+    Valor de Python equivalente a un literal, o NOT_BINDABLE si pasarlo
+    como parámetro cambiaría su significado
+    """
+    if token_type == TokenType.STRING:
+        # MySQL interpreta '\\' como escape dentro del literal
+        return NOT_BINDABLE if '\\' in value else value
+    if token_type == TokenType.NUMBER:
+        try:
+            return int(value) if '.' not in value else Decimal(value)
+        except (ValueError, InvalidOperation):
+            return NOT_BINDABLE
+    return NOT_BINDABLE
+
+
+def closed_string(raw):
+    """Si el texto de un literal de cadena termina con su comilla de apertura"""
+    # El lexer no tiene escapes: una cadena sin la comilla de cierre llega
+    # hasta el final de la sentencia y no es un literal completo
+    return len(raw) >= 2 and raw[-1] == raw[0]
+
+
+def insert_params(values, statement):
+    """
+    Convierte los tokens de valores de un INSERT (del texto statement) en
+    parámetros para executemany. Devuelve None si algún valor no se puede
+    pasar como parámetro sin cambiar su significado.
+    """
+    params = []
+    for token in values:
+        if token.type == TokenType.IDENTIFIER and token.value == 'NULL':
+            params.append(None)
+            continue
+        if token.type == TokenType.STRING:
+            # La posición es el final del literal; una cadena sin cerrar
+            # llega hasta el final de la sentencia
+            end = token.position
+            if end >= len(statement) or not closed_string(
+                    statement[end - len(token.value) - 2:end]):
+                return None
+        param = literal_param(token.type, token.value)
+        if param is NOT_BINDABLE:
+            return None
+        params.append(param)
+    return params
+
+
+PARAMETERIZABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK')
+
+TRANSACTION_MESSAGES = {
+    'BEGIN': 'Transacción iniciada',
+    'COMMIT': 'Transacción confirmada',
+    'ROLLBACK': 'Transacción deshecha'
+}
+
+
+def paginate(query, params, has_where, page):
+    """
+    Agrega a un SELECT (la gramática no admite ORDER BY ni LIMIT) la
+    paginación por clave (key y after) o por desplazamiento (offset), con
+    un LIMIT de una fila más que la página para saber si hay más resultados.
+    params es None si la consulta no está parametrizada.
+    Devuelve (consulta, parámetros).
+    """
+    query = query.strip().rstrip(';').rstrip()
+    if params is None:
+        # Al pasar parámetros, los '%' del texto se deben escapar
+        query = query.replace('%', '%%')
+        params = []
+    else:
+        params = list(params)
+
+    key = page.get('key')
+    if key:
+        if page.get('after') is not None:
+            query += f" {'AND' if has_where else 'WHERE'} `{key}` > %s"
+            params.append(page['after'])
+        query += f' ORDER BY `{key}`'
+
+    query += ' LIMIT %s'
+    params.append(page['limit'] + 1)
+    if page.get('offset'):
+        query += ' OFFSET %s'
+        params.append(page['offset'])
+    return query, params
+
+
+def next_page(page, count, last_row, columns=()):
+    """
+    Parámetros de la página siguiente a una que devolvió count filas;
+    last_row es la última fila (tupla) y columns sus nombres
+    """
+    key = page.get('key')
+    if not key:
+        return {'offset': page.get('offset', 0) + count, 'limit': page['limit']}
+
+    # El nombre de la columna en la fila puede diferir en mayúsculas
+    if last_row is not None:
+        for column, value in zip(columns, last_row):
+            if column.lower() == key.lower():
+                return {'key': key, 'after': value, 'limit': page['limit']}
+    return None
+
+
+def parameterize(sql_command, statement, tokens):
+    """
+    Reemplaza los literales en posiciones de valor (statement.value_indices)
+    por %s. Devuelve (consulta, parámetros) o None si la sentencia no se
+    beneficia de una sentencia preparada o algún literal no se puede extraer.
+    """
+    if statement.type not in PARAMETERIZABLE or not isinstance(tokens, TokenStream):
+        return None
+
+    pieces = []
+    params = []
+    last = 0
+    for index in statement.value_indices:
+        token_type = tokens.type(index)
+        if token_type not in (TokenType.STRING, TokenType.NUMBER):
+            continue
+        if token_type == TokenType.STRING and not closed_string(
+                sql_command[tokens.starts[index]:tokens.ends[index]]):
+            return None
+        param = literal_param(token_type, tokens.value(index))
+        if param is NOT_BINDABLE:
+            return None
+        pieces.append(sql_command[last:tokens.starts[index]])
+        pieces.append('%s')
+        params.append(param)
+        last = tokens.ends[index]
+
+    if not params:
+        return None
+    pieces.append(sql_command[last:])
+    return ''.join(pieces).strip().rstrip(';'), params
+
+
+class PreparedStatementStats:
+    """Contadores globales de las cachés de sentencias preparadas"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.prepared = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self.lock:
+            executions = self.prepared + self.reused
+            return {
+                'prepared': self.prepared,
+                'reused': self.reused,
+                'evicted': self.evicted,
+                'reuse_rate': self.reused / executions if executions else 0.0
+            }
+
+
+class PreparedStatementCache:
+    """
+    Cursores preparados de una conexión, por forma de consulta, con
+    desalojo LRU (cerrar el cursor libera la sentencia en el servidor)
+    """
+
+    def __init__(self, connection, max_size, stats):
+        self.connection = connection
+        self.max_size = max_size
+        self.stats = stats
+        self.cursors = OrderedDict()
+
+    def cursor(self, query):
+        """
+        Devuelve (cursor, consulta). Se debe ejecutar con la consulta devuelta:
+        el cursor reutiliza la sentencia solo si recibe el mismo objeto str.
+        """
+        # Las tablas se resuelven al preparar: la base de datos es parte de la clave
+        key = (self.connection.database, query)
+        entry = self.cursors.get(key)
+        if entry is not None:
+            self.cursors.move_to_end(key)
+            self.stats.count('reused')
+            return entry
+
+        entry = (self.connection.cursor(prepared=True), query)
+        self.cursors[key] = entry
+        self.stats.count('prepared')
+        while len(self.cursors) > self.max_size:
+            _, (cursor, _) = self.cursors.popitem(last=False)
+            cursor.close()
+            self.stats.count('evicted')
+        return entry
+
+    def discard(self, query):
+        entry = self.cursors.pop((self.connection.database, query), None)
+        if entry is not None:
+            try:
+                entry[0].close()
+            except Error:
+                pass
+
+
+def prepared_cursor(connection, query, max_size, stats):
+    """Cursor preparado para la consulta, de la caché de la conexión"""
+    statements = getattr(connection, 'statements', None)
+    if statements is None:
+        statements = connection.statements = PreparedStatementCache(connection, max_size, stats)
+    return statements.cursor(query)
+
+
+def run_prepared(connection, query, params, max_size, stats, max_rows=None, max_bytes=None):
+    """
+    Ejecuta la consulta parametrizada con un cursor preparado de la caché
+    de la conexión (sin confirmar la transacción)
+    """
+    cursor, query = prepared_cursor(connection, query, max_size, stats)
+    try:
+        return run_statement(cursor, query, params, max_rows, max_bytes)
+    except Error:
+        connection.statements.discard(query)
+        raise
+
+
+class ScriptExecutor:
+    """
+    Ejecuta las sentencias (offset, texto) de un script en una sola conexión,
+    confirmando la transacción cada batch_size sentencias. Genera un
+    resultado por sentencia y, al final, un resumen.
+
+    Los INSERT consecutivos de una sola fila sobre la misma tabla y columnas
+    se agrupan (hasta insert_batch_size) y se envían con executemany en un
+    solo viaje y una sola confirmación. Si el lote falla se deshace y se
+    reintenta fila por fila para reportar el error de cada sentencia.
+
+    Si una sentencia falla y stop_on_error está activo se deshacen las
+    sentencias pendientes de confirmar y se detiene la ejecución.
+
+    Entre BEGIN y COMMIT/ROLLBACK no se confirma por lotes ni se agrupan
+    INSERT; una transacción que queda abierta al final se deshace.
+
+    on_executed(statement_type, database, node) se llama por cada sentencia
+    ejecutada con éxito, con la base de datos de la conexión después de
+    ejecutarla (para invalidar solo lo que cambió).
+    """
+
+    def __init__(self, connection, batch_size=100, stop_on_error=True, insert_batch_size=500,
+                 limits=None, on_executed=None):
+        self.connection = connection
+        self.on_executed = on_executed
+        # max_rows/max_bytes para los resultados de cada SELECT
+        self.limits = limits or {}
+        self.batch_size = batch_size
+        self.stop_on_error = stop_on_error
+        self.insert_batch_size = insert_batch_size
+
+        self.executed = 0
+        self.failed = 0
+        self.committed = 0
+        self.rolled_back = 0
+        self.pending = 0
+        self.stopped = False
+        self.explicit = False
+        self.group = []
+
+    def run(self, statements):
+        self.cursor = self.connection.cursor()
+        try:
+            for index, (offset, statement) in enumerate(statements):
+                analysis, node = analyze_statement(statement)
+                syntactic = analysis['syntactic']
+
+                row = self.insert_row(index, offset, statement, syntactic, node)
+                if self.group and (row is None or row['key'] != self.group[0]['key']
+                                   or len(self.group) >= self.insert_batch_size):
+                    yield from self.flush_inserts()
+                    if self.stopped:
+                        break
+
+                if row is not None:
+                    self.group.append(row)
+                    continue
+
+                yield self.execute_one(index, offset, statement, syntactic, node)
+                if self.stopped:
+                    break
+
+            if self.group and not self.stopped:
+                yield from self.flush_inserts()
+
+            if self.explicit:
+                self.rollback()
+            elif self.pending:
+                self.commit()
+        finally:
+            self.cursor.close()
+
+        yield {
+            'summary': True,
+            'success': self.failed == 0,
+            'executed': self.executed,
+            'failed': self.failed,
+            'committed': self.committed,
+            'rolled_back': self.rolled_back,
+            'database': self.connection.database
+        }
+
+    def insert_row(self, index, offset, statement, syntactic, node):
+        """Datos para agrupar la sentencia si es un INSERT que se puede agrupar"""
+        if self.insert_batch_size < 2 or self.explicit or node is None or node.type != 'INSERT':
+            return None
+        params = insert_params(node.values, statement)
+        if params is None:
+            return None
+        return {
+            'index': index,
+            'offset': offset,
+            'statement': statement,
+            'syntactic': syntactic,
+            'node': node,
+            'key': (node.table, tuple(node.columns), len(params)),
+            'prefix': statement[:node.values_position],
+            'params': params
+        }
+
+    def flush_inserts(self):
+        group = self.group
+        self.group = []
+
+        if len(group) == 1:
+            row = group[0]
+            yield self.execute_one(
+                row['index'], row['offset'], row['statement'], row['syntactic'], row['node']
+            )
+            return
+
+        # El lote va en su propia transacción para poder deshacerlo solo
+        if self.pending:
+            self.commit()
+
+        placeholders = ', '.join(['%s'] * len(group[0]['params']))
+        query = f"{group[0]['prefix']} ({placeholders})"
+        try:
+            self.cursor.executemany(query, [row['params'] for row in group])
+            self.connection.commit()
+        except Error:
+            self.connection.rollback()
+            for row in group:
+                yield self.execute_one(
+                    row['index'], row['offset'], row['statement'], row['syntactic'], row['node']
+                )
+                if self.stopped:
+                    return
+            return
+
+        self.executed += len(group)
+        self.committed += len(group)
+        for row in group:
+            self.notify(row['node'])
+            yield {
+                'index': row['index'],
+                'offset': row['offset'],
+                'statement_type': 'INSERT',
+                'success': True,
+                'batched': True,
+                'affected_rows': 1,
+                'message': 'Comando ejecutado correctamente. Filas afectadas: 1'
+            }
+
+    def execute_one(self, index, offset, statement, syntactic, node):
+        item = {
+            'index': index,
+            'offset': offset,
+            'statement_type': syntactic.get('statement_type')
+        }
+
+        if not syntactic['valid']:
+            item.update({
+                'success': False,
+                'error': 'Error sintáctico',
+                'message': syntactic['message'],
+                'position': syntactic.get('position')
+            })
+        elif node.type in TRANSACTION_STATEMENTS:
+            return self.run_transaction(item, node.type)
+        else:
+            try:
+                item.update(run_statement(self.cursor, statement, **self.limits))
+                self.connection.database = track_database(node, self.connection.database)
+                self.notify(node)
+            except Error as e:
+                item.update({
+                    'success': False,
+                    'error': str(e),
+                    'message': f'Error MySQL: {str(e)}'
+                })
+
+        if item['success']:
+            self.executed += 1
+            self.pending += 1
+            if self.pending >= self.batch_size and not self.explicit:
+                self.commit()
+        else:
+            self.failed += 1
+            if self.stop_on_error:
+                self.rollback()
+                self.stopped = True
+
+        return item
+
+    def notify(self, node):
+        if self.on_executed is not None:
+            self.on_executed(node.type, self.connection.database, node)
+
+    def run_transaction(self, item, statement_type):
+        """BEGIN confirma lo pendiente (como en MySQL) y abre la transacción"""
+        try:
+            if statement_type == 'ROLLBACK':
+                self.rollback()
+            else:
+                self.commit()
+        except Error as e:
+            self.failed += 1
+            self.stopped = self.stop_on_error
+            item.update({
+                'success': False,
+                'error': str(e),
+                'message': f'Error MySQL: {str(e)}'
+            })
+            return item
+
+        self.explicit = statement_type == 'BEGIN'
+        self.executed += 1
+        item.update({
+            'success': True,
+            'message': TRANSACTION_MESSAGES[statement_type]
+        })
+        return item
+
+    def commit(self):
+        self.connection.commit()
+        self.committed += self.pending
+        self.pending = 0
+
+    def rollback(self):
+        self.connection.rollback()
+        self.rolled_back += self.pending
+        self.pending = 0
+        self.explicit = False
+
+
+def execute_script(connection, statements, batch_size=100, stop_on_error=True, insert_batch_size=500,
+                   limits=None, on_executed=None):
+    """Ejecuta un script con ScriptExecutor (ver su documentación)"""
+    return ScriptExecutor(
+        connection, batch_size, stop_on_error, insert_batch_size, limits, on_executed
+    ).run(statements)
@@ -0,0 +1,1021 @@
+"""
+Servidor MySQL falso, en memoria, para pruebas y benchmarks locales.
+
+Entiende las sentencias de la gramática del analizador (CREATE/DROP
+DATABASE y TABLE, USE, INSERT, UPDATE, DELETE, SELECT con WHERE) más lo que
+agrega el backend al ejecutarlas: SHOW DATABASES, SHOW TABLES, condiciones
+unidas con AND, ORDER BY, LIMIT y OFFSET, alias con AS, CREATE INDEX,
+EXPLAIN, KILL QUERY, INSERT IGNORE, LOAD DATA LOCAL INFILE (con el formato
+que escribe bulkload) y las vistas SCHEMATA, TABLES, COLUMNS y STATISTICS de
+INFORMATION_SCHEMA. Los parámetros %s se sustituyen
+como literales. Los errores son mysql.connector.Error con el mismo código
+que daría MySQL.
+
+Ofrece dos interfaces sobre los mismos datos:
+
+    server = FakeMySQL()
+    app.pool.connect = server.connect           # mysql-connector (Flask)
+    asgi.pool.connect = server.connect_async    # aiomysql (modo ASGI)
+
+latency simula el tiempo de cada sentencia en el servidor (time.sleep en
+la interfaz síncrona, asyncio.sleep en la asíncrona); KILL QUERY desde
+otra conexión la interrumpe con el error 1317.
+"""
+import asyncio
+import re
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from mysql.connector import Error
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        '((?:[^'\\]|\\.|'')*)'      # cadena
+      | `([^`]*)`                   # identificador entre comillas
+      | (\d+(?:\.\d+)?)             # número
+      | (\w+)                       # palabra
+      | (<=|>=|<>|!=|\S)            # símbolo
+    )
+""", re.VERBOSE | re.DOTALL)
+
+PARAM_PATTERN = re.compile(r'%s|%%')
+
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0'}
+
+OPERATORS = {
+    '=': lambda a, b: a == b,
+    '<>': lambda a, b: a != b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b
+}
+
+
+def sql_literal(value):
+    """Literal SQL de un parámetro de Python"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    text = str(value).replace('\\', '\\\\').replace("'", "\\'")
+    return f"'{text}'"
+
+
+def bind(query, params):
+    """Sustituye los %s por los parámetros, como hace el cliente"""
+    if params is None:
+        return query
+    values = iter(params)
+
+    def replace(match):
+        if match.group() == '%%':
+            return '%'
+        try:
+            return sql_literal(next(values))
+        except StopIteration:
+            raise Error(msg='Faltan parámetros para la sentencia', errno=1210)
+
+    return PARAM_PATTERN.sub(replace, query)
+
+
+def unescape(text):
+    text = text.replace("''", "'")
+    return re.sub(r'\\(.)', lambda m: ESCAPES.get(m.group(1), m.group(1)), text)
+
+
+def tokenize(sql):
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(sql):
+        string, quoted, number, word, symbol = match.groups()
+        if string is not None:
+            tokens.append(('value', unescape(string)))
+        elif quoted is not None:
+            tokens.append(('name', quoted))
+        elif number is not None:
+            tokens.append(('value', Decimal(number) if '.' in number else int(number)))
+        elif word is not None:
+            tokens.append(('word', word))
+        elif symbol is not None:
+            tokens.append(('symbol', symbol))
+    return tokens
+
+
+LOAD_FIELD = re.compile(r'"((?:[^"]|"")*)"|NULL')
+
+
+def load_data_rows(text):
+    """Filas de un archivo de LOAD DATA en el formato de bulkload.data_line"""
+    position = 0
+    while position < len(text):
+        values = []
+        while True:
+            match = LOAD_FIELD.match(text, position)
+            if match is None:
+                raise syntax_error(text[position:position + 20])
+            values.append(None if match.group(1) is None else match.group(1).replace('""', '"'))
+            position = match.end()
+            if text.startswith(',', position):
+                position += 1
+                continue
+            break
+        if text[position:position + 1] != '\n':
+            raise syntax_error(text[position:position + 20])
+        position += 1
+        yield values
+
+
+def syntax_error(near):
+    return Error(
+        msg=f"You have an error in your SQL syntax near '{near}'",
+        errno=1064, sqlstate='42000'
+    )
+
+
+def comparable(a, b):
+    """Igual que MySQL, una cadena comparada con un número se convierte"""
+    if isinstance(a, str) and isinstance(b, (int, Decimal)):
+        try:
+            return Decimal(a), b
+        except ArithmeticError:
+            return a, str(b)
+    if isinstance(b, str) and isinstance(a, (int, Decimal)):
+        b, a = comparable(b, a)
+    return a, b
+
+
+class Statement:
+    """Lectura secuencial de los tokens de una sentencia"""
+
+    def __init__(self, sql):
+        self.tokens = tokenize(sql.strip().rstrip(';'))
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def accept(self, *words):
+        kind, value = self.peek()
+        if kind in ('word', 'symbol') and value.upper() in words:
+            self.position += 1
+            return value.upper()
+        return None
+
+    def expect(self, *words):
+        word = self.accept(*words)
+        if word is None:
+            raise syntax_error(self.peek()[1])
+        return word
+
+    def name(self):
+        kind, value = self.peek()
+        if kind not in ('word', 'name'):
+            raise syntax_error(value)
+        self.position += 1
+        return value
+
+    def value(self):
+        kind, value = self.peek()
+        if kind == 'value':
+            self.position += 1
+            return value
+        if self.accept('-'):
+            return -self.value()
+        if self.accept('NULL'):
+            return None
+        if self.accept('TRUE'):
+            return 1
+        if self.accept('FALSE'):
+            return 0
+        raise syntax_error(value)
+
+    def done(self):
+        return self.position >= len(self.tokens)
+
+    def end(self):
+        if not self.done():
+            raise syntax_error(self.peek()[1])
+
+
+# Tipos que MySQL muestra con otro nombre en COLUMN_TYPE
+TYPE_NAMES = {'BOOLEAN': 'tinyint(1)', 'BOOL': 'tinyint(1)', 'INTEGER': 'int'}
+
+
+def column_type(words):
+    """COLUMN_TYPE como lo muestra MySQL (p. ej. varchar(50)) a partir de la definición"""
+    name = TYPE_NAMES.get(words[1], words[1].lower())
+    if len(words) > 2 and words[2] == '(' and ')' in words:
+        name += '(' + ''.join(words[3:words.index(')')]) + ')'
+    return name
+
+
+# Columnas de las vistas de INFORMATION_SCHEMA que se simulan
+VIEW_COLUMNS = {
+    'SCHEMATA': ('SCHEMA_NAME',),
+    'TABLES': ('TABLE_SCHEMA', 'TABLE_NAME', 'TABLE_ROWS'),
+    'COLUMNS': ('TABLE_SCHEMA', 'TABLE_NAME', 'COLUMN_NAME', 'ORDINAL_POSITION',
+                'COLUMN_TYPE', 'COLUMN_KEY'),
+    'STATISTICS': ('TABLE_SCHEMA', 'TABLE_NAME', 'INDEX_NAME', 'NON_UNIQUE',
+                   'SEQ_IN_INDEX', 'COLUMN_NAME')
+}
+
+EXPLAIN_COLUMNS = ('id', 'select_type', 'table', 'type', 'possible_keys', 'key', 'rows', 'Extra')
+
+
+class FakeTable:
+    def __init__(self, name, columns):
+        self.name = name
+        # Cada columna: {'name', 'type', 'primary_key', 'auto_increment'}
+        self.columns = columns
+        self.rows = []
+        self.auto_increment = 1
+        # Nombre del índice -> columnas (PRIMARY para la clave primaria)
+        self.indexes = {}
+
+    def column(self, name):
+        for column in self.columns:
+            if column['name'].lower() == name.lower():
+                return column['name']
+        raise Error(msg=f"Unknown column '{name}' in 'field list'", errno=1054, sqlstate='42S22')
+
+
+class FakeResult:
+    def __init__(self, columns=None, rows=None, rowcount=0, lastrowid=None):
+        self.columns = columns
+        self.rows = rows or []
+        self.rowcount = len(self.rows) if columns is not None else rowcount
+        self.lastrowid = lastrowid
+
+
+class FakeMySQL:
+    """Estado compartido del servidor: bases de datos con sus tablas"""
+
+    def __init__(self, latency=0, local_infile=True):
+        self.latency = latency
+        # False: LOAD DATA LOCAL falla como con local_infile=OFF en el servidor
+        self.local_infile = local_infile
+        # Tablas por base de datos, y el nombre original de cada una
+        self.databases = {}
+        self.names = {}
+        self.lock = threading.RLock()
+        self.connections = 0
+        self.queries = 0
+        # Sesiones abiertas por id de conexión, para KILL QUERY
+        self.sessions = {}
+
+    def connect(self, database=None, **options):
+        """Conexión con la interfaz de mysql-connector (se ignoran las opciones)"""
+        return FakeConnection(self, database)
+
+    async def connect_async(self, database=None):
+        """Conexión con la interfaz de aiomysql"""
+        return AsyncFakeConnection(FakeSession(self, database))
+
+    def database(self, name):
+        if name is None:
+            raise Error(msg='No database selected', errno=1046, sqlstate='3D000')
+        tables = self.databases.get(name.lower())
+        if tables is None:
+            raise Error(msg=f"Unknown database '{name}'", errno=1049, sqlstate='42000')
+        return tables
+
+    def table(self, database, name):
+        table = self.database(database).get(name.lower())
+        if table is None:
+            raise Error(
+                msg=f"Table '{database}.{name}' doesn't exist", errno=1146, sqlstate='42S02'
+            )
+        return table
+
+
+class FakeSession:
+    """
+    Estado de una conexión: base de datos activa y transacción. Los cambios
+    se aplican al momento; ROLLBACK restaura las filas de las tablas
+    modificadas desde el último COMMIT. Las sentencias DDL confirman antes.
+    """
+
+    def __init__(self, server, database=None):
+        self.server = server
+        self.database = None
+        self.undo = {}
+        self.closed = False
+        # KILL QUERY de otra conexión durante la espera de latency
+        self.killed = threading.Event()
+        with server.lock:
+            server.connections += 1
+            self.connection_id = server.connections
+            server.sessions[self.connection_id] = self
+        if database:
+            self.use(database)
+
+    @property
+    def in_transaction(self):
+        return bool(self.undo)
+
+    def use(self, database):
+        with self.server.lock:
+            self.server.database(database)
+            self.database = database
+
+    def commit(self):
+        self.undo.clear()
+
+    def rollback(self):
+        with self.server.lock:
+            for table, rows in self.undo.values():
+                table.rows = rows
+            self.undo.clear()
+
+    def wait(self, seconds):
+        """Espera de latency; Error 1317 si se interrumpe con KILL QUERY"""
+        if self.killed.wait(seconds):
+            self.interrupted()
+
+    async def wait_async(self, seconds):
+        deadline = time.monotonic() + seconds
+        while not self.killed.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, 0.01))
+        self.interrupted()
+
+    def interrupted(self):
+        self.killed.clear()
+        raise Error(msg='Query execution was interrupted', errno=1317, sqlstate='70100')
+
+    def close(self):
+        self.rollback()
+        self.closed = True
+        with self.server.lock:
+            self.server.sessions.pop(self.connection_id, None)
+
+    def touch(self, table):
+        if id(table) not in self.undo:
+            self.undo[id(table)] = (table, list(table.rows))
+
+    def run(self, operation, params=None):
+        if self.closed:
+            raise Error(msg='MySQL Connection not available', errno=2055)
+        sql = bind(operation, params)
+        with self.server.lock:
+            self.server.queries += 1
+            return self.execute(Statement(sql))
+
+    def execute(self, statement):
+        word = statement.expect(
+            'CREATE', 'DROP', 'USE', 'SHOW', 'INSERT', 'UPDATE', 'DELETE', 'SELECT', 'EXPLAIN',
+            'KILL', 'LOAD'
+        )
+        if word in ('CREATE', 'DROP'):
+            self.commit()
+        return getattr(self, 'execute_' + word.lower())(statement)
+
+    def execute_create(self, statement):
+        server = self.server
+        kind = statement.expect('DATABASE', 'TABLE', 'INDEX')
+        if kind == 'INDEX':
+            return self.create_index(statement)
+        if kind == 'DATABASE':
+            name = statement.name()
+            statement.end()
+            if name.lower() in server.databases:
+                raise Error(
+                    msg=f"Can't create database '{name}'; database exists",
+                    errno=1007, sqlstate='HY000'
+                )
+            server.databases[name.lower()] = {}
+            server.names[name.lower()] = name
+            return FakeResult(rowcount=1)
+
+        name = statement.name()
+        tables = server.database(self.database)
+        if name.lower() in tables:
+            raise Error(msg=f"Table '{name}' already exists", errno=1050, sqlstate='42S01')
+        statement.expect('(')
+        columns = []
+        depth = 0
+        definition = []
+        while not statement.done():
+            kind, value = statement.tokens[statement.position]
+            statement.position += 1
+            if kind == 'symbol' and value == '(':
+                depth += 1
+            elif kind == 'symbol' and value == ')' and depth == 0:
+                columns.append(definition)
+                break
+            elif kind == 'symbol' and value == ')':
+                depth -= 1
+            elif kind == 'symbol' and value == ',' and depth == 0:
+                columns.append(definition)
+                definition = []
+                continue
+            definition.append(value)
+        else:
+            raise syntax_error('')
+        statement.end()
+
+        table = FakeTable(name, [])
+        for definition in columns:
+            words = [str(word).upper() for word in definition]
+            if len(words) < 2 or words[0] in ('PRIMARY', 'KEY', 'INDEX', 'UNIQUE',
+                                              'CONSTRAINT', 'FOREIGN'):
+                continue
+            table.columns.append({
+                'name': definition[0],
+                'type': column_type(words),
+                'primary_key': 'PRIMARY' in words,
+                'auto_increment': 'AUTO_INCREMENT' in words
+            })
+        keys = [column['name'] for column in table.columns if column['primary_key']]
+        if keys:
+            table.indexes['PRIMARY'] = keys
+        tables[name.lower()] = table
+        return FakeResult()
+
+    def create_index(self, statement):
+        """CREATE INDEX nombre ON tabla (columna, ...)"""
+        name = statement.name()
+        statement.expect('ON')
+        table = self.table_reference(statement)
+        statement.expect('(')
+        columns = [table.column(statement.name())]
+        while statement.accept(','):
+            columns.append(table.column(statement.name()))
+        statement.expect(')')
+        statement.end()
+        if name.lower() in (index.lower() for index in table.indexes):
+            raise Error(msg=f"Duplicate key name '{name}'", errno=1061, sqlstate='42000')
+        table.indexes[name] = columns
+        return FakeResult()
+
+    def execute_explain(self, statement):
+        """
+        Plan de un SELECT, UPDATE o DELETE: acceso por el índice cuya
+        primera columna se compara con = en el WHERE, o recorrido completo
+        """
+        verb = statement.expect('SELECT', 'UPDATE', 'DELETE')
+        if verb == 'UPDATE':
+            table = self.table_reference(statement)
+        else:
+            while not statement.accept('FROM'):
+                if statement.done():
+                    raise syntax_error('')
+                statement.position += 1
+            table = self.table_reference(statement)
+
+        equalities = set()
+        while not statement.done():
+            if statement.accept('WHERE', 'AND'):
+                kind, value = statement.peek()
+                if kind in ('word', 'name'):
+                    statement.position += 1
+                    if statement.accept('='):
+                        equalities.add(table.column(value))
+                continue
+            statement.position += 1
+
+        possible = [
+            index for index, columns in table.indexes.items() if columns[0] in equalities
+        ]
+        key = 'PRIMARY' if 'PRIMARY' in possible else (possible[0] if possible else None)
+        if key is None:
+            access, rows, extra = 'ALL', len(table.rows), 'Using where' if equalities else None
+        elif key == 'PRIMARY':
+            access, rows, extra = 'const', 1, None
+        else:
+            column = table.indexes[key][0]
+            distinct = len({row[column] for row in table.rows}) or 1
+            access, rows, extra = 'ref', max(1, len(table.rows) // distinct), None
+        return FakeResult(list(EXPLAIN_COLUMNS), [(
+            1, 'SIMPLE' if verb == 'SELECT' else verb, table.name, access,
+            ','.join(possible) or None, key, rows, extra
+        )])
+
+    def execute_kill(self, statement):
+        """KILL QUERY id: interrumpe la espera de la sentencia en curso de esa conexión"""
+        statement.expect('QUERY')
+        connection_id = statement.value()
+        statement.end()
+        session = self.server.sessions.get(connection_id)
+        if session is None:
+            raise Error(msg=f'Unknown thread id: {connection_id}', errno=1094, sqlstate='HY000')
+        session.killed.set()
+        return FakeResult()
+
+    def execute_drop(self, statement):
+        server = self.server
+        if statement.expect('DATABASE', 'TABLE') == 'DATABASE':
+            name = statement.name()
+            statement.end()
+            server.database(name)
+            del server.databases[name.lower()]
+            del server.names[name.lower()]
+            if self.database and self.database.lower() == name.lower():
+                self.database = None
+            return FakeResult()
+
+        name = statement.name()
+        statement.end()
+        server.table(self.database, name)
+        del server.databases[self.database.lower()][name.lower()]
+        return FakeResult()
+
+    def execute_use(self, statement):
+        name = statement.name()
+        statement.end()
+        self.use(name)
+        return FakeResult()
+
+    def execute_show(self, statement):
+        if statement.expect('DATABASES', 'TABLES') == 'DATABASES':
+            statement.end()
+            names = self.server.names
+            return FakeResult(['Database'], [(names[key],) for key in sorted(names)])
+        statement.end()
+        tables = self.server.database(self.database)
+        return FakeResult(
+            [f'Tables_in_{self.database}'],
+            [(tables[name].name,) for name in sorted(tables)]
+        )
+
+    def execute_insert(self, statement):
+        ignore = statement.accept('IGNORE') is not None
+        statement.expect('INTO')
+        table = self.table_reference(statement)
+        if statement.accept('('):
+            columns = [table.column(statement.name())]
+            while statement.accept(','):
+                columns.append(table.column(statement.name()))
+            statement.expect(')')
+        else:
+            columns = [column['name'] for column in table.columns]
+
+        statement.expect('VALUES')
+        rows = []
+        while True:
+            statement.expect('(')
+            values = [statement.value()]
+            while statement.accept(','):
+                values.append(statement.value())
+            statement.expect(')')
+            if len(values) != len(columns):
+                raise Error(
+                    msg="Column count doesn't match value count at row 1",
+                    errno=1136, sqlstate='21S01'
+                )
+            rows.append(dict(zip(columns, values)))
+            if not statement.accept(','):
+                break
+        statement.end()
+        return self.insert_rows(table, rows, ignore)
+
+    def insert_rows(self, table, rows, ignore=False):
+        """
+        Agrega las filas (dict columna: valor). Con ignore se omiten las que
+        repiten la clave primaria, como INSERT IGNORE y LOAD DATA LOCAL
+        """
+        self.touch(table)
+        keys = table.indexes.get('PRIMARY')
+        existing = set()
+        if ignore and keys:
+            existing = {tuple(str(row[key]) for key in keys) for row in table.rows}
+        inserted = 0
+        lastrowid = None
+        for row in rows:
+            if ignore and keys:
+                key = tuple(str(row.get(name)) for name in keys)
+                if key in existing:
+                    continue
+                existing.add(key)
+            inserted += 1
+            for column in table.columns:
+                name = column['name']
+                if column['auto_increment'] and row.get(name) is None:
+                    row[name] = table.auto_increment
+                    lastrowid = row[name]
+                elif name not in row:
+                    row[name] = None
+                if column['auto_increment'] and isinstance(row[name], int):
+                    table.auto_increment = max(table.auto_increment, row[name] + 1)
+            table.rows.append(row)
+        return FakeResult(rowcount=inserted, lastrowid=lastrowid)
+
+    def execute_load(self, statement):
+        """
+        LOAD DATA LOCAL INFILE 'archivo' INTO TABLE tabla ... (columnas): los
+        campos van entre comillas dobles (duplicadas dentro del valor) o son
+        NULL, separados por comas, una fila por línea
+        """
+        statement.expect('DATA')
+        statement.expect('LOCAL')
+        statement.expect('INFILE')
+        path = statement.value()
+        statement.expect('INTO')
+        statement.expect('TABLE')
+        table = self.table_reference(statement)
+        # CHARACTER SET y FIELDS/LINES: se asume el formato de bulkload
+        while not statement.accept('('):
+            if statement.done():
+                raise syntax_error('')
+            statement.position += 1
+        columns = [table.column(statement.name())]
+        while statement.accept(','):
+            columns.append(table.column(statement.name()))
+        statement.expect(')')
+        statement.end()
+        if not self.server.local_infile:
+            raise Error(
+                msg='Loading local data is disabled; this must be enabled on both the client and server sides',
+                errno=3948, sqlstate='42000'
+            )
+
+        with open(path, encoding='utf-8') as source:
+            text = source.read()
+        rows = []
+        for values in load_data_rows(text):
+            if len(values) != len(columns):
+                raise Error(
+                    msg=f"Row {len(rows) + 1} doesn't contain data for all columns",
+                    errno=1261, sqlstate='01000'
+                )
+            rows.append(dict(zip(columns, values)))
+        return self.insert_rows(table, rows, ignore=True)
+
+    def execute_update(self, statement):
+        table = self.server.table(self.database, statement.name())
+        statement.expect('SET')
+        assignments = []
+        while True:
+            column = table.column(statement.name())
+            statement.expect('=')
+            assignments.append((column, statement.value()))
+            if not statement.accept(','):
+                break
+        condition = self.where(statement, table)
+        statement.end()
+
+        self.touch(table)
+        count = 0
+        for row in table.rows:
+            if condition(row):
+                row.update(assignments)
+                count += 1
+        return FakeResult(rowcount=count)
+
+    def execute_delete(self, statement):
+        statement.expect('FROM')
+        table = self.server.table(self.database, statement.name())
+        condition = self.where(statement, table)
+        statement.end()
+
+        self.touch(table)
+        kept = [row for row in table.rows if not condition(row)]
+        count = len(table.rows) - len(kept)
+        table.rows = kept
+        return FakeResult(rowcount=count)
+
+    def execute_select(self, statement):
+        # Cada columna pedida: (nombre, alias)
+        if statement.accept('*'):
+            selected = None
+        else:
+            selected = []
+            while True:
+                name = statement.name()
+                selected.append((name, statement.name() if statement.accept('AS') else name))
+                if not statement.accept(','):
+                    break
+
+        statement.expect('FROM')
+        table = self.table_reference(statement)
+        if selected is None:
+            selected = [(column['name'], column['name']) for column in table.columns]
+        columns = [table.column(name) for name, _ in selected]
+        condition = self.where(statement, table)
+        rows = [row for row in table.rows if condition(row)]
+
+        if statement.accept('ORDER'):
+            statement.expect('BY')
+            keys = []
+            while True:
+                key = table.column(statement.name())
+                keys.append((key, statement.accept('ASC', 'DESC') == 'DESC'))
+                if not statement.accept(','):
+                    break
+            # Orden estable aplicado desde la última clave; NULL primero, como en MySQL
+            for key, descending in reversed(keys):
+                rows.sort(key=lambda row: (row[key] is not None, row[key]), reverse=descending)
+        if statement.accept('LIMIT'):
+            limit = statement.value()
+            offset = statement.value() if statement.accept('OFFSET') else 0
+            rows = rows[offset:offset + limit]
+        statement.end()
+
+        return FakeResult(
+            [alias for _, alias in selected],
+            [tuple(row[column] for column in columns) for row in rows]
+        )
+
+    def table_reference(self, statement):
+        """Tabla de la base de datos activa, o base_de_datos.tabla"""
+        name = statement.name()
+        if not statement.accept('.'):
+            return self.server.table(self.database, name)
+        table = statement.name()
+        if name.lower() == 'information_schema':
+            return self.information_schema(table)
+        return self.server.table(name, table)
+
+    def information_schema(self, name):
+        """Vistas SCHEMATA, TABLES, COLUMNS y STATISTICS de INFORMATION_SCHEMA"""
+        server = self.server
+        tables = [
+            (server.names[key], table)
+            for key in sorted(server.databases)
+            for table in server.databases[key].values()
+        ]
+        view = name.upper()
+        if view not in VIEW_COLUMNS:
+            raise Error(
+                msg=f"Unknown table '{name}' in information_schema",
+                errno=1109, sqlstate='42S02'
+            )
+        if view == 'SCHEMATA':
+            rows = [{'SCHEMA_NAME': server.names[key]} for key in sorted(server.names)]
+        elif view == 'STATISTICS':
+            rows = [
+                {
+                    'TABLE_SCHEMA': schema,
+                    'TABLE_NAME': table.name,
+                    'INDEX_NAME': index,
+                    'NON_UNIQUE': 0 if index == 'PRIMARY' else 1,
+                    'SEQ_IN_INDEX': position,
+                    'COLUMN_NAME': column
+                }
+                for schema, table in tables
+                for index, columns in table.indexes.items()
+                for position, column in enumerate(columns, 1)
+            ]
+        elif view == 'TABLES':
+            rows = [
+                {'TABLE_SCHEMA': schema, 'TABLE_NAME': table.name, 'TABLE_ROWS': len(table.rows)}
+                for schema, table in tables
+            ]
+        else:
+            rows = [
+                {
+                    'TABLE_SCHEMA': schema,
+                    'TABLE_NAME': table.name,
+                    'COLUMN_NAME': column['name'],
+                    'ORDINAL_POSITION': position,
+                    'COLUMN_TYPE': column['type'],
+                    'COLUMN_KEY': 'PRI' if column['primary_key'] else ''
+                }
+                for schema, table in tables
+                for position, column in enumerate(table.columns, 1)
+            ]
+
+        view_table = FakeTable(view, [{'name': column} for column in VIEW_COLUMNS[view]])
+        view_table.rows = rows
+        return view_table
+
+    def where(self, statement, table):
+        """Condición del WHERE (comparaciones unidas con AND) como función"""
+        if not statement.accept('WHERE'):
+            return lambda row: True
+
+        comparisons = []
+        while True:
+            column = table.column(statement.name())
+            operator = statement.expect(*OPERATORS)
+            comparisons.append((column, OPERATORS[operator], statement.value()))
+            if not statement.accept('AND'):
+                break
+
+        def condition(row):
+            for column, compare, value in comparisons:
+                current = row[column]
+                if current is None or value is None:
+                    return False
+                if not compare(*comparable(current, value)):
+                    return False
+            return True
+        return condition
+
+
+class FakeCursor:
+    """Cursor con la interfaz de mysql-connector"""
+
+    def __init__(self, connection, dictionary=False):
+        self.connection = connection
+        self.dictionary = dictionary
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = []
+
+    @property
+    def with_rows(self):
+        return self.description is not None
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self.description or ())
+
+    def execute(self, operation, params=None):
+        session = self.connection.session
+        session.killed.clear()
+        if self.connection.server.latency:
+            session.wait(self.connection.server.latency)
+        self._load(session.run(operation, params))
+
+    def executemany(self, operation, seq_params):
+        total = 0
+        for params in seq_params:
+            self.execute(operation, params)
+            total += self.rowcount
+        self.rowcount = total
+
+    def _load(self, result):
+        if result.columns is None:
+            self.description = None
+            self._rows = []
+        else:
+            self.description = [(name, None) for name in result.columns]
+            if self.dictionary:
+                self._rows = [dict(zip(result.columns, row)) for row in result.rows]
+            else:
+                self._rows = list(result.rows)
+        self.rowcount = result.rowcount
+        self.lastrowid = result.lastrowid
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows = self._rows[:size]
+        del self._rows[:size]
+        return rows
+
+    def fetchall(self):
+        rows = self._rows
+        self._rows = []
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class FakeConnection:
+    """Conexión con la interfaz de mysql-connector"""
+
+    def __init__(self, server, database=None):
+        self.server = server
+        self.session = FakeSession(server, database)
+
+    @property
+    def database(self):
+        return self.session.database
+
+    @database.setter
+    def database(self, value):
+        self.session.use(value)
+
+    @property
+    def in_transaction(self):
+        return self.session.in_transaction
+
+    @property
+    def connection_id(self):
+        return self.session.connection_id
+
+    def cursor(self, dictionary=False, prepared=False, **kwargs):
+        return FakeCursor(self, dictionary)
+
+    def commit(self):
+        self.session.commit()
+
+    def rollback(self):
+        self.session.rollback()
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        if self.session.closed:
+            raise Error(msg='MySQL Connection not available', errno=2055)
+
+    def is_connected(self):
+        return not self.session.closed
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncFakeCursor:
+    """Cursor con la interfaz de aiomysql; con dictionary las filas son dict (DictCursor)"""
+
+    def __init__(self, connection, dictionary=False):
+        self.connection = connection
+        self.dictionary = dictionary
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = []
+
+    async def execute(self, query, args=None):
+        session = self.connection.session
+        session.killed.clear()
+        if self.connection.server.latency:
+            await session.wait_async(self.connection.server.latency)
+        result = session.run(query, args)
+        if result.columns is None:
+            self.description = None
+            self._rows = []
+        else:
+            self.description = [(name, None) for name in result.columns]
+            if self.dictionary:
+                self._rows = [dict(zip(result.columns, row)) for row in result.rows]
+            else:
+                self._rows = list(result.rows)
+        self.rowcount = result.rowcount
+        self.lastrowid = result.lastrowid
+        return self.rowcount
+
+    async def executemany(self, query, args):
+        total = 0
+        for params in args:
+            total += await self.execute(query, params)
+        self.rowcount = total
+        return total
+
+    async def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    async def fetchmany(self, size=None):
+        rows = self._rows[:size or 1]
+        del self._rows[:size or 1]
+        return rows
+
+    async def fetchall(self):
+        rows = self._rows
+        self._rows = []
+        return rows
+
+    async def close(self):
+        self._rows = []
+
+
+class AsyncFakeConnection:
+    """Conexión con la interfaz de aiomysql"""
+
+    def __init__(self, session):
+        self.session = session
+        self.server = session.server
+
+    @property
+    def db(self):
+        return self.session.database
+
+    @property
+    def closed(self):
+        return self.session.closed
+
+    def cursor(self, *cursors):
+        dictionary = any('Dict' in cursor.__name__ for cursor in cursors)
+        return AsyncFakeCursor(self, dictionary)
+
+    def thread_id(self):
+        return self.session.connection_id
+
+    async def select_db(self, db):
+        self.session.use(db)
+
+    def get_transaction_status(self):
+        return self.session.in_transaction
+
+    async def begin(self):
+        pass
+
+    async def commit(self):
+        self.session.commit()
+
+    async def rollback(self):
+        self.session.rollback()
+
+    async def ping(self, reconnect=True):
+        if self.session.closed:
+            raise Error(msg='MySQL Connection not available', errno=2055)
+
+    def close(self):
+        self.session.close()
+
+    async def ensure_closed(self):
+        self.close()
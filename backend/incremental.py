@@ -0,0 +1,262 @@
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from lexer import FastLexer, Token, TokenType, needs_reference_lexer, scan_tokens
+from parser import Parser
+from cache import LRUCache
+
+
+class DocumentError(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+def token_info(token):
+    return {
+        'type': token.type.value,
+        'value': token.value,
+        'position': token.position
+    }
+
+
+def shift_result(result, delta):
+    if delta and result.get('position') is not None:
+        result = dict(result, position=result['position'] + delta)
+    return result
+
+
+class Document:
+    """
+    Texto del editor con sus tokens y el análisis de cada sentencia.
+
+    Al aplicar una edición (offset, longitud borrada, texto insertado) se
+    vuelve a tokenizar desde el token afectado hasta que los tokens nuevos
+    coinciden otra vez con los anteriores, y solo se vuelven a analizar las
+    sentencias que contienen tokens modificados. El resultado es un diff de
+    tokens y de sentencias en lugar del análisis completo.
+    """
+
+    def __init__(self, text):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.reset(text)
+
+    def reset(self, text):
+        self.text = text
+        self.upper_text = text.upper()
+        # Textos con caracteres especiales se re-tokenizan completos
+        self.incremental = (
+            len(self.upper_text) == len(text) and not needs_reference_lexer(self.upper_text)
+        )
+
+        if self.incremental:
+            self.tokens, self.starts, self.ends = [], [], []
+            for token, start, end in scan_tokens(self.upper_text, text):
+                self.tokens.append(token)
+                self.starts.append(start)
+                self.ends.append(end)
+        else:
+            self.tokens = FastLexer(text).tokenize()[:-1]
+            self.starts = self.ends = None
+
+        # Cada sentencia: [primer token, token final (exclusivo), resultado]
+        self.statements = self.parse_statements(0, len(self.tokens))
+
+    def apply_edit(self, offset, removed, inserted):
+        if offset < 0 or removed < 0 or offset + removed > len(self.text):
+            raise DocumentError("Edición fuera del rango del documento")
+
+        text = self.text[:offset] + inserted + self.text[offset + removed:]
+        upper_inserted = inserted.upper()
+        self.version += 1
+
+        if (not self.incremental or len(upper_inserted) != len(inserted)
+                or needs_reference_lexer(upper_inserted)):
+            old_tokens = len(self.tokens)
+            old_statements = len(self.statements)
+            self.reset(text)
+            return self.diff(0, old_tokens, self.tokens, 0, 0, old_statements, self.statements)
+
+        delta = len(inserted) - removed
+        self.text = text
+        self.upper_text = self.upper_text[:offset] + upper_inserted + self.upper_text[offset + removed:]
+
+        # Primer token que termina en o después del punto editado
+        first = bisect_left(self.ends, offset)
+        restart = min(self.starts[first], offset) if first < len(self.tokens) else offset
+
+        new_tokens, new_starts, new_ends = [], [], []
+        edit_end = offset + len(inserted)
+        old = first
+        for token, start, end in scan_tokens(self.upper_text, self.text, restart):
+            if start >= edit_end:
+                # Pasada la edición: si un token anterior empieza en el mismo
+                # lugar, el resto de los tokens es igual (desplazado)
+                target = start - delta
+                old = bisect_left(self.starts, target, old)
+                if old < len(self.tokens) and self.starts[old] == target:
+                    break
+            new_tokens.append(token)
+            new_starts.append(start)
+            new_ends.append(end)
+        else:
+            old = len(self.tokens)
+
+        # Los tokens posteriores se desplazan
+        tail_tokens = self.tokens[old:]
+        if delta:
+            for token in tail_tokens:
+                token.position += delta
+        tail_starts = [start + delta for start in self.starts[old:]]
+        tail_ends = [end + delta for end in self.ends[old:]]
+
+        self.tokens[first:] = new_tokens + tail_tokens
+        self.starts[first:] = new_starts + tail_starts
+        self.ends[first:] = new_ends + tail_ends
+
+        return self.update_statements(first, old, len(new_tokens), delta)
+
+    def update_statements(self, first, old_end, inserted, delta):
+        """
+        Vuelve a analizar las sentencias que tocan los tokens reemplazados
+        [first, old_end), que ahora son [first, first + inserted)
+        """
+        token_delta = inserted - (old_end - first)
+        statements = self.statements
+
+        # Intactas antes de la edición: terminan en ';' antes de first
+        head = bisect_right([statement[1] for statement in statements], first)
+        if head and self.tokens[statements[head - 1][1] - 1].type != TokenType.SEMICOLON:
+            head -= 1
+        # Intactas después: el ';' que las precede está después de la edición
+        tail = bisect_right([statement[0] for statement in statements], old_end)
+
+        begin = statements[head][0] if head < len(statements) else first
+        end = statements[tail][0] + token_delta if tail < len(statements) else len(self.tokens)
+
+        middle = self.parse_statements(begin, end)
+        shifted = [
+            [start + token_delta, stop + token_delta, shift_result(result, delta)]
+            for start, stop, result in statements[tail:]
+        ]
+        self.statements = statements[:head] + middle + shifted
+
+        return self.diff(
+            first, old_end - first, self.tokens[first:first + inserted], delta,
+            head, tail - head, middle
+        )
+
+    def parse_statements(self, begin, end):
+        statements = []
+        start = begin
+        for index in range(begin, end):
+            if self.tokens[index].type == TokenType.SEMICOLON:
+                statements.append(self.parse_statement(start, index + 1))
+                start = index + 1
+        if start < end:
+            statements.append(self.parse_statement(start, end))
+        return statements
+
+    def parse_statement(self, start, end):
+        tokens = self.tokens[start:end]
+        # El parser nunca pasa de un ';', así que solo importa el EOF final
+        eof_position = len(self.text) if end == len(self.tokens) else tokens[-1].position
+        tokens.append(Token(TokenType.EOF, None, eof_position))
+        return [start, end, Parser(tokens).parse()]
+
+    def diff(self, token_start, token_deleted, tokens, shift,
+             statement_start, statement_deleted, statements):
+        return {
+            'version': self.version,
+            'lexical': {
+                'diff': {
+                    'start': token_start,
+                    'deleted': token_deleted,
+                    'inserted': [token_info(token) for token in tokens],
+                    'shift': shift
+                },
+                'token_count': len(self.tokens)
+            },
+            'statements': {
+                'start': statement_start,
+                'deleted': statement_deleted,
+                'inserted': [statement[2] for statement in statements]
+            },
+            'syntactic': self.syntactic()
+        }
+
+    def syntactic(self):
+        if self.statements:
+            return self.statements[0][2]
+        return Parser([Token(TokenType.EOF, None, len(self.text))]).parse()
+
+    def snapshot(self):
+        return {
+            'version': self.version,
+            'lexical': {
+                'tokens': [token_info(token) for token in self.tokens],
+                'token_count': len(self.tokens)
+            },
+            'statements': [statement[2] for statement in self.statements],
+            'syntactic': self.syntactic()
+        }
+
+
+def document_size(key, document):
+    # Estimación: texto (y su versión en mayúsculas) más ~150 bytes por token
+    return sys.getsizeof(key) + 2 * sys.getsizeof(document.text) + 150 * len(document.tokens)
+
+
+class DocumentStore:
+    """Documentos del editor por id, en una LRU acotada"""
+
+    def __init__(self, max_documents=256, max_bytes=128 * 1024 * 1024):
+        self.documents = LRUCache(max_documents, max_bytes, sizeof=document_size)
+
+    def open(self, document_id, text):
+        document = Document(text)
+        self.documents.put(document_id, document)
+        return document.snapshot()
+
+    def edit(self, document_id, version, offset, removed, inserted):
+        """
+        Aplica la edición tal como la envía el cliente (offset y removed
+        enteros, inserted texto); DocumentError si no es válida
+        """
+        try:
+            if isinstance(offset, bool) or isinstance(removed, bool):
+                raise TypeError
+            offset = int(offset)
+            removed = int(removed)
+        except (TypeError, ValueError):
+            raise DocumentError("offset y removed deben ser números enteros")
+        if not isinstance(inserted, str):
+            raise DocumentError("inserted debe ser texto")
+        document = self.documents.get(document_id)
+        if document is None:
+            raise DocumentError("Documento desconocido, se debe enviar el texto completo")
+        with document.lock:
+            if document.version != version:
+                raise DocumentError("Versión del documento desincronizada")
+            result = document.apply_edit(offset, removed, inserted)
+        # Actualiza el tamaño estimado en la caché
+        self.documents.put(document_id, document)
+        return result
+
+    def lexed(self, document_id):
+        """
+        Texto del documento con sus (tokens, inicios, fines), para reutilizar
+        la tokenización (None si no se tokeniza por partes); None si no existe
+        """
+        document = self.documents.get(document_id)
+        if document is None:
+            return None
+        with document.lock:
+            if not document.incremental:
+                return document.text, None
+            return document.text, (list(document.tokens), list(document.starts), list(document.ends))
+
+    def close(self, document_id):
+        """Olvida el documento; False si no estaba abierto"""
+        return self.documents.pop(document_id) is not None
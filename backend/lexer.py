@@ -1,4 +1,6 @@
+import json
 import re
+from array import array
 from enum import Enum
 
 class TokenType(Enum):
@@ -16,6 +18,9 @@ class TokenType(Enum):
     SELECT = "SELECT"
     FROM = "FROM"
     WHERE = "WHERE"
+    BEGIN = "BEGIN"
+    COMMIT = "COMMIT"
+    ROLLBACK = "ROLLBACK"
     
     INT = "INT"
     VARCHAR = "VARCHAR"
@@ -40,27 +45,42 @@ class TokenType(Enum):
     EOF = "EOF"
 
 class Token:
+    __slots__ = ('type', 'value', 'position')
+    
     def __init__(self, type, value, position):
         self.type = type
         self.value = value
         self.position = position
     
+    def __eq__(self, other):
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (self.type, self.value, self.position) == (other.type, other.value, other.position)
+    
     def __repr__(self):
         return f"Token({self.type}, {repr(self.value)}, pos={self.position})"
 
+KEYWORDS = {
+    'CREATE', 'DATABASE', 'TABLE', 'USE', 'INSERT', 'INTO',
+    'VALUES', 'UPDATE', 'SET', 'DELETE', 'DROP', 'SELECT', 'FROM', 'WHERE',
+    'BEGIN', 'COMMIT', 'ROLLBACK',
+    'INT', 'VARCHAR', 'TEXT', 'DATE', 'FLOAT', 'BOOLEAN',
+    'PRIMARY', 'KEY', 'NOT', 'NULL', 'AUTO_INCREMENT'
+}
+
 class Lexer:
+    """
+    Lexer de referencia: recorre el texto carácter por carácter.
+    FastLexer produce exactamente los mismos tokens y es el que se usa en
+    analyze_sql; este se conserva para pruebas diferenciales.
+    """
     def __init__(self, text):
         self.text = text.upper()
         self.original_text = text
         self.position = 0
         self.tokens = []
         
-        self.keywords = {
-            'CREATE', 'DATABASE', 'TABLE', 'USE', 'INSERT', 'INTO',
-            'VALUES', 'UPDATE', 'SET', 'DELETE', 'DROP', 'SELECT', 'FROM', 'WHERE',
-            'INT', 'VARCHAR', 'TEXT', 'DATE', 'FLOAT', 'BOOLEAN',
-            'PRIMARY', 'KEY', 'NOT', 'NULL', 'AUTO_INCREMENT'
-        }
+        self.keywords = KEYWORDS
     
     def current_char(self):
         if self.position >= len(self.text):
@@ -168,4 +188,241 @@ class Lexer:
                 'position': token.position
             }
             for token in self.tokens if token.type != TokenType.EOF
-        ]
\ No newline at end of file
+        ]
+
+
+# Palabra clave -> tipo de token (las que no tienen tipo propio son IDENTIFIER)
+KEYWORD_TYPES = {
+    keyword: TokenType[keyword] if keyword in TokenType.__members__ else TokenType.IDENTIFIER
+    for keyword in KEYWORDS
+}
+
+SYMBOL_TYPES = {
+    '(': TokenType.LPAREN,
+    ')': TokenType.RPAREN,
+    ',': TokenType.COMMA,
+    ';': TokenType.SEMICOLON,
+    '=': TokenType.EQUALS,
+    '*': TokenType.ASTERISK
+}
+
+# Un solo patrón para todo el texto: cada coincidencia consume los espacios
+# previos y un token; el grupo que coincide indica el tipo
+TOKEN_PATTERN = re.compile(r"""
+    \s*
+    (?:
+        '([^']*)'?          # 1: cadena con comilla simple
+      | "([^"]*)"?          # 2: cadena con comilla doble
+      | (\d[\d.]*)          # 3: número
+      | ([^\W\d]\w*)        # 4: identificador o palabra clave
+      | (.)                 # 5: símbolo o carácter desconocido
+      | $                   # espacios al final del texto
+    )
+""", re.VERBOSE | re.DOTALL)
+
+
+def needs_reference_lexer(text):
+    """
+    Indica si el texto tiene caracteres en los que el patrón y los métodos
+    str.isdigit()/isalpha() del lexer de referencia no coinciden
+    (dígitos no decimales como '²' o numéricos no alfabéticos como '½').
+    """
+    if text.isascii():
+        return False
+    return any(
+        char.isalnum() and not (char.isalpha() or char.isdecimal())
+        for char in set(text)
+    )
+
+
+TOKEN_TYPES = list(TokenType)
+TYPE_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+STRING_CODE = TYPE_CODES[TokenType.STRING]
+NUMBER_CODE = TYPE_CODES[TokenType.NUMBER]
+KEYWORD_CODES = {keyword: TYPE_CODES[token_type] for keyword, token_type in KEYWORD_TYPES.items()}
+IDENTIFIER_CODE = TYPE_CODES[TokenType.IDENTIFIER]
+SYMBOL_CODES = {char: TYPE_CODES[token_type] for char, token_type in SYMBOL_TYPES.items()}
+UNKNOWN_CODE = TYPE_CODES[TokenType.UNKNOWN]
+
+# Los símbolos guardan como posición su inicio; el resto, su final
+# (la misma convención que el lexer de referencia)
+START_POSITION_CODES = set(SYMBOL_CODES.values()) | {UNKNOWN_CODE}
+
+# Tipos ya codificados en JSON para serializar sin pasar por dicts
+TYPE_JSON = [json.dumps(token_type.value) for token_type in TOKEN_TYPES]
+
+
+class TokenStream:
+    """
+    Tokens en columnas: código de tipo (array('B')) e inicio y fin de cada
+    token en el texto (array('I')). Los valores se obtienen del texto solo
+    cuando se piden. Se comporta como una lista de Token que termina en EOF.
+    """
+
+    def __init__(self, original_text, upper_text, fold=False):
+        self.original_text = original_text
+        # Con fold los valores se pasan a mayúsculas token por token
+        self.upper_text = None if fold else upper_text
+        self.codes = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+
+    def __len__(self):
+        return len(self.codes) + 1
+
+    def type(self, index):
+        if index == len(self.codes):
+            return TokenType.EOF
+        return TOKEN_TYPES[self.codes[index]]
+
+    def value(self, index):
+        if index == len(self.codes):
+            return None
+        start, end = self.starts[index], self.ends[index]
+        if self.codes[index] == STRING_CODE:
+            text = self.original_text
+            # Sin la comilla de cierre si la cadena está terminada
+            if end - start >= 2 and text[end - 1] == text[start]:
+                end -= 1
+            return text[start + 1:end]
+        if self.upper_text is None:
+            return self.original_text[start:end].upper()
+        return self.upper_text[start:end]
+
+    def position(self, index):
+        if index == len(self.codes):
+            return len(self.original_text)
+        if self.codes[index] in START_POSITION_CODES:
+            return self.starts[index]
+        return self.ends[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("índice de token fuera de rango")
+        return Token(self.type(index), self.value(index), self.position(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_list(self):
+        """Misma salida que Lexer.get_tokens_info()"""
+        return [
+            {
+                'type': TOKEN_TYPES[code].value,
+                'value': self.value(index),
+                'position': self.position(index)
+            }
+            for index, code in enumerate(self.codes)
+        ]
+
+    def iter_json(self, batch_size=1024):
+        """Genera el JSON de to_list() por partes, directamente de las columnas"""
+        yield '['
+        parts = []
+        for index, code in enumerate(self.codes):
+            parts.append(
+                f'{{"type": {TYPE_JSON[code]}, "value": {json.dumps(self.value(index))}, '
+                f'"position": {self.position(index)}}}'
+            )
+            if len(parts) == batch_size:
+                yield ('' if index + 1 == batch_size else ', ') + ', '.join(parts)
+                parts = []
+        if parts:
+            yield ('' if len(self.codes) == len(parts) else ', ') + ', '.join(parts)
+        yield ']'
+
+
+class FastLexer(Lexer):
+    """
+    Lexer de una sola pasada basado en TOKEN_PATTERN.
+    Produce la misma salida que Lexer en tiempo lineal, como TokenStream.
+    """
+    def tokenize(self):
+        text = self.text
+        fold = False
+        if len(text) != len(self.original_text):
+            # upper() cambió la longitud (p. ej. 'ß' -> 'SS'): se recorre el
+            # texto original para no desalinear posiciones y se convierte cada valor
+            text = self.original_text
+            fold = True
+
+        # (con fold el lexer de referencia tampoco sirve: sus posiciones se desalinean)
+        if not fold and needs_reference_lexer(text):
+            self.position = 0
+            return super().tokenize()
+
+        stream = TokenStream(self.original_text, self.text, fold)
+        add_code = stream.codes.append
+        add_start = stream.starts.append
+        add_end = stream.ends.append
+
+        for match in TOKEN_PATTERN.finditer(text):
+            group = match.lastindex
+            if group is None:
+                continue
+            if group <= 2:
+                add_code(STRING_CODE)
+                add_start(match.start(group) - 1)
+            elif group == 3:
+                add_code(NUMBER_CODE)
+                add_start(match.start(3))
+            elif group == 4:
+                value = match.group(4).upper() if fold else match.group(4)
+                add_code(KEYWORD_CODES.get(value, IDENTIFIER_CODE))
+                add_start(match.start(4))
+            else:
+                char = match.group(5).upper() if fold else match.group(5)
+                add_code(SYMBOL_CODES.get(char, UNKNOWN_CODE))
+                add_start(match.start(5))
+            add_end(match.end())
+
+        self.position = len(text)
+        self.tokens = stream
+        return stream
+
+    def get_tokens_info(self):
+        if isinstance(self.tokens, TokenStream):
+            return self.tokens.to_list()
+        return super().get_tokens_info()
+
+    def compact_tokens_info(self):
+        """
+        Como get_tokens_info, pero sin crear un dict por token: devuelve el
+        TokenStream, que se serializa a la misma lista (to_list/iter_json)
+        """
+        if isinstance(self.tokens, TokenStream):
+            return self.tokens
+        return super().get_tokens_info()
+
+
+def scan_tokens(text, original_text, position=0):
+    """
+    Genera (token, inicio, fin) desde position con el mismo criterio que
+    FastLexer.tokenize, para volver a tokenizar solo un tramo del texto.
+    text es original_text en mayúsculas y debe tener la misma longitud.
+    """
+    for match in TOKEN_PATTERN.finditer(text, position):
+        group = match.lastindex
+        if group is None:
+            continue
+        if group <= 2:
+            token = Token(TokenType.STRING, original_text[match.start(group):match.end(group)], match.end())
+            start = match.start(group) - 1
+        elif group == 3:
+            token = Token(TokenType.NUMBER, match.group(3), match.end())
+            start = match.start(3)
+        elif group == 4:
+            value = match.group(4)
+            token = Token(KEYWORD_TYPES.get(value, TokenType.IDENTIFIER), value, match.end())
+            start = match.start(4)
+        else:
+            char = match.group(5)
+            token = Token(SYMBOL_TYPES.get(char, TokenType.UNKNOWN), char, match.start(5))
+            start = match.start(5)
+        yield token, start, match.end()
@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+logger = logging.getLogger('sql.slow')
+
+# Límites superiores (segundos) de los buckets de los histogramas
+BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Duraciones agrupadas en buckets fijos; los percentiles se estiman interpolando"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        # Un bucket más para lo que supera el último límite (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def percentile(self, q):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        result = {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0
+        }
+        for q in PERCENTILES:
+            result['p%d' % (q * 100)] = self.percentile(q)
+        return result
+
+
+class Timer:
+    """Mide el bloque with y lo registra en el histograma"""
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer:
+    """Timer de las métricas desactivadas: no mide nada"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """
+    Instrumentación del camino de cada consulta: un histograma por etapa
+    (lex, parse, acquire, execute, serialize, total), contadores por
+    statement_type y resultado, y un registro de consultas lentas.
+
+    Desactivadas, timer() devuelve un objeto compartido que no hace nada y
+    los demás métodos vuelven enseguida.
+    """
+
+    def __init__(self, enabled=True, slow_query_threshold=1.0, slow_log_size=100):
+        self.enabled = enabled
+        self.slow_query_threshold = slow_query_threshold
+        self.stages = {}
+        self.statements = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.slow_total = 0
+        self._lock = threading.Lock()
+
+    def timer(self, stage):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self.histogram(stage))
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self.histogram(stage).observe(seconds)
+
+    def histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        return histogram
+
+    def count(self, statement_type, success):
+        if not self.enabled:
+            return
+        key = (statement_type or 'UNKNOWN', 'success' if success else 'error')
+        with self._lock:
+            self.statements[key] = self.statements.get(key, 0) + 1
+
+    def query_finished(self, query, statement_type, seconds, database=None):
+        """Registra la consulta si tardó más que slow_query_threshold"""
+        if not self.enabled or seconds < self.slow_query_threshold:
+            return
+        entry = {
+            'query': query[:1000],
+            'statement_type': statement_type,
+            'database': database,
+            'seconds': seconds,
+            'time': time.time()
+        }
+        with self._lock:
+            self.slow_queries.append(entry)
+            self.slow_total += 1
+        logger.warning('Consulta lenta (%.1f ms, %s): %s', seconds * 1000, database, entry['query'])
+
+    def snapshot(self):
+        with self._lock:
+            stages = dict(self.stages)
+            statements = dict(self.statements)
+            slow_queries = list(self.slow_queries)
+        return {
+            'enabled': self.enabled,
+            'stages': {stage: histogram.snapshot() for stage, histogram in sorted(stages.items())},
+            'statements': [
+                {'statement_type': statement_type, 'status': status, 'count': count}
+                for (statement_type, status), count in sorted(statements.items())
+            ],
+            'slow_query_threshold': self.slow_query_threshold,
+            'slow_queries_total': self.slow_total,
+            'slow_queries': slow_queries
+        }
+
+    def prometheus(self):
+        """Métricas en el formato de texto de Prometheus"""
+        with self._lock:
+            stages = sorted(self.stages.items())
+            statements = sorted(self.statements.items())
+            slow_total = self.slow_total
+
+        lines = [
+            '# HELP sql_stage_seconds Duración de cada etapa de una consulta.',
+            '# TYPE sql_stage_seconds histogram'
+        ]
+        for stage, histogram in stages:
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total = histogram.count
+                seconds = histogram.sum
+            label = escape_label(stage)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append('sql_stage_seconds_bucket{stage="%s",le="%s"} %d' % (label, bound, cumulative))
+            lines.append('sql_stage_seconds_sum{stage="%s"} %r' % (label, seconds))
+            lines.append('sql_stage_seconds_count{stage="%s"} %d' % (label, total))
+
+        lines.append('# HELP sql_stage_seconds_quantile Percentiles estimados de cada etapa.')
+        lines.append('# TYPE sql_stage_seconds_quantile gauge')
+        for stage, histogram in stages:
+            for q in PERCENTILES:
+                lines.append('sql_stage_seconds_quantile{stage="%s",quantile="%s"} %r' % (
+                    escape_label(stage), q, histogram.percentile(q)
+                ))
+
+        lines.append('# HELP sql_statements_total Sentencias ejecutadas por tipo y resultado.')
+        lines.append('# TYPE sql_statements_total counter')
+        for (statement_type, status), count in statements:
+            lines.append('sql_statements_total{statement_type="%s",status="%s"} %d' % (
+                escape_label(statement_type), status, count
+            ))
+
+        lines.append('# HELP sql_slow_queries_total Consultas que superaron el umbral de lentitud.')
+        lines.append('# TYPE sql_slow_queries_total counter')
+        lines.append('sql_slow_queries_total %d' % slow_total)
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.statements = {}
+            self.slow_queries.clear()
+            self.slow_total = 0
@@ -1,4 +1,5 @@
-from lexer import Lexer, TokenType
+from lexer import FastLexer, TokenType
+from sqlast import Statement, ColumnDefinition
 
 class ParseError(Exception):
     def __init__(self, message, position=None):
@@ -6,10 +7,23 @@ class ParseError(Exception):
         self.position = position
         super().__init__(self.message)
 
+# Tokens con los que puede empezar una sentencia
+STATEMENT_TOKENS = (
+    TokenType.CREATE, TokenType.USE, TokenType.INSERT, TokenType.UPDATE,
+    TokenType.DELETE, TokenType.DROP, TokenType.SELECT,
+    TokenType.BEGIN, TokenType.COMMIT, TokenType.ROLLBACK
+)
+
 class Parser:
     def __init__(self, tokens):
         self.tokens = tokens
         self.current = 0
+        # Árbol de la sentencia (plantilla, ver sqlast.Statement)
+        self.statement = None
+        # Índices de los tokens que ocupan posiciones de valor
+        self.value_indices = []
+        # Tipos de token que se aceptarían al final del texto (para autocompletar)
+        self.expected = set()
     
     def current_token(self):
         if self.current < len(self.tokens):
@@ -28,6 +42,8 @@ class Parser:
     
     def expect(self, token_type):
         token = self.current_token()
+        if token.type == TokenType.EOF:
+            self.expected.add(token_type)
         if token.type != token_type:
             raise ParseError(
                 f"Comando incompleto",
@@ -36,12 +52,21 @@ class Parser:
         self.advance()
         return token
     
+    def expect_index(self, token_type):
+        """Como expect, pero devuelve el índice del token"""
+        index = self.current
+        self.expect(token_type)
+        return index
+    
     def match(self, *token_types):
-        return self.current_token().type in token_types
+        token_type = self.current_token().type
+        if token_type == TokenType.EOF:
+            self.expected.update(token_types)
+        return token_type in token_types
     
     def parse(self):
         try:
-            result = self.parse_statement()
+            statement = self.parse_statement()
             
             if not self.match(TokenType.SEMICOLON, TokenType.EOF):
                 raise ParseError(
@@ -49,10 +74,12 @@ class Parser:
                     self.current_token().position
                 )
             
+            statement.value_indices = self.value_indices
+            self.statement = statement
             return {
                 'valid': True,
                 'message': 'Comando SQL válido',
-                'statement_type': result
+                'statement_type': statement.type
             }
         except ParseError as e:
             return {
@@ -78,7 +105,11 @@ class Parser:
             return self.parse_drop()
         elif token.type == TokenType.SELECT:
             return self.parse_select()
+        elif token.type in (TokenType.BEGIN, TokenType.COMMIT, TokenType.ROLLBACK):
+            return self.parse_transaction()
         else:
+            if token.type == TokenType.EOF:
+                self.expected.update(STATEMENT_TOKENS)
             raise ParseError(
                 f"Comando no reconocido: {token.value}",
                 token.position
@@ -99,22 +130,23 @@ class Parser:
     
     def parse_create_database(self):
         self.expect(TokenType.DATABASE)
-        self.expect(TokenType.IDENTIFIER)
-        return "CREATE_DATABASE"
+        name = self.expect_index(TokenType.IDENTIFIER)
+        return Statement("CREATE_DATABASE", database=name)
     
     def parse_create_table(self):
         self.expect(TokenType.TABLE)
-        self.expect(TokenType.IDENTIFIER)
+        table = self.expect_index(TokenType.IDENTIFIER)
         self.expect(TokenType.LPAREN)
         
-        self.parse_column_definitions()
+        definitions = self.parse_column_definitions()
         
         self.expect(TokenType.RPAREN)
-        return "CREATE_TABLE"
+        return Statement("CREATE_TABLE", table=table, definitions=definitions)
     
     def parse_column_definitions(self):
+        definitions = []
         while True:
-            self.expect(TokenType.IDENTIFIER)
+            name = self.expect_index(TokenType.IDENTIFIER)
             
             if not self.match(TokenType.INT, TokenType.VARCHAR, TokenType.TEXT, 
                              TokenType.DATE, TokenType.FLOAT, TokenType.BOOLEAN):
@@ -122,67 +154,80 @@ class Parser:
                     "Se esperaba un tipo de dato válido (INT, VARCHAR, TEXT, etc.)",
                     self.current_token().position
                 )
+            column_type = self.current_token().type
             self.advance()
             
-            if self.tokens[self.current - 1].type == TokenType.VARCHAR:
+            length = None
+            if column_type == TokenType.VARCHAR:
                 if self.match(TokenType.LPAREN):
                     self.advance()
-                    self.expect(TokenType.NUMBER)
+                    length = self.expect_index(TokenType.NUMBER)
                     self.expect(TokenType.RPAREN)
             
+            # PRIMARY KEY, NOT NULL, AUTO_INCREMENT... (en mayúsculas)
+            options = []
             while self.match(TokenType.IDENTIFIER):
+                options.append(self.current_token().value)
                 self.advance()
+            definitions.append(ColumnDefinition(name, column_type, length, tuple(options)))
             
             if self.match(TokenType.COMMA):
                 self.advance()
             else:
                 break
+        return definitions
     
     def parse_use(self):
         self.expect(TokenType.USE)
-        self.expect(TokenType.IDENTIFIER)
-        return "USE"
+        name = self.expect_index(TokenType.IDENTIFIER)
+        return Statement("USE", database=name)
     
     def parse_insert(self):
         self.expect(TokenType.INSERT)
         self.expect(TokenType.INTO)
-        self.expect(TokenType.IDENTIFIER)
+        table = self.expect_index(TokenType.IDENTIFIER)
         
+        columns = []
         if self.match(TokenType.LPAREN):
             self.advance()
-            self.parse_identifier_list()
+            columns = self.parse_identifier_list()
             self.expect(TokenType.RPAREN)
         
-        self.expect(TokenType.VALUES)
+        values_keyword = self.expect_index(TokenType.VALUES)
         self.expect(TokenType.LPAREN)
-        self.parse_value_list()
+        values = self.parse_value_list()
         self.expect(TokenType.RPAREN)
         
-        return "INSERT"
+        return Statement(
+            "INSERT", table=table, columns=columns, values=values,
+            values_position=values_keyword
+        )
     
     def parse_update(self):
         self.expect(TokenType.UPDATE)
-        self.expect(TokenType.IDENTIFIER)
+        table = self.expect_index(TokenType.IDENTIFIER)
         self.expect(TokenType.SET)
         
-        self.parse_assignments()
+        assignments = self.parse_assignments()
 
+        condition = None
         if self.match(TokenType.WHERE):
             self.advance()
-            self.parse_condition()
+            condition = self.parse_condition()
         
-        return "UPDATE"
+        return Statement("UPDATE", table=table, assignments=assignments, condition=condition)
     
     def parse_delete(self):
         self.expect(TokenType.DELETE)
         self.expect(TokenType.FROM)
-        self.expect(TokenType.IDENTIFIER)
+        table = self.expect_index(TokenType.IDENTIFIER)
         
+        condition = None
         if self.match(TokenType.WHERE):
             self.advance()
-            self.parse_condition()
+            condition = self.parse_condition()
         
-        return "DELETE"
+        return Statement("DELETE", table=table, condition=condition)
     
     def parse_drop(self):
         """DROP DATABASE nombre;"""
@@ -190,12 +235,12 @@ class Parser:
         
         if self.match(TokenType.DATABASE):
             self.expect(TokenType.DATABASE)
-            self.expect(TokenType.IDENTIFIER)
-            return "DROP_DATABASE"
+            name = self.expect_index(TokenType.IDENTIFIER)
+            return Statement("DROP_DATABASE", database=name)
         elif self.match(TokenType.TABLE):
             self.expect(TokenType.TABLE)
-            self.expect(TokenType.IDENTIFIER)
-            return "DROP_TABLE"
+            table = self.expect_index(TokenType.IDENTIFIER)
+            return Statement("DROP_TABLE", table=table)
         else:
             raise ParseError(
                 "Después de DROP se esperaba DATABASE o TABLE",
@@ -206,35 +251,49 @@ class Parser:
         """SELECT * FROM tabla WHERE condicion;"""
         self.expect(TokenType.SELECT)
         
+        columns = None
         if self.match(TokenType.ASTERISK):
             self.advance()
         else:
-            self.parse_identifier_list()
+            columns = self.parse_identifier_list()
         
         self.expect(TokenType.FROM)
-        self.expect(TokenType.IDENTIFIER)
+        table = self.expect_index(TokenType.IDENTIFIER)
         
+        condition = None
         if self.match(TokenType.WHERE):
             self.advance()
-            self.parse_condition()
+            condition = self.parse_condition()
         
-        return "SELECT"
+        return Statement("SELECT", table=table, columns=columns, condition=condition)
+    
+    def parse_transaction(self):
+        """BEGIN; COMMIT; ROLLBACK;"""
+        token = self.current_token()
+        self.advance()
+        return Statement(token.type.value)
     
     def parse_identifier_list(self):
-        self.expect(TokenType.IDENTIFIER)
+        """Índices de los identificadores separados por comas"""
+        identifiers = [self.expect_index(TokenType.IDENTIFIER)]
         while self.match(TokenType.COMMA):
             self.advance()
-            self.expect(TokenType.IDENTIFIER)
+            identifiers.append(self.expect_index(TokenType.IDENTIFIER))
+        return identifiers
     
     def parse_value_list(self):
-        self.parse_value()
+        values = [self.parse_value()]
         while self.match(TokenType.COMMA):
             self.advance()
-            self.parse_value()
+            values.append(self.parse_value())
+        return values
     
     def parse_value(self):
+        """Devuelve el ordinal del valor en value_indices"""
         if self.match(TokenType.STRING, TokenType.NUMBER, TokenType.IDENTIFIER):
+            self.value_indices.append(self.current)
             self.advance()
+            return len(self.value_indices) - 1
         else:
             raise ParseError(
                 "Se esperaba un valor (string, número o identificador)",
@@ -242,33 +301,41 @@ class Parser:
             )
     
     def parse_assignments(self):
-        self.expect(TokenType.IDENTIFIER)
-        self.expect(TokenType.EQUALS)
-        self.parse_value()
+        assignments = [self.parse_condition()]
         
         while self.match(TokenType.COMMA):
             self.advance()
-            self.expect(TokenType.IDENTIFIER)
-            self.expect(TokenType.EQUALS)
-            self.parse_value()
+            assignments.append(self.parse_condition())
+        return assignments
     
     def parse_condition(self):
-        self.expect(TokenType.IDENTIFIER)
+        """columna = valor: (índice de la columna, ordinal del valor)"""
+        column = self.expect_index(TokenType.IDENTIFIER)
         self.expect(TokenType.EQUALS)
-        self.parse_value()
+        return column, self.parse_value()
 
 
-def analyze_sql(sql_command):
-    lexer = Lexer(sql_command)
+def analyze_statement(sql_command):
+    """
+    Igual que analyze_sql, pero devuelve también el árbol de la sentencia
+    (sqlast.Statement con nombres y valores), o None si no es válida
+    """
+    lexer = FastLexer(sql_command)
     tokens = lexer.tokenize()
     
     parser = Parser(tokens)
     parse_result = parser.parse()
     
-    return {
+    analysis = {
         'lexical': {
-            'tokens': lexer.get_tokens_info(),
+            'tokens': lexer.compact_tokens_info(),
             'token_count': len(tokens) - 1
         },
         'syntactic': parse_result
-    }
\ No newline at end of file
+    }
+    statement = parser.statement.bind(tokens, sql_command) if parser.statement else None
+    return analysis, statement
+
+
+def analyze_sql(sql_command):
+    return analyze_statement(sql_command)[0]
@@ -0,0 +1,242 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# database para lo que no depende de la base de datos seleccionada
+# (consultas a INFORMATION_SCHEMA, ping): sirve cualquier conexión tal como está
+ANY_DATABASE = object()
+
+
+class PoolError(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+def take_idle(idle, database):
+    """
+    Saca de idle (deque, la más reciente al final) la conexión para
+    database: una que ya esté en ella y si no, una en otra base de datos
+    (basta un USE); las que no tienen ninguna se dejan para database None,
+    que no puede reutilizar las demás (MySQL no deselecciona la base de datos)
+    """
+    if not idle:
+        return None
+    if database is ANY_DATABASE:
+        return idle.pop()
+    for conn in reversed(idle):
+        if conn.database == database:
+            idle.remove(conn)
+            return conn
+    if database is None:
+        # Se reemplazará: la que lleva más tiempo sin usarse
+        return idle.popleft()
+    for conn in reversed(idle):
+        if conn.database is not None:
+            idle.remove(conn)
+            return conn
+    return idle.pop()
+
+
+class PooledConnection:
+    """Conexión física administrada por el pool"""
+
+    def __init__(self, raw, database=None):
+        self.raw = raw
+        self.database = database
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    def __getattr__(self, name):
+        # Todo lo demás (cursor, commit, rollback...) se delega a la conexión real
+        return getattr(self.raw, name)
+
+    def close(self):
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool acotado de conexiones MySQL.
+
+    Las conexiones se reutilizan entre peticiones; al tomarlas se prefiere una
+    que ya tenga seleccionada la base de datos pedida y, si no hay, se hace USE
+    sobre otra (ver take_idle; con ANY_DATABASE sirve cualquiera). Las
+    conexiones inactivas o demasiado viejas se descartan y se verifican con
+    ping antes de entregarlas si llevan tiempo sin usarse.
+    """
+
+    def __init__(self, connect, size=5, timeout=10, max_idle=300,
+                 max_lifetime=3600, health_check_interval=30):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()
+        self._open = 0
+        self._condition = threading.Condition()
+
+        self.checked_out = 0
+        self.waiting = 0
+        self.created = 0
+        self.recycled = 0
+        self.timeouts = 0
+
+    def acquire(self, database=None, timeout=None):
+        """Obtiene una conexión del pool, esperando si está lleno"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        conn = None
+        stale = []
+
+        try:
+            with self._condition:
+                stale = self._evict_stale()
+                self.waiting += 1
+                try:
+                    while True:
+                        conn = take_idle(self._idle, database)
+                        if conn is not None:
+                            break
+                        if self._open < self.size:
+                            self._open += 1
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolError(
+                                "Tiempo de espera agotado al obtener una conexión del pool"
+                            )
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                self.checked_out += 1
+        finally:
+            # Fuera del lock, también si se agotó la espera
+            for old in stale:
+                old.close()
+
+        try:
+            return self._prepare(conn, database)
+        except Exception:
+            with self._condition:
+                self.checked_out -= 1
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        """Devuelve una conexión al pool (o la cierra si ya no sirve)"""
+        if not discard:
+            try:
+                if conn.raw.in_transaction:
+                    conn.raw.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            conn.close()
+
+        with self._condition:
+            self.checked_out -= 1
+            if discard:
+                self._open -= 1
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, database=None):
+        conn = self.acquire(database)
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=not self._is_alive(conn))
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'checked_out': self.checked_out,
+                'waiting': self.waiting,
+                'created': self.created,
+                'recycled': self.recycled,
+                'timeouts': self.timeouts
+            }
+
+    def close(self):
+        """Cierra todas las conexiones inactivas"""
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._condition.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def _evict_stale(self):
+        now = time.monotonic()
+        stale = [
+            conn for conn in self._idle
+            if now - conn.last_used > self.max_idle
+            or now - conn.created_at > self.max_lifetime
+        ]
+        for conn in stale:
+            self._idle.remove(conn)
+        self._open -= len(stale)
+        self.recycled += len(stale)
+        return stale
+
+    def _prepare(self, conn, database):
+        if conn is not None:
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for > self.health_check_interval and not self._is_alive(conn):
+                conn.close()
+                conn = None
+                self._count_recycled()
+            elif database is None and conn.database is not None:
+                # MySQL no permite deseleccionar la base de datos: conexión nueva
+                conn.close()
+                conn = None
+                self._count_recycled()
+
+        if conn is None:
+            if database is ANY_DATABASE:
+                database = None
+            conn = PooledConnection(self.connect(database), database)
+            with self._condition:
+                self.created += 1
+        elif database is not ANY_DATABASE and conn.database != database:
+            try:
+                conn.raw.database = database
+            except Exception:
+                conn.close()
+                raise
+            conn.database = database
+
+        return conn
+
+    def _count_recycled(self):
+        with self._condition:
+            self.recycled += 1
+
+    def _is_alive(self, conn):
+        try:
+            conn.raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,649 @@
+"""
+Motor de ejecución en memoria para el modo sandbox y las pruebas en seco.
+
+Ejecuta los sqlast.Statement del Parser (la gramática completa: CREATE/DROP
+DATABASE y TABLE, USE, INSERT, UPDATE, DELETE, SELECT con WHERE col = valor
+y BEGIN/COMMIT/ROLLBACK) sin un servidor MySQL. Cada tabla guarda sus
+datos por columnas, con un índice hash sobre la PRIMARY KEY: un WHERE sobre
+la clave es O(1) y sobre otra columna recorre solo esa columna.
+
+Los valores se convierten al tipo de la columna y los errores reproducen
+el código y el mensaje de MySQL. Los nombres no distinguen mayúsculas, y
+las cadenas se comparan como con la intercalación predeterminada de MySQL
+(sin distinguir mayúsculas).
+
+El estado completo se puede guardar en un archivo JSON (save) y
+recuperar (MemoryEngine.load).
+"""
+import copy
+import json
+import os
+import re
+import tempfile
+from datetime import date
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from lexer import TokenType
+from executor import rows_result, affected_result, next_page, TRANSACTION_MESSAGES
+from parser import analyze_statement
+
+SNAPSHOT_VERSION = 1
+
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0', 'Z': '\x1a', 'b': '\b'}
+
+# Longitud máxima de una columna TEXT
+TEXT_LENGTH = 65535
+
+INT_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+
+class SandboxError(Exception):
+    """Error de una sentencia con el código que daría MySQL"""
+    def __init__(self, message, errno):
+        self.message = message
+        self.errno = errno
+        super().__init__(f'{errno}: {message}')
+
+
+def fold(value):
+    """Clave de comparación: las cadenas no distinguen mayúsculas"""
+    return value.casefold() if isinstance(value, str) else value
+
+
+def literal(token):
+    """Valor de Python de un literal del Parser (antes de convertirlo al tipo de la columna)"""
+    if token.type == TokenType.STRING:
+        return re.sub(r'\\(.)', lambda m: ESCAPES.get(m.group(1), m.group(1)), token.value)
+    if token.type == TokenType.NUMBER:
+        try:
+            return int(token.value) if '.' not in token.value else Decimal(token.value)
+        except (ValueError, InvalidOperation):
+            raise SandboxError(
+                f"You have an error in your SQL syntax near '{token.value}'", 1064
+            )
+    if token.value == 'NULL':
+        return None
+    if token.value in ('TRUE', 'FALSE'):
+        return int(token.value == 'TRUE')
+    raise SandboxError(f"Unknown column '{token.value.lower()}' in 'field list'", 1054)
+
+
+class Column:
+    """Definición de una columna con la conversión de valores a su tipo"""
+    __slots__ = ('name', 'type', 'length', 'options', 'primary_key', 'not_null', 'auto_increment')
+
+    def __init__(self, name, type, length=None, options=()):
+        self.name = name
+        self.type = type
+        self.length = length
+        self.options = tuple(options)
+        words = ' '.join(self.options)
+        self.primary_key = 'PRIMARY KEY' in words
+        self.not_null = self.primary_key or 'NOT NULL' in words
+        self.auto_increment = 'AUTO_INCREMENT' in words
+
+    def convert(self, value, row=1):
+        """Valor para guardar en la columna (modo estricto de MySQL)"""
+        if value is None:
+            return None
+        type = self.type
+        if type in (TokenType.INT, TokenType.BOOLEAN):
+            number = self.number(value, row)
+            converted = int(number.quantize(Decimal(1), ROUND_HALF_UP))
+            if type == TokenType.INT and not INT_RANGE[0] <= converted <= INT_RANGE[1]:
+                raise SandboxError(f"Out of range value for column '{self.name}' at row {row}", 1264)
+            return converted
+        if type == TokenType.FLOAT:
+            return float(self.number(value, row))
+        if type == TokenType.DATE:
+            try:
+                return value if isinstance(value, date) else date.fromisoformat(str(value).strip())
+            except ValueError:
+                raise SandboxError(
+                    f"Incorrect date value: '{value}' for column '{self.name}' at row {row}", 1292
+                )
+        text = str(value)
+        limit = self.length if type == TokenType.VARCHAR else TEXT_LENGTH
+        if limit is not None and len(text) > limit:
+            raise SandboxError(f"Data too long for column '{self.name}' at row {row}", 1406)
+        return text
+
+    def number(self, value, row):
+        if isinstance(value, (int, Decimal)):
+            return Decimal(value)
+        try:
+            return Decimal(str(value).strip())
+        except InvalidOperation:
+            kind = 'integer' if self.type != TokenType.FLOAT else 'double'
+            raise SandboxError(
+                f"Incorrect {kind} value: '{value}' for column '{self.name}' at row {row}", 1366
+            )
+
+    def to_json(self):
+        return {
+            'name': self.name,
+            'type': self.type.value,
+            'length': self.length,
+            'options': list(self.options)
+        }
+
+
+class Table:
+    """
+    Tabla por columnas: data[i] es la lista de valores de la columna i y
+    alive marca las filas vigentes (las borradas se compactan después).
+    index lleva la clave primaria (plegada con fold) a su fila.
+    """
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = columns
+        self.positions = {column.name.lower(): i for i, column in enumerate(columns)}
+        self.data = [[] for _ in columns]
+        self.alive = []
+        self.deleted = 0
+        self.key = next((i for i, column in enumerate(columns) if column.primary_key), None)
+        self.index = {}
+        self.auto_increment = 1
+
+    def __len__(self):
+        return len(self.alive) - self.deleted
+
+    def position(self, name, clause='field list'):
+        position = self.positions.get(name.lower())
+        if position is None:
+            raise SandboxError(f"Unknown column '{name}' in '{clause}'", 1054)
+        return position
+
+    def find(self, position, value):
+        """Filas vigentes con columna = valor"""
+        if value is None:
+            # = NULL no es verdadero para ninguna fila
+            return []
+        target = fold(value)
+        if position == self.key:
+            row = self.index.get(target)
+            return [] if row is None else [row]
+        alive = self.alive
+        return [
+            row for row, current in enumerate(self.data[position])
+            if alive[row] and current is not None and fold(current) == target
+        ]
+
+    def scan(self):
+        return [row for row, alive in enumerate(self.alive) if alive]
+
+    def check_key(self, value, row=None):
+        existing = self.index.get(fold(value))
+        if existing is not None and existing != row:
+            raise SandboxError(f"Duplicate entry '{value}' for key '{self.name}.PRIMARY'", 1062)
+
+    def insert(self, values):
+        """Agrega una fila (valores ya convertidos y validados) y devuelve su número"""
+        row = len(self.alive)
+        for column, value in zip(self.data, values):
+            column.append(value)
+        self.alive.append(True)
+        if self.key is not None:
+            self.index[fold(values[self.key])] = row
+        return row
+
+    def set(self, row, position, value):
+        if position == self.key:
+            del self.index[fold(self.data[position][row])]
+            self.index[fold(value)] = row
+        self.data[position][row] = value
+
+    def delete(self, row):
+        self.alive[row] = False
+        self.deleted += 1
+        if self.key is not None:
+            del self.index[fold(self.data[self.key][row])]
+
+    def restore(self, row):
+        self.alive[row] = True
+        self.deleted -= 1
+        if self.key is not None:
+            self.index[fold(self.data[self.key][row])] = row
+
+    def compact(self):
+        """Descarta las filas borradas cuando son la mitad de la tabla"""
+        if not self.deleted or self.deleted * 2 < len(self.alive):
+            return
+        rows = self.scan()
+        self.data = [[values[row] for row in rows] for values in self.data]
+        self.alive = [True] * len(rows)
+        self.deleted = 0
+        if self.key is not None:
+            self.index = {fold(value): row for row, value in enumerate(self.data[self.key])}
+
+    def rows(self, rows, positions):
+        return [tuple(self.data[position][row] for position in positions) for row in rows]
+
+    def to_json(self):
+        rows = self.scan()
+        data = []
+        for column, values in zip(self.columns, self.data):
+            values = [values[row] for row in rows]
+            if column.type == TokenType.DATE:
+                values = [None if value is None else value.isoformat() for value in values]
+            data.append(values)
+        return {
+            'name': self.name,
+            'columns': [column.to_json() for column in self.columns],
+            'auto_increment': self.auto_increment,
+            'data': data
+        }
+
+    @classmethod
+    def from_json(cls, entry):
+        columns = [
+            Column(column['name'], TokenType(column['type']), column['length'], column['options'])
+            for column in entry['columns']
+        ]
+        table = cls(entry['name'], columns)
+        table.auto_increment = entry['auto_increment']
+        for values in zip(*entry['data']):
+            table.insert([column.convert(value) for column, value in zip(columns, values)])
+        return table
+
+
+class MemoryEngine:
+    """
+    Servidor en memoria: bases de datos con sus tablas y la base de datos
+    seleccionada. execute() devuelve el mismo resultado que
+    executor.run_statement (filas como tuplas con columns) o lanza
+    SandboxError.
+
+    Cada sentencia se confirma sola salvo entre BEGIN y COMMIT/ROLLBACK,
+    donde las escrituras guardan cómo deshacerse; como en MySQL, un DDL
+    confirma la transacción abierta.
+    """
+
+    def __init__(self, database=None):
+        # nombre en minúsculas -> (nombre, {tabla en minúsculas: Table})
+        self.databases = {}
+        self.database = database
+        self.undo = None
+        self.statements = 0
+
+    @property
+    def in_transaction(self):
+        return self.undo is not None
+
+    def execute(self, statement, page=None, max_rows=None):
+        """
+        Ejecuta un sqlast.Statement ya resuelto (bind). page pagina un
+        SELECT como executor.paginate (limit, offset o key y after).
+        """
+        handler = getattr(self, 'execute_' + statement.type.lower(), None)
+        if handler is None:
+            raise SandboxError(f'Sentencia no admitida: {statement.type}', 1064)
+        self.statements += 1
+        if statement.type.startswith(('CREATE', 'DROP')) and self.undo is not None:
+            self.commit()
+        if statement.type == 'SELECT':
+            return handler(statement, page, max_rows)
+        return handler(statement)
+
+    # Transacciones
+
+    def execute_begin(self, statement):
+        self.commit()
+        self.undo = []
+        return dict(affected_result(0), message=TRANSACTION_MESSAGES['BEGIN'])
+
+    def execute_commit(self, statement):
+        self.commit()
+        return dict(affected_result(0), message=TRANSACTION_MESSAGES['COMMIT'])
+
+    def execute_rollback(self, statement):
+        self.rollback()
+        return dict(affected_result(0), message=TRANSACTION_MESSAGES['ROLLBACK'])
+
+    def commit(self):
+        undo = self.undo
+        self.undo = None
+        for table in {id(entry[0]): entry[0] for entry in undo or ()}.values():
+            table.compact()
+
+    def rollback(self):
+        undo = self.undo or []
+        self.undo = None
+        for table, action, row, values in reversed(undo):
+            if action == 'insert':
+                table.delete(row)
+            elif action == 'delete':
+                table.restore(row)
+            else:
+                for position, value in values:
+                    table.set(row, position, value)
+        for table in {id(entry[0]): entry[0] for entry in undo}.values():
+            table.compact()
+
+    def record(self, table, action, row, values=None):
+        if self.undo is not None:
+            self.undo.append((table, action, row, values))
+
+    # Bases de datos
+
+    def schema(self, name):
+        entry = self.databases.get((name or '').lower())
+        if entry is None:
+            raise SandboxError(f"Unknown database '{name}'", 1049)
+        return entry[1]
+
+    def execute_create_database(self, statement):
+        key = statement.database.lower()
+        if key in self.databases:
+            raise SandboxError(
+                f"Can't create database '{statement.database}'; database exists", 1007
+            )
+        self.databases[key] = (statement.database, {})
+        return affected_result(1)
+
+    def execute_drop_database(self, statement):
+        entry = self.databases.pop(statement.database.lower(), None)
+        if entry is None:
+            raise SandboxError(
+                f"Can't drop database '{statement.database}'; database doesn't exist", 1008
+            )
+        if self.database and self.database.lower() == statement.database.lower():
+            self.database = None
+        return affected_result(len(entry[1]))
+
+    def execute_use(self, statement):
+        self.schema(statement.database)
+        self.database = self.databases[statement.database.lower()][0]
+        return affected_result(0)
+
+    # Tablas
+
+    def tables(self):
+        if not self.database:
+            raise SandboxError('No database selected', 1046)
+        return self.schema(self.database)
+
+    def table(self, name):
+        table = self.tables().get(name.lower())
+        if table is None:
+            raise SandboxError(f"Table '{self.database}.{name}' doesn't exist", 1146)
+        return table
+
+    def execute_create_table(self, statement):
+        tables = self.tables()
+        if statement.table.lower() in tables:
+            raise SandboxError(f"Table '{statement.table}' already exists", 1050)
+
+        columns = []
+        seen = set()
+        for definition in statement.definitions:
+            if definition.name.lower() in seen:
+                raise SandboxError(f"Duplicate column name '{definition.name}'", 1060)
+            seen.add(definition.name.lower())
+            length = definition.length
+            if length is not None:
+                if not length.isdigit():
+                    raise SandboxError(f"You have an error in your SQL syntax near '{length}'", 1064)
+                length = int(length)
+            columns.append(Column(definition.name, definition.type, length, definition.options))
+        if sum(column.primary_key for column in columns) > 1:
+            raise SandboxError('Multiple primary key defined', 1068)
+
+        tables[statement.table.lower()] = Table(statement.table, columns)
+        return affected_result(0)
+
+    def execute_drop_table(self, statement):
+        tables = self.tables()
+        if tables.pop(statement.table.lower(), None) is None:
+            raise SandboxError(f"Unknown table '{self.database}.{statement.table}'", 1051)
+        return affected_result(0)
+
+    # Datos
+
+    def execute_insert(self, statement):
+        table = self.table(statement.table)
+        if not statement.columns:
+            # INSERT sin lista de columnas: todas, en orden
+            positions = list(range(len(table.columns)))
+        else:
+            positions = [table.position(name) for name in statement.columns]
+        if len(positions) != len(statement.values):
+            raise SandboxError("Column count doesn't match value count at row 1", 1136)
+
+        values = [None] * len(table.columns)
+        given = set(positions)
+        for position, token in zip(positions, statement.values):
+            values[position] = table.columns[position].convert(literal(token))
+
+        for position, column in enumerate(table.columns):
+            if column.auto_increment and values[position] is None:
+                values[position] = table.auto_increment
+            elif values[position] is None and column.not_null:
+                if position in given:
+                    raise SandboxError(f"Column '{column.name}' cannot be null", 1048)
+                raise SandboxError(f"Field '{column.name}' doesn't have a default value", 1364)
+            if column.auto_increment:
+                table.auto_increment = max(table.auto_increment, values[position] + 1)
+        if table.key is not None:
+            table.check_key(values[table.key])
+
+        row = table.insert(values)
+        self.record(table, 'insert', row)
+        return affected_result(1)
+
+    def matching(self, table, statement):
+        if statement.condition is None:
+            return table.scan()
+        name, token = statement.condition
+        position = table.position(name, 'where clause')
+        try:
+            value = table.columns[position].convert(literal(token))
+        except SandboxError as e:
+            if e.errno == 1054:
+                raise SandboxError(f"Unknown column '{token.value.lower()}' in 'where clause'", 1054)
+            # Un valor que no cabe en el tipo de la columna no coincide con ninguna fila
+            return []
+        return table.find(position, value)
+
+    def execute_update(self, statement):
+        table = self.table(statement.table)
+        assignments = []
+        for name, token in statement.assignments:
+            position = table.position(name)
+            column = table.columns[position]
+            value = column.convert(literal(token))
+            if value is None and column.not_null:
+                raise SandboxError(f"Column '{column.name}' cannot be null", 1048)
+            assignments.append((position, value))
+
+        rows = self.matching(table, statement)
+        if table.key is not None and len(rows) > 1:
+            for position, value in assignments:
+                if position == table.key:
+                    raise SandboxError(f"Duplicate entry '{value}' for key '{table.name}.PRIMARY'", 1062)
+
+        changed = 0
+        for row in rows:
+            previous = []
+            for position, value in assignments:
+                current = table.data[position][row]
+                if current != value:
+                    if position == table.key:
+                        table.check_key(value, row)
+                    previous.append((position, current))
+            if not previous:
+                continue
+            for position, value in assignments:
+                table.set(row, position, value)
+            self.record(table, 'update', row, previous)
+            changed += 1
+        return affected_result(changed)
+
+    def execute_delete(self, statement):
+        table = self.table(statement.table)
+        rows = self.matching(table, statement)
+        for row in rows:
+            table.delete(row)
+            self.record(table, 'delete', row)
+        if self.undo is None:
+            table.compact()
+        return affected_result(len(rows))
+
+    def execute_select(self, statement, page=None, max_rows=None):
+        table = self.table(statement.table)
+        if statement.columns is None:
+            positions = list(range(len(table.columns)))
+        else:
+            positions = [table.position(name) for name in statement.columns]
+        columns = [table.columns[position].name for position in positions]
+        rows = self.matching(table, statement)
+
+        limit = max_rows
+        if page:
+            limit = page['limit']
+            key = page.get('key')
+            if key:
+                position = table.position(key, 'order clause')
+                values = table.data[position]
+                rows = [row for row in rows if values[row] is not None]
+                after = page.get('after')
+                if after is not None:
+                    after = table.columns[position].convert(after)
+                    rows = [row for row in rows if fold(values[row]) > fold(after)]
+                rows.sort(key=lambda row: fold(values[row]))
+            rows = rows[page.get('offset', 0):]
+
+        truncated = limit is not None and len(rows) > limit
+        result = rows_result(table.rows(rows[:limit], positions), truncated, columns)
+        if page and truncated:
+            last = table.rows(rows[limit - 1:limit], positions)[0] if limit else None
+            result['next'] = next_page(page, limit, last, columns)
+        return result
+
+    # Estado
+
+    def copy(self):
+        """Copia independiente (para una prueba en seco sobre el estado actual)"""
+        engine = copy.deepcopy(self)
+        engine.undo = None
+        return engine
+
+    def stats(self):
+        return {
+            'database': self.database,
+            'in_transaction': self.in_transaction,
+            'statements': self.statements,
+            'databases': {
+                name: {table.name: len(table) for table in tables.values()}
+                for name, tables in self.databases.values()
+            }
+        }
+
+    def save(self, path):
+        """Guarda las bases de datos en path (JSON); lo pendiente de confirmar no se guarda"""
+        if self.undo is not None:
+            # Se guarda lo confirmado: se trabaja sobre una copia sin lo pendiente
+            engine = copy.deepcopy(self)
+            engine.rollback()
+            return engine.save(path)
+
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'database': self.database,
+            'databases': [
+                {'name': name, 'tables': [table.to_json() for table in tables.values()]}
+                for name, tables in self.databases.values()
+            ]
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as output:
+                json.dump(snapshot, output, default=str)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as source:
+            snapshot = json.load(source)
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f'Versión de la instantánea no admitida: {snapshot.get("version")}')
+        engine = cls(snapshot['database'])
+        for database in snapshot['databases']:
+            tables = {}
+            for entry in database['tables']:
+                table = Table.from_json(entry)
+                tables[table.name.lower()] = table
+            engine.databases[database['name'].lower()] = (database['name'], tables)
+        return engine
+
+
+def execution_error(e):
+    """Resultado de una sentencia que falló en el motor"""
+    return {
+        'success': False,
+        'error': str(e),
+        'errno': e.errno,
+        'message': f'Error: {e.message}'
+    }
+
+
+def run(engine, statement, page=None, max_rows=None):
+    """execute() con el error como resultado, como app.run_query"""
+    try:
+        return engine.execute(statement, page, max_rows)
+    except SandboxError as e:
+        return execution_error(e)
+
+
+def run_script(engine, statements, stop_on_error=True, max_rows=None):
+    """
+    Ejecuta las sentencias (offset, texto) de un script en el motor con
+    el mismo formato de salida que executor.ScriptExecutor. Si una
+    sentencia falla y stop_on_error está activo se deshace la transacción
+    abierta y se detiene; una transacción que queda abierta al final
+    también se deshace.
+    """
+    executed = failed = 0
+    for index, (offset, text) in enumerate(statements):
+        analysis, node = analyze_statement(text)
+        syntactic = analysis['syntactic']
+        item = {
+            'index': index,
+            'offset': offset,
+            'statement_type': syntactic.get('statement_type')
+        }
+        if not syntactic['valid']:
+            item.update({
+                'success': False,
+                'error': 'Error sintáctico',
+                'message': syntactic['message'],
+                'position': syntactic.get('position')
+            })
+        else:
+            item.update(run(engine, node, max_rows=max_rows))
+
+        if item['success']:
+            executed += 1
+        else:
+            failed += 1
+        yield item
+        if not item['success'] and stop_on_error:
+            break
+
+    rolled_back = 0
+    if engine.in_transaction:
+        rolled_back = len(engine.undo)
+        engine.rollback()
+    yield {
+        'summary': True,
+        'success': failed == 0,
+        'executed': executed,
+        'failed': failed,
+        'rolled_back': rolled_back,
+        'database': engine.database
+    }
+
@@ -0,0 +1,191 @@
+import io
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from parser import analyze_sql
+
+# Caracteres que cambian el estado al separar sentencias
+SPECIAL_CHARS = re.compile(r"['\";]")
+SPECIAL_BYTES = re.compile(rb"['\";]")
+
+
+def iter_statements(stream, chunk_size=65536):
+    """
+    Lee un script por bloques y genera (offset, sentencia) por cada
+    sentencia terminada en ';'. Los ';' dentro de cadenas no separan.
+    El offset es la posición del primer carácter de la sentencia en el script.
+    """
+    pieces = []
+    offset = 0
+    quote = None
+
+    for chunk in iter(lambda: stream.read(chunk_size), ''):
+        start = 0
+        position = 0
+        while True:
+            if quote:
+                end = chunk.find(quote, position)
+                if end == -1:
+                    break
+                quote = None
+                position = end + 1
+                continue
+
+            match = SPECIAL_CHARS.search(chunk, position)
+            if not match:
+                break
+            position = match.end()
+            if match.group() != ';':
+                quote = match.group()
+                continue
+
+            pieces.append(chunk[start:position])
+            statement = ''.join(pieces)
+            pieces = []
+            start = position
+
+            stripped = statement.lstrip()
+            if stripped != ';':
+                yield offset + len(statement) - len(stripped), stripped
+            offset += len(statement)
+
+        pieces.append(chunk[start:])
+
+    statement = ''.join(pieces)
+    stripped = statement.lstrip()
+    if stripped.rstrip():
+        yield offset + len(statement) - len(stripped), stripped
+
+
+def analyze_script(statements, include_tokens=False):
+    """Analiza cada sentencia y genera un resultado por sentencia"""
+    for index, (offset, statement) in enumerate(statements):
+        analysis = analyze_sql(statement)
+        if not include_tokens:
+            del analysis['lexical']['tokens']
+        yield {
+            'index': index,
+            'offset': offset,
+            'analysis': analysis
+        }
+
+
+def split_script(path, chunk_bytes=8 * 1024 * 1024, read_size=1024 * 1024):
+    """
+    Divide el archivo en rangos de bytes (inicio, fin) de unos chunk_bytes
+    que terminan justo después de un ';' fuera de cadenas, con las mismas
+    reglas que iter_statements. Las comillas y el ';' son ASCII, así que se
+    buscan en los bytes sin decodificar (en UTF-8 no aparecen dentro de
+    otros caracteres).
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    cut = chunk_bytes
+    quote = None
+
+    with open(path, 'rb') as script:
+        base = 0
+        for chunk in iter(lambda: script.read(read_size), b''):
+            position = 0
+            while True:
+                if quote:
+                    end = chunk.find(quote, position)
+                    if end == -1:
+                        break
+                    quote = None
+                    position = end + 1
+                    continue
+
+                match = SPECIAL_BYTES.search(chunk, position)
+                if not match:
+                    break
+                position = match.end()
+                if match.group() != b';':
+                    quote = match.group()
+                elif base + position >= cut:
+                    ranges.append((start, base + position))
+                    start = base + position
+                    cut = start + chunk_bytes
+            base += len(chunk)
+
+    if start < size:
+        ranges.append((start, size))
+    return ranges
+
+
+def analyze_range(path, start, end, include_tokens=False):
+    """
+    Analiza las sentencias de un rango del archivo (se ejecuta en otro
+    proceso). Devuelve la cantidad de caracteres del rango y los resultados
+    con índices y offsets relativos al rango.
+    """
+    with open(path, 'rb') as script:
+        script.seek(start)
+        text = script.read(end - start).decode('utf-8')
+    return len(text), list(analyze_script(iter_statements(io.StringIO(text)), include_tokens))
+
+
+class ParallelAnalyzer:
+    """
+    Análisis de scripts grandes repartido entre procesos.
+
+    El archivo se divide con split_script y cada proceso lee y analiza su
+    rango (analyze_range), así que solo viajan rutas y resultados. Los
+    resultados se generan en orden, con el índice de la sentencia y su
+    offset (en caracteres) corridos a posiciones globales del script; las
+    posiciones de los tokens siguen siendo relativas a cada sentencia, como
+    en analyze_script. Hay a lo sumo 2 * workers rangos en curso.
+
+    Los procesos se crean con 'spawn' (el servidor tiene hilos) la primera
+    vez que se usan y se reutilizan entre peticiones.
+    """
+
+    def __init__(self, workers=None, chunk_bytes=8 * 1024 * 1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_bytes = chunk_bytes
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def analyze(self, path, include_tokens=False):
+        ranges = deque(split_script(path, self.chunk_bytes))
+        if len(ranges) <= 1:
+            # Un solo rango: no vale la pena enviarlo a otro proceso
+            for start, end in ranges:
+                yield from analyze_range(path, start, end, include_tokens)[1]
+            return
+
+        pending = deque()
+        index = 0
+        offset = 0
+
+        try:
+            while ranges or pending:
+                while ranges and len(pending) < 2 * self.workers:
+                    start, end = ranges.popleft()
+                    pending.append(self.executor.submit(analyze_range, path, start, end, include_tokens))
+
+                length, items = pending.popleft().result()
+                for item in items:
+                    item['index'] += index
+                    item['offset'] += offset
+                    yield item
+                index += len(items)
+                offset += length
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,122 @@
+"""
+Serialización de las respuestas: JSON con orjson si está instalado (y
+json de la biblioteca estándar si no), formatos de las filas de un SELECT
+y compresión gzip/brotli negociada con Accept-Encoding.
+"""
+import datetime
+import decimal
+import gzip
+import json
+from lexer import TokenStream
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# orjson serializa los tokens de un análisis más rápido de una vez que por partes
+FAST = orjson is not None
+
+# Formatos de las filas de un SELECT ('format' en /api/execute):
+# - objects: data es una lista de objetos columna: valor (el predeterminado)
+# - rows: columns una sola vez y data como lista de listas
+# - columnar: columns y data como objeto columna: lista de valores
+ROW_FORMATS = ('objects', 'rows', 'columnar')
+
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def default(o):
+    """Valores que JSON no representa directamente"""
+    if isinstance(o, TokenStream):
+        return o.to_list()
+    if isinstance(o, decimal.Decimal):
+        # Como texto para no perder precisión
+        return str(o)
+    if isinstance(o, (datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, datetime.timedelta):
+        return str(o)
+    if isinstance(o, (bytes, bytearray)):
+        return o.decode('utf-8', 'replace')
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f'No se puede serializar un valor de tipo {type(o).__name__}')
+
+
+def dumps(data):
+    """JSON de data en bytes (UTF-8)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=default, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # Por ejemplo, enteros de más de 64 bits: se intenta con json
+            pass
+    return json.dumps(
+        data, default=default, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def format_rows(result, row_format='objects'):
+    """
+    Resultado con las filas en el formato pedido. Las filas llegan como
+    tuplas en 'data' con los nombres en 'columns'; no se modifica result
+    (puede venir de la caché de resultados).
+    """
+    columns = result.get('columns')
+    if columns is None:
+        return result
+
+    rows = result['data']
+    if row_format == 'rows':
+        return result
+    if row_format == 'columnar':
+        values = zip(*rows) if rows else [()] * len(columns)
+        return dict(result, data={
+            column: list(column_values) for column, column_values in zip(columns, values)
+        })
+
+    formatted = dict(result, data=[dict(zip(columns, row)) for row in rows])
+    del formatted['columns']
+    return formatted
+
+
+def choose_encoding(accept_encoding):
+    """
+    Codificación que acepta el cliente (Accept-Encoding), por su peso q
+    y luego en el orden de ENCODINGS; None si no acepta ninguna
+    """
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    best = None
+    best_weight = 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best = encoding
+            best_weight = weight
+    return best
+
+
+def compress(body, encoding, level=5):
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level)
@@ -0,0 +1,279 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import Metrics
+
+logger = logging.getLogger('sql.session')
+
+
+class Session:
+    """
+    Estado de ejecución de un cliente: base de datos seleccionada y, si
+    quedó una transacción abierta, la conexión del pool fijada a la sesión.
+
+    transaction indica una transacción abierta con BEGIN ('explicit') o el
+    modo lote ('batch'), en el que las escrituras se confirman en grupos;
+    pending cuenta las escrituras sin confirmar.
+    """
+
+    def __init__(self, session_id, database=None):
+        self.id = session_id
+        self.database = database
+        self.connection = None
+        self._release = None
+        # Una conexión fijada no se puede usar desde dos peticiones a la vez
+        self.lock = threading.RLock()
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+        self.transaction = None
+        self.pending = 0
+        self.pending_since = None
+        # Resultado del commit de un lote que falló fuera de una petición
+        # (GroupCommitter): lo informa la próxima petición de la sesión
+        self.failed_commit = None
+
+        # Motor en memoria del modo sandbox (sandbox.MemoryEngine), al usarlo
+        self.sandbox = None
+
+    @property
+    def in_transaction(self):
+        if self.transaction is not None:
+            return True
+        connection = self.connection
+        return connection is not None and bool(connection.in_transaction)
+
+    def begin(self, mode):
+        self.transaction = mode
+        self.pending = 0
+        self.pending_since = None
+
+    def record_write(self):
+        """Una escritura más quedó pendiente de confirmar"""
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending += 1
+
+    def end_transaction(self):
+        self.begin(None)
+
+    def batch_age(self):
+        """Segundos desde la escritura pendiente más antigua"""
+        if self.pending_since is None:
+            return 0.0
+        return time.monotonic() - self.pending_since
+
+    def take_failed_commit(self):
+        """El commit fallido pendiente de informar (o None), una sola vez"""
+        with self.lock:
+            failed_commit = self.failed_commit
+            self.failed_commit = None
+            return failed_commit
+
+    def pin(self, connection, release):
+        """Fija la conexión a la sesión; release(connection) la devuelve al pool"""
+        self.connection = connection
+        self._release = release
+
+    def unpin(self):
+        connection = self.connection
+        self.connection = None
+        self._release = None
+        return connection
+
+    def close(self):
+        """
+        Devuelve la conexión fijada. Las escrituras de un lote ya se
+        informaron como exitosas y se confirman; una transacción abierta
+        con BEGIN la deshace el pool. Si una petición usa la sesión, espera
+        a que termine. Devuelve si se confirmó el lote (None si no había).
+        """
+        with self.lock:
+            release = self._release
+            connection = self.unpin()
+            committed = None
+            if connection is not None and self.transaction == 'batch' and self.pending:
+                try:
+                    connection.commit()
+                    committed = True
+                except Exception as e:
+                    committed = False
+                    logger.error(
+                        'No se pudo confirmar el lote de la sesión %s al cerrarla '
+                        '(%d escrituras perdidas): %s', self.id, self.pending, e
+                    )
+            self.end_transaction()
+            if connection is not None and release is not None:
+                release(connection)
+            return committed
+
+    def snapshot(self):
+        return {
+            'id': self.id,
+            'database': self.database,
+            'pinned': self.connection is not None,
+            'in_transaction': self.in_transaction,
+            'transaction': self.transaction,
+            'pending': self.pending,
+            'idle': time.monotonic() - self.last_used
+        }
+
+
+class SessionStore:
+    """
+    Sesiones por id en una LRU acotada. Las que pasan idle_timeout
+    segundos sin usarse (o las menos recientes, si se supera max_sessions)
+    se cierran, devolviendo su conexión fijada al pool.
+
+    Con varios procesos cada uno tiene sus sesiones; una sesión nueva en
+    un proceso puede empezar con la base de datos que informa el cliente.
+    """
+
+    def __init__(self, max_sessions=10000, idle_timeout=1800, metrics=None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        # Cuenta los COMMIT de los lotes que quedan al cerrar las sesiones
+        self.metrics = metrics or Metrics(enabled=False)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, session_id, database=None):
+        """Sesión con ese id; si no existe se crea con la base de datos dada"""
+        now = time.monotonic()
+        closing = []
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id, database)
+                self.created += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+
+            # Las menos usadas están al principio
+            while self._sessions:
+                oldest = next(iter(self._sessions.values()))
+                if now - oldest.last_used > self.idle_timeout:
+                    self.expired += 1
+                elif len(self._sessions) > self.max_sessions:
+                    self.evicted += 1
+                else:
+                    break
+                closing.append(self._sessions.popitem(last=False)[1])
+
+        # Fuera del lock del almacén: close espera el lock de cada sesión
+        for old in closing:
+            self._close(old)
+        return session
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._close(session)
+
+    def _close(self, session):
+        committed = session.close()
+        if committed is not None:
+            self.metrics.count('COMMIT', committed)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def batching(self):
+        """Sesiones en modo lote con escrituras pendientes"""
+        with self._lock:
+            return [
+                session for session in self._sessions.values()
+                if session.transaction == 'batch' and session.pending
+            ]
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            return {
+                'sessions': len(sessions),
+                'max_sessions': self.max_sessions,
+                'idle_timeout': self.idle_timeout,
+                'pinned': sum(1 for session in sessions if session.connection is not None),
+                'created': self.created,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
+
+
+class GroupCommitter:
+    """
+    Confirma los lotes cuya ventana de tiempo venció aunque la sesión no
+    reciba más peticiones: un hilo revisa las sesiones cada window / 2
+    segundos y llama a commit(session) con el lock de la sesión tomado.
+    Las sesiones ocupadas se confirman en la próxima revisión.
+
+    commit devuelve un resultado como el de /api/execute; si no tuvo éxito
+    (o lanza una excepción) se deja en session.failed_commit para que lo
+    informe la próxima petición de la sesión.
+    """
+
+    def __init__(self, sessions, window, commit, metrics=None):
+        self.sessions = sessions
+        self.window = window
+        self.commit = commit
+        self.metrics = metrics or Metrics(enabled=False)
+        self.flushed = 0
+        self.failed = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Inicia el hilo la primera vez que se usa el modo lote"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name='group-commit', daemon=True)
+                self._thread.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.window / 2)
+            self.flush()
+
+    def flush(self):
+        for session in self.sessions.batching():
+            if session.batch_age() < self.window or not session.lock.acquire(blocking=False):
+                continue
+            try:
+                if session.transaction == 'batch' and session.pending:
+                    self.flush_session(session)
+            finally:
+                session.lock.release()
+
+    def flush_session(self, session):
+        pending = session.pending
+        try:
+            result = self.commit(session)
+        except Exception as e:
+            # El hilo no debe terminar por un error de una sesión
+            result = {'success': False, 'error': str(e), 'message': f'Error: {str(e)}'}
+        self.metrics.count('COMMIT', result['success'])
+        if result['success']:
+            self.flushed += 1
+            return
+
+        self.failed += 1
+        logger.error(
+            'No se pudo confirmar el lote de la sesión %s (%d escrituras perdidas): %s',
+            session.id, pending, result['error']
+        )
+        session.failed_commit = {
+            'success': False,
+            'error': result['error'],
+            'message': f"No se confirmó el lote de escrituras: {result['message']}",
+            'rolled_back': pending
+        }
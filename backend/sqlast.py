@@ -0,0 +1,144 @@
+from lexer import TokenStream, TokenType
+
+# Tipos de token que la plantilla admite en cada posición
+NAME_TYPES = (TokenType.IDENTIFIER,)
+VALUE_TYPES = (TokenType.STRING, TokenType.NUMBER, TokenType.IDENTIFIER)
+
+
+class ColumnDefinition:
+    """
+    Columna de un CREATE TABLE; length es el texto del NUMBER de VARCHAR(n)
+    tal como se escribió (el parser acepta cualquier número)
+    """
+    __slots__ = ('name', 'type', 'length', 'options')
+
+    def __init__(self, name, type, length=None, options=()):
+        self.name = name
+        self.type = type
+        self.length = length
+        self.options = options
+
+    def __repr__(self):
+        return f"ColumnDefinition({self.name!r}, {self.type.value}, {self.length!r}, {list(self.options)!r})"
+
+
+class Statement:
+    """
+    Nodo de una sentencia: type es el statement_type del parser y, según
+    la sentencia, tiene:
+
+    - database: base de datos de CREATE/DROP DATABASE y USE
+    - table: tabla de las demás sentencias
+    - columns: columnas del INSERT o del SELECT (None para SELECT *)
+    - definitions: ColumnDefinition del CREATE TABLE
+    - values: valores del INSERT
+    - assignments: pares (columna, valor) del SET de un UPDATE
+    - condition: par (columna, valor) del WHERE, o None si no hay WHERE
+    - values_position: posición de VALUES en un INSERT
+
+    El Parser produce una plantilla que depende solo de la forma de la
+    sentencia (la que guarda la caché por forma): los nombres son índices
+    de token y los valores, ordinales en value_indices (el mismo orden que
+    los %s de la sentencia parametrizada). bind() resuelve la plantilla con
+    los tokens y el texto de una consulta concreta: nombres con sus
+    mayúsculas originales y valores como Token, si sus tokens son de los
+    tipos de la plantilla.
+    """
+    __slots__ = (
+        'type', 'database', 'table', 'columns', 'definitions',
+        'values', 'assignments', 'condition', 'values_position', 'value_indices'
+    )
+
+    def __init__(self, type, database=None, table=None, columns=None, definitions=None,
+                 values=None, assignments=None, condition=None, values_position=None,
+                 value_indices=()):
+        self.type = type
+        self.database = database
+        self.table = table
+        self.columns = columns
+        self.definitions = definitions
+        self.values = values
+        self.assignments = assignments
+        self.condition = condition
+        self.values_position = values_position
+        self.value_indices = value_indices
+
+    def __repr__(self):
+        fields = ', '.join(
+            f'{name}={getattr(self, name)!r}' for name in self.__slots__[1:-1]
+            if getattr(self, name) is not None
+        )
+        return f"Statement({self.type!r}{', ' if fields else ''}{fields})"
+
+    def expected_types(self):
+        """Pares (índice de token, tipos admitidos) de la plantilla"""
+        names = [self.database, self.table]
+        names.extend(self.columns or ())
+        names.extend(column.name for column in self.definitions or ())
+        names.extend(column for column, _ in self.assignments or ())
+        if self.condition is not None:
+            names.append(self.condition[0])
+        for index in names:
+            if index is not None:
+                yield index, NAME_TYPES
+        for column in self.definitions or ():
+            if column.length is not None:
+                yield column.length, (TokenType.NUMBER,)
+        for index in self.value_indices:
+            yield index, VALUE_TYPES
+        if self.values_position is not None:
+            yield self.values_position, (TokenType.VALUES,)
+
+    def bind(self, tokens, text):
+        """
+        Sentencia con los nombres y valores de tokens (tokens de text), o
+        None si algún token no es del tipo que espera la plantilla
+        """
+        for index, types in self.expected_types():
+            if index >= len(tokens) or token_type(tokens, index) not in types:
+                return None
+
+        def name(index):
+            return None if index is None else token_text(tokens, index, text)
+
+        def value(ordinal):
+            return tokens[self.value_indices[ordinal]]
+
+        return Statement(
+            self.type,
+            database=name(self.database),
+            table=name(self.table),
+            columns=None if self.columns is None else [name(index) for index in self.columns],
+            definitions=None if self.definitions is None else [
+                ColumnDefinition(
+                    name(column.name), column.type,
+                    None if column.length is None else tokens[column.length].value,
+                    column.options
+                )
+                for column in self.definitions
+            ],
+            values=None if self.values is None else [value(ordinal) for ordinal in self.values],
+            assignments=None if self.assignments is None else [
+                (name(column), value(ordinal)) for column, ordinal in self.assignments
+            ],
+            condition=None if self.condition is None else (
+                name(self.condition[0]), value(self.condition[1])
+            ),
+            values_position=None if self.values_position is None else tokens[self.values_position].position,
+            value_indices=self.value_indices
+        )
+
+
+def token_type(tokens, index):
+    if isinstance(tokens, TokenStream):
+        return tokens.type(index)
+    return tokens[index].type
+
+
+def token_text(tokens, index, text):
+    """Texto original de un token de identificador (los valores están en mayúsculas)"""
+    if isinstance(tokens, TokenStream):
+        return tokens.original_text[tokens.starts[index]:tokens.ends[index]]
+    token = tokens[index]
+    # En el lexer de referencia la posición de un identificador es su final
+    return text[token.position - len(token.value):token.position]
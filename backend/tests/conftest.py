@@ -0,0 +1,50 @@
+"""
+Fixtures comunes: la aplicación Flask conectada a un FakeMySQL nuevo en
+cada prueba, con pool, sesiones, cachés y documentos vacíos.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as backend  # noqa: E402
+from cache import AnalysisCache, ResultCache  # noqa: E402
+from catalog import SchemaCatalog  # noqa: E402
+from fake_mysql import FakeMySQL  # noqa: E402
+from incremental import DocumentStore  # noqa: E402
+from pool import ConnectionPool  # noqa: E402
+from session import SessionStore  # noqa: E402
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeMySQL()
+    pool = ConnectionPool(server.connect, **backend.MYSQL_POOL_CONFIG)
+    monkeypatch.setattr(backend, 'pool', pool)
+    monkeypatch.setattr(backend, 'sessions', SessionStore(**backend.SESSION_CONFIG, metrics=backend.metrics))
+    monkeypatch.setattr(backend, 'analysis_cache', AnalysisCache(**backend.ANALYSIS_CACHE_CONFIG))
+    monkeypatch.setattr(backend, 'result_cache', ResultCache(**{
+        key: value for key, value in backend.RESULT_CACHE_CONFIG.items() if key != 'enabled'
+    }))
+    monkeypatch.setattr(backend, 'catalog', SchemaCatalog(**backend.CATALOG_CONFIG))
+    monkeypatch.setattr(backend, 'documents', DocumentStore())
+    yield server
+    pool.close()
+
+
+@pytest.fixture
+def client(server):
+    return backend.app.test_client()
+
+
+@pytest.fixture
+def execute(client):
+    """Ejecuta una sentencia con /api/execute y devuelve el JSON de la respuesta"""
+    def execute(query, session='pruebas', **options):
+        response = client.post(
+            '/api/execute', json=dict(options, query=query), headers={'X-Session-Id': session}
+        )
+        return response.get_json()
+    return execute
@@ -0,0 +1,43 @@
+"""Plazos y cancelación de sentencias (Watchdog)"""
+import asyncio
+import threading
+
+from admission import Watchdog
+
+
+def test_watch_async_waits_for_kill_without_blocking_loop():
+    killing = threading.Event()
+    finish = threading.Event()
+
+    def kill(connection_id):
+        killing.set()
+        finish.wait(1)
+
+    watchdog = Watchdog(kill)
+    ticket = watchdog.ticket('r', 's', 30)
+
+    async def statement():
+        async with watchdog.watch_async(ticket, 7):
+            threading.Thread(target=watchdog.cancel, args=('r',)).start()
+            await asyncio.to_thread(killing.wait, 1)
+        return watchdog.stats()['running']
+
+    async def main():
+        task = asyncio.create_task(statement())
+        await asyncio.sleep(0.05)
+        # La sentencia espera el KILL sin detener el event loop
+        assert not task.done()
+        finish.set()
+        return await task
+
+    assert asyncio.run(main()) == []
+    assert ticket.reason == 'cancelled'
+
+
+def test_watch_stops_watching_after_statement():
+    watchdog = Watchdog(lambda connection_id: None)
+    ticket = watchdog.ticket('r', 's', 30)
+    with watchdog.watch(ticket, 7):
+        assert [item['request_id'] for item in watchdog.stats()['running']] == ['r']
+    assert watchdog.stats()['running'] == []
+    assert not watchdog.cancel('r')
@@ -0,0 +1,37 @@
+"""Análisis sintáctico, caché de análisis y árbol de la sentencia"""
+from cache import AnalysisCache
+from parser import analyze_statement
+
+
+def test_varchar_length_keeps_token_text(client):
+    for query in ('CREATE TABLE t (a VARCHAR(10.5));', 'CREATE TABLE t (a VARCHAR(1.2.3));'):
+        response = client.post('/api/analyze', json={'query': query})
+        assert response.status_code == 200
+        assert response.get_json()['syntactic']['valid']
+
+    statement = analyze_statement('CREATE TABLE t (a VARCHAR(10.5));')[1]
+    assert statement.definitions[0].length == '10.5'
+
+
+def test_sandbox_rejects_non_integer_varchar_length(execute):
+    execute('CREATE DATABASE tienda;', sandbox=True)
+    execute('USE tienda;', sandbox=True)
+    result = execute('CREATE TABLE t (a VARCHAR(10.5));', sandbox=True)
+    assert not result['success']
+    assert result['errno'] == 1064
+    assert execute('CREATE TABLE t (a VARCHAR(10));', sandbox=True)['success']
+
+
+def test_cached_shape_with_other_literal_type_gives_same_verdict():
+    cache = AnalysisCache()
+    pairs = [
+        ("CREATE TABLE t (a VARCHAR(10));", "CREATE TABLE t (a VARCHAR('x'));"),
+        ("CREATE TABLE t (a VARCHAR('x'));", "CREATE TABLE t (a VARCHAR(10));"),
+        ("SELECT * FROM t WHERE a = 1;", "SELECT * FROM t WHERE a = 'x';")
+    ]
+    for cached, query in pairs:
+        cache.lookup(cached)
+        analysis, statement = cache.lookup(query)
+        expected, expected_statement = analyze_statement(query)
+        assert analysis['syntactic'] == expected['syntactic']
+        assert repr(statement) == repr(expected_statement)
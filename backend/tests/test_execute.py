@@ -0,0 +1,105 @@
+"""Ejecución de sentencias sueltas: parámetros, transacciones y paginación"""
+import pytest
+
+from executor import parameterize
+from lexer import FastLexer
+from parser import analyze_statement
+
+
+def prepared(query):
+    return parameterize(query, analyze_statement(query)[1], FastLexer(query).tokenize())
+
+
+def test_parameterize_extracts_literals():
+    assert prepared("SELECT * FROM t WHERE name = 'abc';") == (
+        'SELECT * FROM t WHERE name = %s', ['abc']
+    )
+
+
+def test_parameterize_skips_unterminated_string():
+    for query in ("SELECT * FROM t WHERE name = 'abc", 'SELECT * FROM t WHERE name = "abc',
+                  "SELECT * FROM t WHERE name = '"):
+        assert analyze_statement(query)[0]['syntactic']['valid']
+        assert prepared(query) is None
+
+
+@pytest.fixture
+def table(execute):
+    execute('CREATE DATABASE tienda;')
+    execute('USE tienda;')
+    execute('CREATE TABLE p (id INT PRIMARY KEY, nombre VARCHAR(20));')
+    for index, name in enumerate(['ana', 'luis', 'mesa', 'silla', 'lápiz'], 1):
+        execute(f"INSERT INTO p (id, nombre) VALUES ({index}, '{name}');")
+    return 'p'
+
+
+def ids(result):
+    return [row['id'] for row in result['data']]
+
+
+def test_rollback_discards_pending_writes(execute, table):
+    assert execute('BEGIN;')['transaction'] == {'mode': 'explicit', 'pending': 0}
+    result = execute("INSERT INTO p (id, nombre) VALUES (6, 'norte');")
+    assert result['transaction'] == {'mode': 'explicit', 'pending': 1}
+    assert ids(execute('SELECT * FROM p;')) == [1, 2, 3, 4, 5, 6]
+    assert execute('ROLLBACK;')['rolled_back'] == 1
+    assert ids(execute('SELECT * FROM p;')) == [1, 2, 3, 4, 5]
+
+
+def test_commit_keeps_writes(execute, table):
+    execute('BEGIN;')
+    execute('DELETE FROM p WHERE id = 1;')
+    execute("UPDATE p SET nombre = 'sur' WHERE id = 2;")
+    assert execute('COMMIT;')['success']
+    assert execute('SELECT * FROM p WHERE id = 2;')['data'] == [{'id': 2, 'nombre': 'sur'}]
+    assert ids(execute('SELECT * FROM p;')) == [2, 3, 4, 5]
+
+
+def test_batch_mode_commits_on_commit(execute, table):
+    result = execute("INSERT INTO p (id, nombre) VALUES (6, 'norte');", batch=True)
+    assert result['transaction']['mode'] == 'batch'
+    assert execute('COMMIT;')['success']
+    assert ids(execute('SELECT * FROM p;')) == [1, 2, 3, 4, 5, 6]
+
+
+def test_offset_pagination(execute, table):
+    page = {'limit': 2}
+    seen = []
+    while page:
+        result = execute('SELECT * FROM p;', **page)
+        seen += ids(result)
+        page = result.get('next')
+    assert seen == [1, 2, 3, 4, 5]
+
+
+def test_key_pagination(execute, table):
+    result = execute('SELECT * FROM p;', limit=3, key='id')
+    assert ids(result) == [1, 2, 3]
+    assert result['next'] == {'key': 'id', 'after': 3, 'limit': 3}
+    result = execute('SELECT * FROM p;', **result['next'])
+    assert ids(result) == [4, 5]
+    assert 'next' not in result
+
+
+def test_pagination_rejects_offset_with_key(client, table):
+    response = client.post(
+        '/api/execute', json={'query': 'SELECT * FROM p;', 'key': 'id', 'offset': 2},
+        headers={'X-Session-Id': 'pruebas'}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('page', [
+    {'limit': 'diez'}, {'limit': [1]}, {'limit': True}, {'limit': 2.5}, {'offset': {}},
+    {'key': 1}, {'key': ['id']}, {'key': 'id', 'after': [1]}
+])
+def test_pagination_rejects_bad_types(client, table, page):
+    response = client.post(
+        '/api/execute', json=dict(page, query='SELECT * FROM p;'), headers={'X-Session-Id': 'pruebas'}
+    )
+    assert response.status_code == 400
+    assert not response.get_json()['success']
+
+
+def test_pagination_accepts_numeric_text(execute, table):
+    assert ids(execute('SELECT * FROM p;', limit='2', offset='1')) == [2, 3]
@@ -0,0 +1,69 @@
+"""Importación de CSV/TSV con /api/import"""
+import io
+import json
+
+import pytest
+
+import app as backend
+
+
+@pytest.fixture
+def table(execute):
+    execute('CREATE DATABASE tienda;')
+    execute('USE tienda;')
+    execute('CREATE TABLE p (id INT PRIMARY KEY, nombre VARCHAR(20));')
+    return 'p'
+
+
+def import_file(client, data, **args):
+    """Importa data con /api/import; devuelve el código y las líneas como JSON"""
+    args.setdefault('table', 'p')
+    response = client.post(
+        '/api/import', query_string=args, data=data, headers={'X-Session-Id': 'pruebas'}
+    )
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+    return response.status_code, lines
+
+
+@pytest.mark.parametrize('method', ['load', 'insert'])
+def test_import_rows(client, execute, table, method):
+    status, lines = import_file(client, 'id,nombre\n1,ana\n2,\n1,repetida\n', method=method)
+    assert status == 200
+    summary = lines[-1]
+    assert summary['success'] and summary['method'] == method
+    assert (summary['rows'], summary['skipped']) == (2, 1)
+    # FakeMySQL guarda los campos del archivo como texto, sin convertirlos
+    rows = execute('SELECT * FROM p;')['data']
+    assert [(str(row['id']), row['nombre']) for row in rows] == [('1', 'ana'), ('2', None)]
+
+
+def test_import_in_chunks(client, execute, table, monkeypatch):
+    monkeypatch.setitem(backend.IMPORT_CONFIG, 'chunk_rows', 2)
+    data = 'nombre\tid\n' + ''.join(f'fila {index}\t{index}\n' for index in range(5))
+    status, lines = import_file(client, data, format='tsv')
+    assert [line['rows'] for line in lines] == [2, 4, 5, 5]
+    assert lines[-1]['chunks'] == 3
+    assert len(execute('SELECT * FROM p;')['data']) == 5
+
+
+def test_import_uploaded_file(client, table):
+    status, lines = import_file(client, {'file': (io.BytesIO(b'id\n7\n'), 'datos.csv')})
+    assert lines[-1]['rows'] == 1
+
+
+def test_import_rejects_bad_header_and_table(client, table):
+    status, lines = import_file(client, 'id,precio\n1,2\n')
+    assert status == 400 and 'precio' in lines[0]['error']
+    status, lines = import_file(client, 'id\n1\n', table='q')
+    assert status == 404
+
+
+def test_import_reports_bad_row(client, execute, table, monkeypatch):
+    monkeypatch.setitem(backend.IMPORT_CONFIG, 'chunk_rows', 1)
+    status, lines = import_file(client, 'id,nombre\n1,ana\n2\n')
+    summary = lines[-1]
+    assert not summary['success'] and summary['rows'] == 1
+    assert 'La línea 3' in summary['message']
+    # El lugar de admisión se libera al cerrar la respuesta
+    assert client.get('/api/admission').get_json()['admission']['running'] == 0
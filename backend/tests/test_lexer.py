@@ -0,0 +1,65 @@
+"""FastLexer frente al Lexer de referencia, token por token"""
+import random
+
+import pytest
+
+from lexer import FastLexer, Lexer, TokenType
+
+CORPUS = [
+    '',
+    'SELECT * FROM usuarios;',
+    "SELECT id, nombre FROM t WHERE nombre = 'ana' AND id = 10;",
+    'INSERT INTO t (a, b, c) VALUES (1, "dos", NULL);',
+    "INSERT INTO t (a) VALUES ('sin cerrar",
+    "SELECT '' FROM t WHERE a = ''''",
+    'CREATE TABLE t (id INT PRIMARY KEY AUTO_INCREMENT, nombre VARCHAR(10.5) NOT NULL);',
+    'UPDATE t SET precio = 1.2.3 WHERE id = 7;',
+    'DELETE FROM t WHERE x <> 3 OR y >= 4 OR z != 5;',
+    'select lápiz, ÿ from ñandú;',
+    'USE   base\t;\n\nBEGIN; COMMIT; ROLLBACK;',
+    'SELECT @ # $ ` ~ FROM t',
+    "DROP DATABASE prueba; -- 'comentario"
+]
+
+ALPHABET = (
+    ['SELECT', 'FROM', 'WHERE', 'INSERT', 'VALUES', 'null', 'int', 'varchar', 'id', 'ñ', 'ÿ', 'é']
+    + list("abcXYZ_019.'\"(),;=<>!*+-@ \t\n")
+)
+
+
+def random_inputs(count, seed=2002):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 30)))
+
+
+def reference_tokens(text):
+    if len(text.upper()) != len(text):
+        # Las posiciones del Lexer de referencia son del texto en mayúsculas
+        pytest.skip('upper() cambia la longitud del texto')
+    try:
+        return Lexer(text).tokenize()
+    except Exception:
+        pytest.skip('el Lexer de referencia no admite este texto')
+
+
+@pytest.mark.parametrize('text', CORPUS + list(random_inputs(500)))
+def test_fast_lexer_matches_reference(text):
+    expected = reference_tokens(text)
+    lexer = FastLexer(text)
+    tokens = lexer.tokenize()
+    assert list(tokens) == list(expected)
+    assert lexer.get_tokens_info() == [
+        {'type': token.type.value, 'value': token.value, 'position': token.position}
+        for token in expected if token.type != TokenType.EOF
+    ]
+
+
+def test_fast_lexer_positions_when_upper_changes_length():
+    text = "SELECT straße FROM t WHERE a = 'ß';"
+    tokens = list(FastLexer(text).tokenize())
+    assert [token.value for token in tokens[:-1]] == [
+        'SELECT', 'STRASSE', 'FROM', 'T', 'WHERE', 'A', '=', 'ß', ';'
+    ]
+    assert tokens[1].position == text.index(' FROM')
+    assert tokens[-3].position == text.index(';')
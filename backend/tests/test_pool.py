@@ -0,0 +1,63 @@
+"""Pool de conexiones, solo y a través de la aplicación"""
+import pytest
+
+from fake_mysql import FakeMySQL
+from pool import ConnectionPool, PoolError
+
+
+def create_database(server, name):
+    server.connect().cursor().execute(f'CREATE DATABASE {name}')
+
+
+def test_pool_reuses_connection_in_same_database():
+    server = FakeMySQL()
+    create_database(server, 'tienda')
+    pool = ConnectionPool(server.connect, size=2)
+    conn = pool.acquire('tienda')
+    pool.release(conn)
+    assert pool.acquire('tienda') is conn
+    assert pool.stats()['created'] == 1
+
+
+def test_pool_times_out_when_full():
+    pool = ConnectionPool(FakeMySQL().connect, size=1)
+    conn = pool.acquire()
+    with pytest.raises(PoolError):
+        pool.acquire(timeout=0.01)
+    assert pool.stats()['timeouts'] == 1
+    pool.release(conn, discard=True)
+    assert pool.stats()['open'] == 0
+    pool.release(pool.acquire())
+
+
+def test_pool_rolls_back_on_release():
+    server = FakeMySQL()
+    create_database(server, 'tienda')
+    pool = ConnectionPool(server.connect, size=1)
+    conn = pool.acquire('tienda')
+    cursor = conn.cursor()
+    cursor.execute('CREATE TABLE t (id INT)')
+    cursor.execute('INSERT INTO t (id) VALUES (1)')
+    pool.release(conn)
+    cursor = pool.acquire('tienda').cursor()
+    cursor.execute('SELECT * FROM t')
+    assert cursor.fetchall() == []
+
+
+def test_requests_share_pooled_connections(client, execute):
+    execute('CREATE DATABASE tienda;')
+    execute('USE tienda;')
+    execute('CREATE TABLE t (id INT PRIMARY KEY);')
+    for index in range(10):
+        assert execute(f'INSERT INTO t (id) VALUES ({index});')['success']
+        assert execute('SELECT * FROM t;', limit=1)['success']
+    stats = client.get('/api/pool').get_json()
+    assert stats['checked_out'] == 0
+    assert stats['created'] == 1
+
+
+def test_transaction_keeps_its_connection(client, execute):
+    execute('BEGIN;')
+    assert client.get('/api/pool').get_json()['checked_out'] == 1
+    execute('ROLLBACK;')
+    assert client.get('/api/pool').get_json()['checked_out'] == 0
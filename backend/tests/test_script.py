@@ -0,0 +1,87 @@
+"""Ejecución de scripts: agrupación de INSERT, lotes y transacciones"""
+import json
+
+from executor import insert_params
+from lexer import Token, TokenType
+from parser import analyze_statement
+
+
+def test_insert_params_from_values():
+    statement = "INSERT INTO t (a, b, c) VALUES ('x', 2, NULL);"
+    assert insert_params(analyze_statement(statement)[1].values, statement) == ['x', 2, None]
+
+
+def test_insert_params_skips_unterminated_string():
+    for statement in ("INSERT INTO t (a) VALUES ('x", "INSERT INTO t (a) VALUES ('"):
+        value = statement[statement.rindex("'") + 1:]
+        token = Token(TokenType.STRING, value, len(statement))
+        assert insert_params([token], statement) is None
+
+
+def run_script(client, script, session='pruebas', **args):
+    """Ejecuta un script con /api/script/execute y devuelve sus líneas como JSON"""
+    response = client.post(
+        '/api/script/execute', query_string=args, data=script, headers={'X-Session-Id': session}
+    )
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+    return lines
+
+
+SCHEMA = '''CREATE DATABASE tienda;
+USE tienda;
+CREATE TABLE p (id INT PRIMARY KEY, nombre VARCHAR(20));
+'''
+
+
+def test_script_groups_inserts(client, execute):
+    script = SCHEMA + ''.join(
+        f"INSERT INTO p (id, nombre) VALUES ({index}, 'fila {index}');\n" for index in range(5)
+    ) + 'SELECT * FROM p;'
+    *items, summary = run_script(client, script)
+    inserts = [item for item in items if item['statement_type'] == 'INSERT']
+    assert len(inserts) == 5 and all(item['batched'] for item in inserts)
+    assert len(items[-1]['data']) == 5
+    assert summary == dict(
+        summary, success=True, executed=9, failed=0, database='tienda'
+    )
+    assert execute('SELECT * FROM p;')['message'] == '5 registros encontrados'
+
+
+def test_script_stops_on_error(client):
+    script = SCHEMA + (
+        "INSERT INTO p (id, nombre) VALUES (1, 'a');\n"
+        "UPDATE q SET nombre = 'b';\n"
+        "INSERT INTO p (id, nombre) VALUES (2, 'c');\n"
+    )
+    *items, summary = run_script(client, script, insert_batch_size=1)
+    assert [item['success'] for item in items] == [True, True, True, True, False]
+    # Lo pendiente se deshace: el INSERT de id 1 no quedó
+    assert summary['failed'] == 1 and summary['rolled_back'] == 4 and not summary['success']
+
+    *items, summary = run_script(client, 'USE tienda;\n' + script.split('\n', 3)[3], stop_on_error=0)
+    assert [item['success'] for item in items] == [True, True, False, True]
+    assert summary['failed'] == 1
+
+
+def test_script_transaction_left_open_is_rolled_back(client, execute):
+    run_script(client, SCHEMA)
+    *items, summary = run_script(
+        client, "USE tienda;\nBEGIN;\nINSERT INTO p (id, nombre) VALUES (1, 'a');\n"
+    )
+    assert summary['rolled_back'] == 1
+    execute('USE tienda;')
+    assert execute('SELECT * FROM p;')['data'] == []
+
+
+def test_script_invalidates_only_written_tables(client, execute):
+    run_script(client, SCHEMA + 'CREATE TABLE q (id INT PRIMARY KEY);\n')
+    execute('USE tienda;')
+    for table in ('p', 'q'):
+        execute(f'SELECT * FROM {table};')
+        assert execute(f'SELECT * FROM {table};')['cached']
+
+    run_script(client, "INSERT INTO p (id, nombre) VALUES (1, 'a');\nSELECT * FROM q;")
+    assert execute('SELECT * FROM q;')['cached']
+    result = execute('SELECT * FROM p;')
+    assert not result['cached'] and result['data'] == [{'id': 1, 'nombre': 'a'}]
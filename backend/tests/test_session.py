@@ -0,0 +1,84 @@
+"""Sesiones: cierre de las que vencen o se desalojan y confirmación de lotes"""
+import threading
+import time
+
+from mysql.connector import Error
+
+import app as backend
+from metrics import Metrics
+from session import GroupCommitter, SessionStore
+
+
+class Connection:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_evicted_session_waits_for_its_request():
+    store = SessionStore(max_sessions=1)
+    session = store.get('a')
+    connection = Connection()
+    released = []
+    session.pin(connection, released.append)
+    session.begin('batch')
+    session.record_write()
+
+    session.lock.acquire()
+    evicting = threading.Thread(target=store.get, args=('b',))
+    evicting.start()
+    time.sleep(0.05)
+    # La petición en curso sigue teniendo su conexión
+    assert session.connection is connection and not released
+    session.lock.release()
+    evicting.join(1)
+
+    assert released == [connection] and connection.commits == 1
+    assert session.connection is None and store.stats()['evicted'] == 1
+
+
+def failing_commit():
+    raise Error(msg='Lost connection to MySQL server during query', errno=2013)
+
+
+def test_session_close_counts_failed_commit():
+    metrics = Metrics()
+    store = SessionStore(metrics=metrics)
+    session = store.get('a')
+    connection = Connection()
+    connection.commit = failing_commit
+    session.pin(connection, lambda connection: None)
+    session.begin('batch')
+    session.record_write()
+    store.close('a')
+    assert metrics.snapshot()['statements'] == [
+        {'statement_type': 'COMMIT', 'status': 'error', 'count': 1}
+    ]
+
+
+def test_failed_group_commit_is_reported_by_next_request(execute):
+    execute('CREATE DATABASE tienda;')
+    execute('USE tienda;')
+    execute('CREATE TABLE p (id INT PRIMARY KEY);')
+    assert execute('INSERT INTO p (id) VALUES (1);', batch=True)['transaction']['pending'] == 1
+
+    session = backend.sessions.get('pruebas')
+    session.connection.raw.commit = failing_commit
+    metrics = Metrics()
+    committer = GroupCommitter(
+        backend.sessions, 0, lambda session: backend.finish_transaction(session, commit=True),
+        metrics=metrics
+    )
+    committer.flush()
+    assert (committer.flushed, committer.failed) == (0, 1)
+    assert metrics.snapshot()['statements'] == [
+        {'statement_type': 'COMMIT', 'status': 'error', 'count': 1}
+    ]
+
+    result = execute('SELECT * FROM p;')
+    assert result['success']
+    assert result['failed_commit']['rolled_back'] == 1
+    assert 'Lost connection' in result['failed_commit']['error']
+    assert 'failed_commit' not in execute('SELECT * FROM p;')
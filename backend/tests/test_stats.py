@@ -0,0 +1,55 @@
+"""Estadísticas y reinicio de cachés, métricas, catálogo, asesor y documentos"""
+import app as backend
+from advisor import IndexAdvisor
+
+
+def test_clear_caches(client, execute):
+    execute('CREATE DATABASE tienda;')
+    execute('USE tienda;')
+    execute('CREATE TABLE p (id INT PRIMARY KEY);')
+    execute('SELECT * FROM p;')
+    stats = client.get('/api/cache').get_json()
+    assert stats['queries']['entries'] and stats['results']['entries']
+
+    assert client.delete('/api/cache').get_json()['success']
+    stats = client.get('/api/cache').get_json()
+    assert stats['queries']['entries'] == stats['results']['entries'] == 0
+
+
+def test_reset_metrics(client, execute):
+    execute('CREATE DATABASE tienda;')
+    assert client.get('/api/metrics?format=json').get_json()['statements']
+    assert client.delete('/api/metrics').get_json()['success']
+    assert client.get('/api/metrics?format=json').get_json()['statements'] == []
+
+
+def test_clear_catalog(client, execute):
+    execute('CREATE DATABASE tienda;')
+    assert client.get('/api/databases').status_code == 200
+    assert client.get('/api/catalog').get_json()['databases_cached']
+    assert client.delete('/api/catalog').get_json()['success']
+    assert not client.get('/api/catalog').get_json()['databases_cached']
+
+
+def test_advisor_keeps_last_applied_indexes(client, monkeypatch):
+    advisor = IndexAdvisor(applied_log_size=2)
+    monkeypatch.setattr(backend, 'advisor', advisor)
+    for name in ('a', 'b', 'c'):
+        advisor.record_applied(f'CREATE INDEX idx_{name} ON t ({name})')
+    assert client.get('/api/advisor/stats').get_json()['applied'] == [
+        'CREATE INDEX idx_b ON t (b)', 'CREATE INDEX idx_c ON t (c)'
+    ]
+    assert client.delete('/api/advisor').get_json()['success']
+    assert client.get('/api/advisor/stats').get_json()['applied'] == []
+
+
+def test_close_incremental_document(client):
+    document = {'document_id': 'editor-1'}
+    client.post('/api/analyze/incremental', json=dict(document, query='SELECT * FROM t;'))
+    assert client.delete('/api/analyze/incremental', json=document).status_code == 200
+    assert client.delete('/api/analyze/incremental', json=document).status_code == 404
+    response = client.post(
+        '/api/analyze/incremental',
+        json=dict(document, version=1, offset=0, removed=0, inserted='x')
+    )
+    assert response.status_code == 409
@@ -1,6 +1,10 @@
 import { useState, useEffect, useRef } from 'react';
 import './App.css';
 
+// Sesión del servidor para esta pestaña (base de datos seleccionada, transacción)
+const SESSION_ID = sessionStorage.getItem('sessionId') || crypto.randomUUID();
+sessionStorage.setItem('sessionId', SESSION_ID);
+
 export default function MySQLInterface() {
   const [query, setQuery] = useState('');
   const [result, setResult] = useState(null);
@@ -11,8 +15,21 @@ export default function MySQLInterface() {
   const [databases, setDatabases] = useState([]);
   const [currentDb, setCurrentDb] = useState(null);
   const textareaRef = useRef(null);
+  // Posición del cursor y palabra que reemplazan las sugerencias mostradas
+  const completionRef = useRef({ position: 0, prefix: '' });
+  // Documento sincronizado con /analyze/incremental (texto, versión y tokens)
+  const documentRef = useRef({ id: crypto.randomUUID(), version: null, text: '', tokens: [] });
+  const syncRef = useRef(Promise.resolve());
+  // Petición del editor en curso: se cancela al enviar la siguiente
+  const editorRequestRef = useRef(null);
 
   const API_URL = 'http://localhost:5000/api';
+
+  // Identifican la sesión; la base de datos sirve si otro proceso del servidor la atiende
+  const sessionHeaders = () => ({
+    'X-Session-Id': SESSION_ID,
+    ...(currentDb ? { 'X-Database': currentDb } : {})
+  });
   
   const templates = {
     createDb: 'CREATE DATABASE mi_base_datos;',
@@ -31,7 +48,12 @@ export default function MySQLInterface() {
   useEffect(() => {
     const timer = setTimeout(() => {
       if (query.trim()) {
-        fetchSuggestions();
+        const text = query;
+        const position = textareaRef.current?.selectionEnd ?? text.length;
+        editorRequestRef.current?.abort();
+        const controller = new AbortController();
+        editorRequestRef.current = controller;
+        syncRef.current = syncRef.current.then(() => syncEditor(text, position, controller.signal));
       } else {
         setSuggestions([]);
         setShowSuggestions(false);
@@ -41,63 +63,118 @@ export default function MySQLInterface() {
   }, [query]);
 
   useEffect(() => {
-    fetchDatabases();
-    checkHealth();
+    refreshMetadata(['databases', 'health']);
   }, []);
 
-  const fetchSuggestions = async () => {
-    try {
-      const response = await fetch(`${API_URL}/autocomplete`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query: query.trim() })
-      });
-      const data = await response.json();
-      if (data.suggestions && data.suggestions.length > 0) {
-        setSuggestions(data.suggestions);
-        setShowSuggestions(true);
-      } else {
-        setShowSuggestions(false);
-      }
-    } catch (error) {
-      console.error('Error obteniendo sugerencias:', error);
+  // Varias operaciones en una sola petición a /batch
+  const batch = async (operations, params = {}, signal) => {
+    const response = await fetch(`${API_URL}/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...sessionHeaders() },
+      body: JSON.stringify({ operations, ...params }),
+      signal
+    });
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.error);
+    return data.results;
+  };
+
+  const showSuggestionsFor = (data, position) => {
+    completionRef.current = { position, prefix: data.prefix || '' };
+    if (data.suggestions && data.suggestions.length > 0) {
+      setSuggestions(data.suggestions);
+      setShowSuggestions(true);
+    } else {
+      setShowSuggestions(false);
     }
   };
 
-  const fetchDatabases = async () => {
+  // Envía solo la edición respecto al último texto sincronizado y pide
+  // las sugerencias en la misma petición (el servidor tokeniza una vez)
+  const syncEditor = async (text, position, signal) => {
+    const doc = documentRef.current;
+    let body;
+    if (doc.version === null) {
+      body = { document_id: doc.id, query: text };
+    } else {
+      const previous = doc.text;
+      if (previous === text) return;
+      let start = 0;
+      while (start < previous.length && start < text.length && previous[start] === text[start]) {
+        start++;
+      }
+      let end = 0;
+      while (end < previous.length - start && end < text.length - start &&
+             previous[previous.length - 1 - end] === text[text.length - 1 - end]) {
+        end++;
+      }
+      body = {
+        document_id: doc.id,
+        version: doc.version,
+        offset: start,
+        removed: previous.length - start - end,
+        inserted: text.slice(start, text.length - end)
+      };
+    }
+
     try {
-      const response = await fetch(`${API_URL}/databases`);
-      const data = await response.json();
-      if (data.success) {
-        setDatabases(data.databases);
+      const results = await batch(
+        ['incremental', 'autocomplete'], { document: body, position }, signal
+      );
+      const data = results.incremental;
+      if (data.status === 409) {
+        // El servidor perdió el documento: reenviar el texto completo
+        doc.version = null;
+        return syncEditor(text, position, signal);
+      }
+      if (data.status) return;
+      showSuggestionsFor(results.autocomplete, position);
+
+      if (data.lexical.tokens) {
+        doc.tokens = data.lexical.tokens;
+      } else {
+        const diff = data.lexical.diff;
+        const tail = doc.tokens
+          .slice(diff.start + diff.deleted)
+          .map((token) => ({ ...token, position: token.position + diff.shift }));
+        doc.tokens = [...doc.tokens.slice(0, diff.start), ...diff.inserted, ...tail];
       }
+      doc.version = data.version;
+      doc.text = text;
+
+      setAnalysis({
+        lexical: { tokens: doc.tokens, token_count: data.lexical.token_count },
+        syntactic: data.syntactic
+      });
     } catch (error) {
-      console.error('Error obteniendo bases de datos:', error);
+      // Cancelada por una edición más reciente: si el servidor ya la aplicó,
+      // la próxima recibe 409 y se reenvía el texto completo
+      if (error.name !== 'AbortError') {
+        console.error('Error analizando:', error);
+      }
     }
   };
 
-  const checkHealth = async () => {
+  // Bases de datos ('databases') y base de datos activa ('health')
+  const refreshMetadata = async (operations) => {
     try {
-      const response = await fetch(`${API_URL}/health`);
-      const data = await response.json();
-      if (data.current_database) {
-        setCurrentDb(data.current_database);
+      const results = await batch(operations);
+      if (results.databases?.success) {
+        setDatabases(results.databases.databases);
+      }
+      if (results.health?.status === 'ok') {
+        setCurrentDb(results.health.current_database);
       }
     } catch (error) {
-      console.error('Error verificando estado:', error);
+      console.error('Error obteniendo bases de datos:', error);
     }
   };
 
   const analyzeQuery = async () => {
     if (!query.trim()) return;
     try {
-      const response = await fetch(`${API_URL}/analyze`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query })
-      });
-      const data = await response.json();
-      setAnalysis(data);
+      const results = await batch(['analyze'], { query });
+      setAnalysis(results.analyze);
     } catch (error) {
       console.error('Error analizando:', error);
       setAnalysis({ error: error.message });
@@ -117,8 +194,9 @@ export default function MySQLInterface() {
     try {
       const response = await fetch(`${API_URL}/execute`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query })
+        headers: { 'Content-Type': 'application/json', ...sessionHeaders() },
+        // Filas como listas con las columnas una sola vez
+        body: JSON.stringify({ query, format: 'rows' })
       });
       
       const data = await response.json();
@@ -128,17 +206,17 @@ export default function MySQLInterface() {
         setAnalysis(data.analysis);
       }
 
-      if (query.toUpperCase().includes('CREATE DATABASE')) {
-        fetchDatabases();
+      // Una sola petición para lo que haya que actualizar
+      const upper = query.toUpperCase();
+      const operations = [];
+      if (upper.includes('CREATE DATABASE') || upper.includes('DROP DATABASE')) {
+        operations.push('databases');
       }
-
-      if (query.toUpperCase().includes('DROP DATABASE')) {
-        fetchDatabases();
-        checkHealth(); // Actualizar el estado de la base de datos activa
+      if (upper.includes('DROP DATABASE') || upper.startsWith('USE')) {
+        operations.push('health'); // Actualizar el estado de la base de datos activa
       }
-
-      if (query.toUpperCase().startsWith('USE')) {
-        checkHealth();
+      if (operations.length > 0) {
+        refreshMetadata(operations);
       }
     } catch (error) {
       setResult({
@@ -151,10 +229,17 @@ export default function MySQLInterface() {
     }
   };
 
+  // Reemplaza la palabra que se está escribiendo por la sugerencia
   const applySuggestion = (suggestion) => {
-    setQuery(suggestion + ' ');
+    const { position, prefix } = completionRef.current;
+    const start = position - prefix.length;
+    const cursor = start + suggestion.length + 1;
+    setQuery(query.slice(0, start) + suggestion + ' ' + query.slice(position));
     setShowSuggestions(false);
-    textareaRef.current?.focus();
+    requestAnimationFrame(() => {
+      textareaRef.current?.focus();
+      textareaRef.current?.setSelectionRange(cursor, cursor);
+    });
   };
 
   const loadTemplate = (templateKey) => {
@@ -277,15 +362,15 @@ export default function MySQLInterface() {
                       <table className="data-table">
                         <thead>
                           <tr>
-                            {Object.keys(result.data[0]).map((key) => (
-                              <th key={key}>{key}</th>
+                            {result.columns.map((column, j) => (
+                              <th key={j}>{column}</th>
                             ))}
                           </tr>
                         </thead>
                         <tbody>
                           {result.data.map((row, i) => (
                             <tr key={i}>
-                              {Object.values(row).map((value, j) => (
+                              {row.map((value, j) => (
                                 <td key={j}>
                                   {value !== null ? String(value) : 'NULL'}
                                 </td>